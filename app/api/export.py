@@ -0,0 +1,178 @@
+"""
+API endpoints for streaming catalog and conversation exports
+Rows are read from the SQLite cursor in chunks so memory stays flat regardless of table size
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.config.settings import EXPORT_CHUNK_SIZE
+from app.models.database import get_db_manager, conversation_store
+
+# Create API router
+router = APIRouter()
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'sse': 'text/event-stream',
+}
+
+def _normalize_since(since: Optional[str]) -> Optional[str]:
+    """
+    Parse an ISO 8601 `since` ('T' or space, optional fraction and UTC offset) into
+    'YYYY-MM-DD HH:MM:SS[.ffffff]' UTC, the form stored timestamps are compared in
+    """
+    if not since:
+        return None
+    value = since.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid since: {since}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.strftime('%Y-%m-%d %H:%M:%S.%f' if moment.microsecond else '%Y-%m-%d %H:%M:%S')
+
+def _parse_conversation(row: Dict) -> Dict:
+    """Decode the JSON columns of a conversation row"""
+    for field in ['recommended_products', 'user_preferences']:
+        if row.get(field):
+            try:
+                row[field] = json.loads(row[field])
+            except:
+                pass
+    return row
+
+def _stream_rows(queries: Callable, table: Optional[str]) -> Iterator[Dict]:
+    """Yield rows one chunk at a time from a dedicated connection"""
+    db = get_db_manager()
+    with db.get_connection() as conn:
+        for query, params in queries(conn):
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    if table == 'products':
+                        yield db.parse_json_fields(dict(row))
+                    elif table == 'conversations':
+                        yield _parse_conversation(dict(row))
+                    else:
+                        yield dict(row)
+
+def _encode(rows: Iterator[Dict], export_format: str) -> Iterator[str]:
+    """Serialize rows as NDJSON, CSV or Server-Sent Events"""
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    elif export_format == 'sse':
+        for row in rows:
+            yield f"data: {json.dumps(row, default=str)}\n\n"
+        yield "event: end\ndata: {}\n\n"
+    else:
+        for row in rows:
+            yield json.dumps(row, default=str) + "\n"
+
+def _export_response(queries: Callable, export_format: str, name: str):
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {export_format}")
+
+    headers = {}
+    if export_format != 'sse':
+        extension = 'csv' if export_format == 'csv' else 'ndjson'
+        headers["Content-Disposition"] = f"attachment; filename={name}.{extension}"
+
+    return StreamingResponse(
+        # CSV keeps JSON columns as their raw strings
+        _encode(_stream_rows(queries, None if export_format == 'csv' else name), export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers
+    )
+
+@router.get("/export/products")
+def export_products(
+    format: str = "ndjson",
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    since: Optional[str] = None,
+    after_id: Optional[int] = None
+):
+    """
+    Stream the product catalog, optionally only rows created from `since` on (pass the
+    last exported created_at and id as `since` and `after_id` to resume without gaps)
+    """
+    since = _normalize_since(since)
+    query = "SELECT * FROM products WHERE 1=1"
+    params = []
+
+    if category:
+        query += " AND category = ?"
+        params.append(category)
+
+    if min_price is not None:
+        query += " AND price >= ?"
+        params.append(min_price)
+
+    if max_price is not None:
+        query += " AND price <= ?"
+        params.append(max_price)
+
+    created_at = "replace(created_at, 'T', ' ')"
+    if since and after_id is not None:
+        query += f" AND ({created_at} > ? OR ({created_at} = ? AND id > ?))"
+        params.extend([since, since, after_id])
+    elif since:
+        query += f" AND {created_at} >= ?"
+        params.append(since)
+
+    query += f" ORDER BY {created_at}, id" if since else " ORDER BY id"
+
+    return _export_response(lambda conn: [(query, params)], format, "products")
+
+@router.get("/export/conversations")
+def export_conversations(
+    format: str = "ndjson",
+    session_id: Optional[str] = None,
+    min_interest: Optional[float] = None,
+    since: Optional[str] = None,
+    after_id: Optional[int] = None
+):
+    """
+    Stream the conversation log, optionally only turns recorded from `since` on (pass the
+    last exported timestamp and id as `since` and `after_id` to resume without gaps)
+    """
+    since = _normalize_since(since)
+    conditions = []
+    params = []
+
+    if session_id:
+        conditions.append("session_id = ?")
+        params.append(session_id)
+
+    if min_interest is not None:
+        conditions.append("interest_score >= ?")
+        params.append(min_interest)
+
+    # Daily partitions older than `since` are skipped entirely
+    return _export_response(
+        lambda conn: conversation_store.partition_queries(conn, conditions, params, since=since, after_id=after_id),
+        format,
+        "conversations"
+    )
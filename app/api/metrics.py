@@ -0,0 +1,29 @@
+"""
+API endpoints for runtime metrics of the generation stack, shadow pipelines and live popularity
+"""
+
+from fastapi import APIRouter
+from app.services.inference_client import inference_client
+from app.services.popularity_counter import popularity_counter
+from app.services.batch_scheduler import MicroBatchScheduler
+from app.services.shadow_runner import ShadowRunner
+
+# Create API router
+router = APIRouter()
+
+@router.get("/metrics/generation")
+async def get_generation_metrics():
+    """Per-model breaker state and latency, generation cache hit/miss counters and batching"""
+    stats = inference_client.get_stats()
+    stats["batching"] = {scheduler.name: scheduler.get_stats() for scheduler in MicroBatchScheduler.instances}
+    return stats
+
+@router.get("/metrics/shadow")
+async def get_shadow_metrics():
+    """How often the shadow candidate agrees with the live pipeline, and how fast each is"""
+    return {"runners": [runner.get_stats() for runner in ShadowRunner.instances]}
+
+@router.get("/metrics/popularity")
+async def get_popularity_metrics():
+    """Live popularity counters: turns recorded, products waiting for the next flush, flush cost"""
+    return popularity_counter.get_stats()
@@ -2,10 +2,16 @@
 API endpoints for product operations
 """
 
-from typing import Optional, List
-from fastapi import APIRouter, HTTPException
+from typing import Optional, List, Dict
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from app.models.database import get_db_manager
+from app.config.settings import SIMILAR_ITEMS_K
+from app.services.catalog_service import catalog_service, InvalidCursorError
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.facet_service import facet_index
+from app.services.popularity_lists import popularity_lists
+from app.services.similarity_index import similarity_index
+from app.services.trending_service import trending_tracker
 
 # Create API router
 router = APIRouter()
@@ -14,60 +20,142 @@ router = APIRouter()
 class ProductResponse(BaseModel):
     products: List[dict]
     total: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    categories: List[str] = []
+
+class FacetedSearchResponse(BaseModel):
+    products: List[dict]
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+class SimilarProductsResponse(BaseModel):
+    product_id: str
+    similar: List[dict]
+
+class TrendingProductsResponse(BaseModel):
+    products: List[dict]
+    source: str
+    window_minutes: float
 
 @router.get("/products", response_model=ProductResponse)
 async def get_products(
     category: Optional[str] = None,
     search: Optional[str] = None,
-    limit: int = 50
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = 24,
+    cursor: Optional[str] = None
 ):
-    """Get products with optional filtering"""
+    """Get products with optional filtering and keyset pagination"""
     try:
-        db = get_db_manager()
-        
-        with db.get_connection() as conn:
-            query = "SELECT * FROM products"
-            params = []
-            conditions = []
-            
-            if category:
-                conditions.append("category = ?")
-                params.append(category)
-            
-            if search:
-                conditions.append("(name LIKE ? OR description LIKE ?)")
-                params.extend([f"%{search}%", f"%{search}%"])
-            
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            
-            query += " ORDER BY popularity_score DESC LIMIT ?"
-            params.append(limit)
-            
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-            
-            products = [db.parse_json_fields(dict(row)) for row in rows]
-            
-            return ProductResponse(
-                products=products,
-                total=len(products)
-            )
-            
+        page = catalog_service.get_products_page(
+            category=category,
+            search=search,
+            min_price=min_price,
+            max_price=max_price,
+            limit=max(1, min(limit, 100)),
+            cursor=cursor
+        )
+
+        return ProductResponse(
+            categories=catalog_service.get_categories(),
+            **page
+        )
+
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/products/search", response_model=FacetedSearchResponse)
+async def search_products(
+    category: Optional[List[str]] = Query(None),
+    dietary: Optional[List[str]] = Query(None),
+    exclude_allergen: Optional[List[str]] = Query(None),
+    price_bucket: Optional[List[str]] = Query(None),
+    spice_level: Optional[List[int]] = Query(None),
+    min_spice: Optional[int] = None,
+    max_spice: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    max_calories: Optional[int] = None,
+    search: Optional[str] = None,
+    limit: int = 24,
+    offset: int = 0
+):
+    """Faceted product search with counts per category, dietary tag, allergen, price and spice"""
+    try:
+        result = facet_index.search(
+            categories=category,
+            dietary=dietary,
+            exclude_allergens=exclude_allergen,
+            price_buckets=price_bucket,
+            spice_levels=spice_level,
+            min_spice=min_spice,
+            max_spice=max_spice,
+            min_price=min_price,
+            max_price=max_price,
+            max_calories=max_calories,
+            search=search,
+            limit=max(1, min(limit, 100)),
+            offset=max(0, offset)
+        )
+        return FacetedSearchResponse(**result)
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/products/trending", response_model=TrendingProductsResponse)
+async def get_trending_products(limit: int = 10):
+    """Most recommended products over the recent window (Space-Saving sketches, cached)"""
+    try:
+        limit = max(1, min(limit, 50))
+        trending = trending_tracker.top(limit)
+        if trending:
+            counts = dict(trending)
+            products = catalog_snapshot.get_products_by_ids([product_id for product_id, _ in trending])
+            for product in products:
+                product['trend_score'] = round(counts[product['product_id']], 2)
+            source = "trending"
+        else:
+            # Nothing recommended in the window yet - fall back to the most popular products
+            products = popularity_lists.top(limit) or []
+            source = "popular"
+
+        return TrendingProductsResponse(
+            products=products,
+            source=source,
+            window_minutes=trending_tracker.get_stats()["window_minutes"]
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/products/{product_id}/similar", response_model=SimilarProductsResponse)
+async def get_similar_products(product_id: str, limit: int = 10):
+    """Closest products by ingredients, tags, price and spice level (precomputed)"""
+    try:
+        similar = similarity_index.similar(product_id, max(1, min(limit, SIMILAR_ITEMS_K)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if product_id not in similarity_index.rows:
+        raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+
+    similarities = dict(similar)
+    products = catalog_snapshot.get_products_by_ids([similar_id for similar_id, _ in similar])
+    for product in products:
+        product['similarity'] = round(similarities[product['product_id']], 3)
+
+    return SimilarProductsResponse(product_id=product_id, similar=products)
+
 @router.get("/categories")
 async def get_categories():
     """Get all product categories"""
     try:
-        db = get_db_manager()
-        
-        with db.get_connection() as conn:
-            cursor = conn.execute("SELECT DISTINCT category FROM products ORDER BY category")
-            categories = [row[0] for row in cursor.fetchall()]
-            
-            return {"categories": categories, "total": len(categories)}
-            
+        categories = catalog_service.get_categories()
+        return {"categories": categories, "total": len(categories)}
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,16 @@
+"""
+Readiness endpoint for load balancers
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.warmup_service import warmup_service
+
+# Create API router
+router = APIRouter()
+
+@router.get("/ready")
+async def readiness():
+    """200 once the instance has warmed up, 503 before - route traffic only on 200"""
+    status = warmup_service.get_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
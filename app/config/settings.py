@@ -12,9 +12,108 @@ load_dotenv()
 # API Configuration
 GROK_API_KEY = os.getenv("GROK_API_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+
+# HuggingFace Inference Configuration
+HF_API_BASE = os.getenv("HF_API_BASE", "https://api-inference.huggingface.co/models")  # point at a local stub for tests
+# Model ids, or full URLs to race separate backends (e.g. several local stub servers)
+HF_MODELS = [m.strip() for m in os.getenv("HF_MODELS", "microsoft/DialoGPT-medium,facebook/blenderbot-400M-distill").split(",") if m.strip()]
+HF_POOL_SIZE = int(os.getenv("HF_POOL_SIZE", "10"))  # keep-alive connections
+HF_REQUEST_TIMEOUT = float(os.getenv("HF_REQUEST_TIMEOUT", "8"))  # seconds per model call
+HF_BREAKER_FAILURES = int(os.getenv("HF_BREAKER_FAILURES", "3"))  # consecutive failures before a model is skipped
+HF_BREAKER_COOLDOWN = float(os.getenv("HF_BREAKER_COOLDOWN", "60"))  # seconds a tripped model is skipped
+GENERATION_LATENCY_BUDGET = float(os.getenv("GENERATION_LATENCY_BUDGET", "6"))  # seconds per chat turn before falling back
+HF_DISPATCH_MODE = os.getenv("HF_DISPATCH_MODE", "sequential")  # sequential | parallel | hedged
+HF_HEDGE_DELAY = float(os.getenv("HF_HEDGE_DELAY", "1.0"))  # seconds before hedging until a model has a p95
+
+# Chat Pipeline Configuration
+CHAT_PIPELINE = os.getenv("CHAT_PIPELINE", "")  # smart | working | lightweight | engine (empty = each app's default)
+# Swap single stages of the preset by component name
+PIPELINE_EXTRACTOR = os.getenv("PIPELINE_EXTRACTOR", "")  # smart | working | lightweight
+PIPELINE_SCORER = os.getenv("PIPELINE_SCORER", "")  # smart | conversation
+PIPELINE_RETRIEVER = os.getenv("PIPELINE_RETRIEVER", "")  # smart | working | lightweight | engine | semantic
+PIPELINE_RANKER = os.getenv("PIPELINE_RANKER", "")  # none | preference
+PIPELINE_GENERATOR = os.getenv("PIPELINE_GENERATOR", "")  # smart | working | lightweight
+
+# Shadow Mode Configuration - a candidate pipeline replays sampled sessions off the request path
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))  # share of sessions shadowed (0 = off)
+SHADOW_PIPELINE = os.getenv("SHADOW_PIPELINE", "")  # candidate preset (empty = the app's own pipeline)
+SHADOW_EXTRACTOR = os.getenv("SHADOW_EXTRACTOR", "")  # stage overrides for the candidate, as PIPELINE_*
+SHADOW_SCORER = os.getenv("SHADOW_SCORER", "")
+SHADOW_RETRIEVER = os.getenv("SHADOW_RETRIEVER", "")
+SHADOW_RANKER = os.getenv("SHADOW_RANKER", "")
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "200"))  # turns waiting for the candidate; more are dropped
+
+# Warm-up Configuration - /ready answers 503 until this has run
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_LOOKBACK = int(os.getenv("WARMUP_LOOKBACK", "5000"))  # recent turns mined for common preferences
+WARMUP_SIGNATURES = int(os.getenv("WARMUP_SIGNATURES", "20"))  # most common preference sets replayed
+WARMUP_GENERATION = os.getenv("WARMUP_GENERATION", "false").lower() == "true"  # also generate one (possibly paid) reply
+
+# Generation Backend Configuration
+GENERATION_BACKEND = os.getenv("GENERATION_BACKEND", "auto")  # auto | huggingface | local | transformers
+GENERATION_TOKEN_BUDGET = int(os.getenv("GENERATION_TOKEN_BUDGET", "64"))  # max new tokens for local backends
+LOCAL_GENERATION_MODEL = os.getenv("LOCAL_GENERATION_MODEL", "distilgpt2")  # used by the transformers backend
+GENERATION_BATCH_WINDOW_MS = float(os.getenv("GENERATION_BATCH_WINDOW_MS", "5"))  # how long to collect prompts; 0 disables batching
+GENERATION_MAX_BATCH = int(os.getenv("GENERATION_MAX_BATCH", "8"))  # prompts per batched backend call
+GENERATION_BATCH_WORKERS = int(os.getenv("GENERATION_BATCH_WORKERS", "4"))  # batches in flight at once
+
+# Generation Cache Configuration
+GENERATION_CACHE_PATH = os.getenv("GENERATION_CACHE_PATH", "./data/generation_cache.db")
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", "86400"))  # seconds a reply stays reusable
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "5000"))  # 0 disables the cache
+GENERATION_CACHE_SAMPLED_VARIANTS = int(os.getenv("GENERATION_CACHE_SAMPLED_VARIANTS", "3"))  # replies kept per prompt when temperature > 0
 
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "./data/foodiebot.db")
+CONVERSATION_RETENTION_DAYS = int(os.getenv("CONVERSATION_RETENTION_DAYS", "0"))  # 0 keeps every daily partition
+CONVERSATION_ARCHIVE_DIR = os.getenv("CONVERSATION_ARCHIVE_DIR", "./data/archive")
+CONVERSATION_LIVE_PARTITIONS = int(os.getenv("CONVERSATION_LIVE_PARTITIONS", "90"))  # older days roll into conversations_archive
+
+# Catalog Configuration
+PRODUCT_COUNT_CACHE_TTL = float(os.getenv("PRODUCT_COUNT_CACHE_TTL", "60"))  # seconds
+PRODUCT_COUNT_CACHE_SIZE = int(os.getenv("PRODUCT_COUNT_CACHE_SIZE", "256"))  # filter signatures
+FACET_INDEX_TTL = float(os.getenv("FACET_INDEX_TTL", "300"))  # seconds before the bitmap index is rebuilt
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", "./data/catalog_snapshot")  # memory-mapped products, shared by workers
+CATALOG_SNAPSHOT_TTL = float(os.getenv("CATALOG_SNAPSHOT_TTL", "300"))  # seconds between catalog change checks
+POPULARITY_TOP_N = int(os.getenv("POPULARITY_TOP_N", "50"))  # products kept per overall/category/tag popularity list
+
+# Live Popularity Configuration
+POPULARITY_FLUSH_INTERVAL = float(os.getenv("POPULARITY_FLUSH_INTERVAL", "30"))  # seconds between batched writes; 0 disables live popularity
+POPULARITY_HALF_LIFE_HOURS = float(os.getenv("POPULARITY_HALF_LIFE_HOURS", "24"))  # demand halves this often
+POPULARITY_PRIOR_WEIGHT = float(os.getenv("POPULARITY_PRIOR_WEIGHT", "20"))  # decayed events worth as much as the seeded score
+POPULARITY_HIGH_INTEREST = float(os.getenv("POPULARITY_HIGH_INTEREST", "70"))  # interest score that counts as a high-interest turn
+
+# Trending Configuration
+TRENDING_WINDOW_MINUTES = float(os.getenv("TRENDING_WINDOW_MINUTES", "60"))  # sliding window "trending now" covers
+TRENDING_BUCKETS = int(os.getenv("TRENDING_BUCKETS", "12"))  # time buckets the window slides by
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", "64"))  # Space-Saving counters per bucket (memory bound)
+TRENDING_REFRESH_SECONDS = float(os.getenv("TRENDING_REFRESH_SECONDS", "5"))  # how stale the served list may be
+TRENDING_STATE_PATH = os.getenv("TRENDING_STATE_PATH", "./data/trending.json")  # sketches kept across restarts (each worker writes <path>.<pid>)
+
+# Semantic Retrieval Configuration
+SEMANTIC_INDEX_DIR = os.getenv("SEMANTIC_INDEX_DIR", "./data/semantic_index")
+SEMANTIC_MAX_FEATURES = int(os.getenv("SEMANTIC_MAX_FEATURES", "4096"))  # TF-IDF columns (most common stems and stem pairs)
+SEMANTIC_INDEX_TTL = float(os.getenv("SEMANTIC_INDEX_TTL", "300"))  # seconds between catalog change checks
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.05"))  # cosine similarity below this is not a match
+SEMANTIC_IVF_MIN_PRODUCTS = int(os.getenv("SEMANTIC_IVF_MIN_PRODUCTS", "20000"))  # partition catalogs this big; 0 never
+SEMANTIC_IVF_PROBES = int(os.getenv("SEMANTIC_IVF_PROBES", "8"))  # IVF lists scanned per query
+
+# Similar Items Configuration
+SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", "./data/similarity_index")
+SIMILARITY_INDEX_TTL = float(os.getenv("SIMILARITY_INDEX_TTL", "300"))  # seconds between catalog change checks
+SIMILAR_ITEMS_K = int(os.getenv("SIMILAR_ITEMS_K", "20"))  # neighbours stored per product
+SIMILARITY_EXACT_MAX_PRODUCTS = int(os.getenv("SIMILARITY_EXACT_MAX_PRODUCTS", "2000"))  # larger catalogs use MinHash-LSH
+SIMILARITY_MINHASH_PERMUTATIONS = int(os.getenv("SIMILARITY_MINHASH_PERMUTATIONS", "64"))
+SIMILARITY_LSH_BANDS = int(os.getenv("SIMILARITY_LSH_BANDS", "32"))  # more bands = more candidates, slower build
+
+# Collaborative Filtering Configuration
+CF_MODEL_DIR = os.getenv("CF_MODEL_DIR", "./data/cf_model")
+CF_FACTORS = int(os.getenv("CF_FACTORS", "16"))  # latent dimensions kept from the SVD
+CF_MODEL_TTL = float(os.getenv("CF_MODEL_TTL", "300"))  # seconds between checks for a retrained model
+
+# Export Configuration
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))  # rows fetched per cursor round-trip
 
 # App Configuration
 APP_NAME = "FoodieBot"
@@ -8,14 +8,23 @@ import json
 from typing import Dict, List
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Import our modules
-from app.models.database import init_database, get_db_manager
-from app.services.scoring_service import scoring_service
-from app.services.ai_service import ai_service
+from app.models.database import init_database, get_db_manager, conversation_store
+from app.services.analytics_service import analytics_service
+from app.services.pipeline import configured_pipeline
+from app.services.popularity_counter import popularity_counter
+from app.services.shadow_runner import configured_shadow
+from app.services.trending_service import trending_tracker
+from app.services.warmup_service import warmup_service
 from app.api.products import router as products_router
+from app.api.export import router as export_router
+from app.api.metrics import router as metrics_router
+from app.api.readiness import router as readiness_router
+from app.utils.streaming import sse_event
 
 # Load environment variables
 load_dotenv()
@@ -38,6 +47,14 @@ app.add_middleware(
 
 # Include API routers
 app.include_router(products_router, prefix="/api", tags=["products"])
+app.include_router(export_router, prefix="/api", tags=["export"])
+app.include_router(metrics_router, prefix="/api", tags=["metrics"])
+app.include_router(readiness_router, tags=["health"])
+
+# Chat pipeline (CHAT_PIPELINE selects the engine, working by default)
+chat_pipeline = configured_pipeline("working")
+# Candidate pipeline diffed against it on sampled sessions (SHADOW_SAMPLE_RATE)
+shadow_runner = configured_shadow("working", chat_pipeline)
 
 # Pydantic models for requests/responses
 class ChatRequest(BaseModel):
@@ -69,10 +86,25 @@ async def startup_event():
                 print("🔧 Run: python scripts/populate_database.py")
             else:
                 print(f"✅ Found {count} products in database")
+            
+            # First start after upgrading - seed the running analytics aggregates
+            summary = analytics_service.get_summary(conn)
+            has_conversations = conn.execute("SELECT EXISTS(SELECT 1 FROM conversations)").fetchone()[0]
+            if summary['total_conversations'] == 0 and has_conversations:
+                print("📊 Backfilling analytics aggregates...")
+                analytics_service.backfill()
     except Exception as e:
         print(f"❌ Database check failed: {e}")
     
-    print("🚀 FoodieBot API is ready!")
+    # Caches, indexes and the generation backend; /ready flips once this is done
+    warmup_service.start(chat_pipeline)
+    print("🚀 FoodieBot API is up, warming up...")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write the live popularity counts and trending sketches still in memory"""
+    popularity_counter.flush()
+    trending_tracker.save()
 
 # API Endpoints
 @app.get("/")
@@ -84,6 +116,7 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "chat": "/api/chat",
+            "chat_stream": "/api/chat/stream",
             "products": "/api/products",
             "analytics": "/api/analytics"
         },
@@ -91,59 +124,26 @@ async def root():
     }
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+def chat_endpoint(request: ChatRequest):
     """
     Main chat endpoint - processes user messages and returns AI responses
-    with interest scoring and product recommendations
+    with interest scoring and product recommendations. A plain def, so FastAPI runs the
+    blocking pipeline in its threadpool and concurrent chats can share a generation batch
     """
     try:
-        # Calculate interest score (0-100%)
-        interest_score = scoring_service.calculate_interest_score(
-            request.message, 
-            request.session_id
-        )
-        
-        # Get user preferences and AI response
-        ai_response, preferences = ai_service.process_message(
-            request.message, 
-            request.session_id
-        )
-        
-        # Get product recommendations based on preferences
-        recommended_products = get_recommendations_from_preferences(preferences)
-        
-        # Update AI response with product information
-        if recommended_products:
-            final_response, _ = ai_service.process_message(
-                request.message, 
-                request.session_id, 
-                recommended_products
-            )
-        else:
-            final_response = ai_response
+        # Preferences, interest score (0-100%), recommendations and reply
+        turn = chat_pipeline.run(request.message, request.session_id)
+        shadow_runner.submit(turn)
+        popularity_counter.record_turn(turn)
+        trending_tracker.record_turn(turn)
         
         # Save conversation to database
-        db = get_db_manager()
-        with db.get_connection() as conn:
-            conn.execute("""
-            INSERT INTO conversations (
-                session_id, user_message, bot_response, interest_score, 
-                recommended_products, user_preferences
-            ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                request.session_id, 
-                request.message, 
-                final_response,
-                interest_score, 
-                json.dumps([p['product_id'] for p in recommended_products]),
-                json.dumps(preferences)
-            ))
-            conn.commit()
+        store_turn(turn)
         
         return ChatResponse(
-            response=final_response,
-            interest_score=interest_score,
-            recommended_products=recommended_products[:3],  # Top 3 recommendations
+            response=turn.response,
+            interest_score=turn.interest_score,
+            recommended_products=turn.products[:3],  # Top 3 recommendations
             session_id=request.session_id
         )
         
@@ -151,6 +151,64 @@ async def chat_endpoint(request: ChatRequest):
         print(f"Chat endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat over Server-Sent Events: a `meta` event with the interest score and
+    recommendations as soon as retrieval is done, `token` events while the reply is
+    generated, then `done` with the full reply
+    """
+    try:
+        turn, reply_chunks = chat_pipeline.stream(
+            request.message, 
+            request.session_id
+        )
+        shadow_runner.submit(turn)
+        popularity_counter.record_turn(turn)
+        trending_tracker.record_turn(turn)
+    except Exception as e:
+        print(f"Chat stream error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    def events():
+        yield sse_event("meta", {
+            "interest_score": turn.interest_score,
+            "recommended_products": turn.products[:3],
+            "session_id": request.session_id
+        })
+        
+        try:
+            for chunk in reply_chunks:
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            print(f"Chat stream generation error: {e}")
+        
+        # Store the turn once the full reply is known
+        try:
+            store_turn(turn)
+        except Exception as e:
+            print(f"Chat stream storage error: {e}")
+        
+        yield sse_event("done", {"response": turn.response})
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def store_turn(turn):
+    """Persist one chat turn and update the running analytics in the same transaction"""
+    db = get_db_manager()
+    with db.get_connection() as conn:
+        conversation_store.insert(
+            conn,
+            turn.session_id, 
+            turn.message, 
+            turn.response,
+            turn.interest_score, 
+            json.dumps([p['product_id'] for p in turn.products]),
+            json.dumps(turn.preferences)
+        )
+        analytics_service.record_conversation(conn, turn.session_id, turn.interest_score)
+        conn.commit()
+
 @app.get("/api/analytics")
 async def get_analytics():
     """Get conversation analytics and metrics"""
@@ -158,30 +216,18 @@ async def get_analytics():
         db = get_db_manager()
         
         with db.get_connection() as conn:
-            stats = {}
-            
-            # Total conversations
-            cursor = conn.execute("SELECT COUNT(*) FROM conversations")
-            stats['total_conversations'] = cursor.fetchone()[0]
-            
-            # Average interest score
-            cursor = conn.execute("SELECT AVG(interest_score) FROM conversations WHERE interest_score > 0")
-            avg_score = cursor.fetchone()[0]
-            stats['average_interest_score'] = round(avg_score, 1) if avg_score else 0
+            # Totals, average score and distinct sessions (HyperLogLog estimate)
+            stats = analytics_service.get_summary(conn)
             
-            # Active sessions
-            cursor = conn.execute("SELECT COUNT(DISTINCT session_id) FROM conversations")
-            stats['active_sessions'] = cursor.fetchone()[0]
+            # Per-hour rollups for the last day
+            stats['hourly'] = analytics_service.get_hourly(conn, hours=24)
             
-            # Recent conversations
-            cursor = conn.execute("""
-            SELECT user_message, bot_response, interest_score, timestamp 
-            FROM conversations 
-            ORDER BY timestamp DESC 
-            LIMIT 20
-            """)
+            # Recent conversations (newest partitions only)
+            rows = conversation_store.recent(
+                conn, limit=20, columns="user_message, bot_response, interest_score, timestamp"
+            )
             recent_conversations = []
-            for row in cursor.fetchall():
+            for row in rows:
                 recent_conversations.append({
                     "user_message": row[0][:100] + "..." if len(row[0]) > 100 else row[0],
                     "bot_response": row[1][:100] + "..." if len(row[1]) > 100 else row[1],
@@ -197,49 +243,6 @@ async def get_analytics():
         print(f"Analytics error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def get_recommendations_from_preferences(preferences: Dict) -> List[Dict]:
-    """Get product recommendations based on user preferences"""
-    if not preferences:
-        return []
-    
-    try:
-        db = get_db_manager()
-        
-        with db.get_connection() as conn:
-            query = "SELECT * FROM products WHERE 1=1"
-            params = []
-            
-            # Filter by budget
-            if 'max_budget' in preferences:
-                query += " AND price <= ?"
-                params.append(preferences['max_budget'])
-            
-            # Filter by dietary preferences
-            if 'dietary' in preferences:
-                for diet in preferences['dietary']:
-                    query += " AND (dietary_tags LIKE ? OR mood_tags LIKE ?)"
-                    params.extend([f"%{diet}%", f"%{diet}%"])
-            
-            # Filter by mood preferences
-            if 'mood' in preferences:
-                mood_conditions = []
-                for mood in preferences['mood']:
-                    mood_conditions.append("(mood_tags LIKE ? OR dietary_tags LIKE ?)")
-                    params.extend([f"%{mood}%", f"%{mood}%"])
-                if mood_conditions:
-                    query += " AND (" + " OR ".join(mood_conditions) + ")"
-            
-            query += " ORDER BY popularity_score DESC LIMIT 5"
-            
-            cursor = conn.execute(query, params)
-            rows = cursor.fetchall()
-            
-            return [db.parse_json_fields(dict(row)) for row in rows]
-            
-    except Exception as e:
-        print(f"Recommendation error: {e}")
-        return []
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,352 @@
+"""
+Day-partitioned conversation storage for FoodieBot
+Each recent UTC day lives in its own conversations_pYYYYMMDD table; older days are rolled
+into one conversations_archive table. `conversations` is a UNION ALL view over the archive
+and the live partitions so existing readers keep working
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+PARTITION_PREFIX = "conversations_p"
+ARCHIVE_TABLE = "conversations_archive"
+# SQLite refuses compound SELECTs of more than 500 terms - the view never names more
+MAX_VIEW_PARTITIONS = 400
+
+# New rows store 'YYYY-MM-DD HH:MM:SS', migrated ones ISO 8601 with a 'T' and microseconds;
+# compared and ordered through this expression both sort the same way
+TIMESTAMP_KEY = "replace(timestamp, 'T', ' ')"
+
+PARTITION_COLUMNS = [
+    'id', 'session_id', 'user_message', 'bot_response', 'interest_score',
+    'recommended_products', 'user_preferences', 'timestamp'
+]
+
+class ConversationStore:
+    def __init__(self, retention_days: int = 0, archive_dir: str = "./data/archive",
+                 live_partitions: int = 90):
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.live_partitions = max(1, min(live_partitions, MAX_VIEW_PARTITIONS))
+        self.known_partitions = set()
+        self.db_path = None
+        self.maintenance_lock = threading.Lock()
+
+    def ensure_schema(self, conn):
+        """Create today's partition and migrate a legacy conversations table"""
+        legacy = conn.execute(
+            "SELECT type FROM sqlite_master WHERE name = 'conversations'"
+        ).fetchone()
+
+        if legacy and legacy[0] == 'table':
+            self._migrate_legacy_table(conn)
+
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            user_message TEXT NOT NULL,
+            bot_response TEXT NOT NULL,
+            interest_score REAL DEFAULT 0.0,
+            recommended_products TEXT,
+            user_preferences TEXT,
+            timestamp TIMESTAMP
+        )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{ARCHIVE_TABLE}_timestamp ON {ARCHIVE_TABLE}(timestamp)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{ARCHIVE_TABLE}_session ON {ARCHIVE_TABLE}(session_id)")
+
+        self._ensure_partition(conn, self._partition_name(datetime.utcnow()), expire=False)
+
+    def insert(self, conn, session_id: str, user_message: str, bot_response: str,
+               interest_score: float, recommended_products: str, user_preferences: str) -> int:
+        """Store one turn in today's partition, returns the new row id"""
+        partition = self._partition_name(datetime.utcnow())
+        if partition not in self.known_partitions:
+            self._ensure_partition(conn, partition)
+
+        cursor = conn.execute(f"""
+        INSERT INTO {partition} (
+            session_id, user_message, bot_response, interest_score,
+            recommended_products, user_preferences
+        ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (session_id, user_message, bot_response, interest_score,
+              recommended_products, user_preferences))
+
+        return cursor.lastrowid
+
+    def recent(self, conn, limit: int = 20, columns: str = "*") -> List:
+        """Newest turns first, reading only as many partitions as needed"""
+        rows = []
+        for partition in list(reversed(self.list_partitions(conn))) + [ARCHIVE_TABLE]:
+            remaining = limit - len(rows)
+            if remaining <= 0:
+                break
+            cursor = conn.execute(
+                f"SELECT {columns} FROM {partition} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (remaining,)
+            )
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def start_maintenance(self, db_path: Optional[str] = None):
+        """Run retention and the archive roll-up on a background thread with its own connection"""
+        self.db_path = db_path or self.db_path
+        if not self.db_path:
+            return
+        threading.Thread(target=self.run_maintenance, name="conversation-maintenance", daemon=True).start()
+
+    def run_maintenance(self, db_path: Optional[str] = None, vacuum: bool = False, wait: bool = False):
+        """
+        Expire days past the retention window and roll days beyond the live partitions
+        into the archive table. VACUUM locks the whole database, so it only runs on request
+        (scripts/maintain_conversations.py --vacuum); freed pages are reused by new rows anyway
+        """
+        # A run already in progress covers this one unless the caller waits for it
+        if not self.maintenance_lock.acquire(blocking=wait):
+            return
+        try:
+            with sqlite3.connect(db_path or self.db_path, timeout=30) as conn:
+                self.apply_retention(conn)
+                self.roll_up(conn)
+                if vacuum:
+                    conn.execute("VACUUM")
+        except Exception as e:
+            print(f"⚠️ Conversation maintenance failed: {e}")
+        finally:
+            self.maintenance_lock.release()
+
+    def partition_queries(self, conn, conditions: List[str], params: List,
+                          since: Optional[str] = None,
+                          after_id: Optional[int] = None) -> Iterator[Tuple[str, List]]:
+        """
+        Yield one query per partition that can hold rows from `since` on, oldest first.
+        `since` is 'YYYY-MM-DD HH:MM:SS[.ffffff]'; with `after_id` the export resumes
+        strictly after that (timestamp, id), otherwise `since` is inclusive
+        """
+        for partition in [ARCHIVE_TABLE] + self.list_partitions(conn):
+            if since and partition != ARCHIVE_TABLE and self._partition_day(partition) < since[:10]:
+                continue
+
+            query = f"SELECT * FROM {partition}"
+            query_params = list(params)
+            where = list(conditions)
+            if since and after_id is not None:
+                where.append(f"({TIMESTAMP_KEY} > ? OR ({TIMESTAMP_KEY} = ? AND id > ?))")
+                query_params.extend([since, since, after_id])
+            elif since:
+                where.append(f"{TIMESTAMP_KEY} >= ?")
+                query_params.append(since)
+            if where:
+                query += " WHERE " + " AND ".join(where)
+            query += f" ORDER BY {TIMESTAMP_KEY}, id"
+
+            yield query, query_params
+
+    def list_partitions(self, conn) -> List[str]:
+        """Live partition tables, oldest first"""
+        cursor = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ? ORDER BY name",
+            (f"{PARTITION_PREFIX}[0-9]*",)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def apply_retention(self, conn, retention_days: Optional[int] = None) -> List[str]:
+        """
+        Archive partitions older than the retention window to gzipped NDJSON and drop them
+        (retention_days <= 0 keeps everything)
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        if retention_days <= 0:
+            return []
+
+        cutoff_day = datetime.utcnow() - timedelta(days=retention_days)
+        cutoff = self._partition_name(cutoff_day)
+        expired = [name for name in self.list_partitions(conn) if name < cutoff]
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archived = []
+        for partition in expired:
+            archive_path = os.path.join(self.archive_dir, f"{partition}.ndjson.gz")
+            # Another worker may be expiring the same day - the write lock and the existence
+            # check make sure exactly one of them exports it before it is dropped
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (partition,)).fetchone():
+                    self._write_archive(conn, f"SELECT * FROM {partition} ORDER BY id", [], archive_path)
+                    conn.execute(f"DROP TABLE {partition}")
+                    self._rebuild_view(conn)
+                    archived.append(partition)
+                    print(f"🗄️ Archived {partition} to {archive_path}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self.known_partitions.discard(partition)
+
+        # Rolled-up days past the window leave the archive table the same way
+        cutoff_text = cutoff_day.strftime('%Y-%m-%d')
+        archive_path = os.path.join(self.archive_dir, f"{ARCHIVE_TABLE}_before_{cutoff[len(PARTITION_PREFIX):]}.ndjson.gz")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._has_archive(conn) and conn.execute(
+                f"SELECT 1 FROM {ARCHIVE_TABLE} WHERE {TIMESTAMP_KEY} < ? LIMIT 1", (cutoff_text,)
+            ).fetchone():
+                self._write_archive(conn, f"SELECT * FROM {ARCHIVE_TABLE} WHERE {TIMESTAMP_KEY} < ? ORDER BY id",
+                                    [cutoff_text], archive_path)
+                conn.execute(f"DELETE FROM {ARCHIVE_TABLE} WHERE {TIMESTAMP_KEY} < ?", (cutoff_text,))
+                archived.append(ARCHIVE_TABLE)
+                print(f"🗄️ Archived rolled-up days before {cutoff_text} to {archive_path}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return archived
+
+    def roll_up(self, conn) -> List[str]:
+        """Move the days beyond the newest live_partitions into the archive table"""
+        rolled = []
+        if not self._has_archive(conn):
+            return rolled
+        columns = ", ".join(PARTITION_COLUMNS)
+        for partition in self.list_partitions(conn)[:-self.live_partitions]:
+            # One short transaction per day, so chat inserts only ever wait for one of them
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (partition,)).fetchone():
+                conn.execute(f"INSERT INTO {ARCHIVE_TABLE} ({columns}) SELECT {columns} FROM {partition}")
+                conn.execute(f"DROP TABLE {partition}")
+                self._rebuild_view(conn)
+                rolled.append(partition)
+            conn.commit()
+            self.known_partitions.discard(partition)
+
+        if rolled:
+            print(f"🗄️ Rolled {len(rolled)} daily partitions into {ARCHIVE_TABLE}")
+        return rolled
+
+    def _write_archive(self, conn, query: str, params: List, archive_path: str):
+        """Export to a temporary file and move it into place only once it is complete"""
+        temporary = f"{archive_path}.tmp{os.getpid()}"
+        try:
+            with gzip.open(temporary, 'wt', encoding='utf-8') as archive:
+                cursor = conn.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(500)
+                    if not rows:
+                        break
+                    for row in rows:
+                        archive.write(json.dumps(dict(zip(PARTITION_COLUMNS, row)), default=str) + "\n")
+            os.replace(temporary, archive_path)
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    @staticmethod
+    def _has_archive(conn) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ARCHIVE_TABLE,)
+        ).fetchone() is not None
+
+    def _ensure_partition(self, conn, partition: str, expire: bool = True):
+        """
+        Create a partition table, seed its id sequence and refresh the view. A new day
+        hands retention and the roll-up to a background thread (expire=True)
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (partition,)
+        ).fetchone()
+
+        if not exists:
+            # Continue ids from the newest existing partition so they stay globally unique
+            last_id = 0
+            partitions = self.list_partitions(conn)
+            if partitions:
+                last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {partitions[-1]}").fetchone()[0]
+            elif self._has_archive(conn):
+                last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {ARCHIVE_TABLE}").fetchone()[0]
+
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                user_message TEXT NOT NULL,
+                bot_response TEXT NOT NULL,
+                interest_score REAL DEFAULT 0.0,
+                recommended_products TEXT,
+                user_preferences TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{partition}_timestamp ON {partition}(timestamp)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{partition}_session ON {partition}(session_id)")
+
+            if last_id:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (partition, last_id))
+
+            self._rebuild_view(conn)
+            conn.commit()
+
+            # A new day started - expire and roll up old partitions off the request path
+            if expire:
+                self.start_maintenance()
+
+        self.known_partitions.add(partition)
+
+    def _rebuild_view(self, conn):
+        """
+        Point the conversations view at the archive and the newest partitions. Days past
+        MAX_VIEW_PARTITIONS (only before a pending roll-up) drop out of the view until rolled
+        """
+        sources = self.list_partitions(conn)[-MAX_VIEW_PARTITIONS:]
+        if self._has_archive(conn):
+            sources.insert(0, ARCHIVE_TABLE)
+        columns = ", ".join(PARTITION_COLUMNS)
+
+        conn.execute("DROP VIEW IF EXISTS conversations")
+        if sources:
+            union = " UNION ALL ".join(f"SELECT {columns} FROM {name}" for name in sources)
+            conn.execute(f"CREATE VIEW conversations AS {union}")
+
+    def _migrate_legacy_table(self, conn):
+        """Split the old single conversations table into day partitions"""
+        print("🔧 Migrating conversations table to daily partitions...")
+
+        conn.execute("ALTER TABLE conversations RENAME TO conversations_legacy")
+
+        days = conn.execute("""
+        SELECT DISTINCT substr(replace(COALESCE(timestamp, CURRENT_TIMESTAMP), 'T', ' '), 1, 10)
+        FROM conversations_legacy
+        ORDER BY 1
+        """).fetchall()
+
+        columns = ", ".join(PARTITION_COLUMNS)
+        for (day,) in days:
+            partition = PARTITION_PREFIX + day.replace('-', '')
+            self._ensure_partition(conn, partition, expire=False)
+            conn.execute(f"""
+            INSERT INTO {partition} ({columns})
+            SELECT {columns} FROM conversations_legacy
+            WHERE substr(replace(COALESCE(timestamp, CURRENT_TIMESTAMP), 'T', ' '), 1, 10) = ?
+            """, (day,))
+
+        conn.execute("DROP TABLE conversations_legacy")
+        self._rebuild_view(conn)
+        conn.commit()
+
+        print(f"✅ Migrated conversations into {len(days)} daily partitions")
+
+    @staticmethod
+    def _partition_name(moment: datetime) -> str:
+        return PARTITION_PREFIX + moment.strftime('%Y%m%d')
+
+    @staticmethod
+    def _partition_day(partition: str) -> str:
+        day = partition[len(PARTITION_PREFIX):]
+        return f"{day[:4]}-{day[4:6]}-{day[6:]}"
@@ -8,6 +8,18 @@ import json
 import os
 from typing import Dict, List, Optional, Any
 from contextlib import contextmanager
+from app.config.settings import CONVERSATION_RETENTION_DAYS, CONVERSATION_ARCHIVE_DIR, CONVERSATION_LIVE_PARTITIONS
+from app.models.conversation_store import ConversationStore
+
+# Day-partitioned conversation log
+conversation_store = ConversationStore(
+    retention_days=CONVERSATION_RETENTION_DAYS,
+    archive_dir=CONVERSATION_ARCHIVE_DIR,
+    live_partitions=CONVERSATION_LIVE_PARTITIONS
+)
+
+# Stored in PRAGMA user_version - bump it whenever the schema below changes
+SCHEMA_VERSION = 4
 
 class DatabaseManager:
     def __init__(self, db_path: str):
@@ -20,6 +32,11 @@ class DatabaseManager:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
         with sqlite3.connect(self.db_path) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+                # Schema is current - skip the DDL, old conversation days are handled in the background
+                conversation_store.start_maintenance(self.db_path)
+                return
+            
             # Create products table
             conn.execute("""
             CREATE TABLE IF NOT EXISTS products (
@@ -44,27 +61,52 @@ class DatabaseManager:
             )
             """)
             
-            # Create conversations table
+            # Create conversation partitions (and the conversations view over them)
+            conversation_store.ensure_schema(conn)
+            
+            # Running analytics aggregates (maintained on insert, see analytics_service)
             conn.execute("""
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                user_message TEXT NOT NULL,
-                bot_response TEXT NOT NULL,
-                interest_score REAL DEFAULT 0.0,
-                recommended_products TEXT,
-                user_preferences TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS analytics_totals (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_conversations INTEGER NOT NULL DEFAULT 0,
+                scored_conversations INTEGER NOT NULL DEFAULT 0,
+                interest_score_sum REAL NOT NULL DEFAULT 0.0,
+                session_hll BLOB
+            )
+            """)
+            conn.execute("INSERT OR IGNORE INTO analytics_totals (id) VALUES (1)")
+            
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS analytics_hourly (
+                hour TEXT PRIMARY KEY,
+                conversations INTEGER NOT NULL DEFAULT 0,
+                scored_conversations INTEGER NOT NULL DEFAULT 0,
+                interest_score_sum REAL NOT NULL DEFAULT 0.0
+            )
+            """)
+            
+            # Live popularity: decayed demand per product (see popularity_counter)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS product_demand (
+                product_id TEXT PRIMARY KEY,
+                prior INTEGER NOT NULL,
+                demand REAL NOT NULL DEFAULT 0.0,
+                updated_at REAL NOT NULL
             )
             """)
             
             # Create indexes for performance
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_product_category ON products(category)")
+            # "Most popular in a category" reads straight off this one; it also covers plain category lookups
+            conn.execute("DROP INDEX IF EXISTS idx_product_category")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_product_category_popularity ON products(category, popularity_score DESC, id)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_product_price ON products(price)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversation_session ON conversations(session_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_product_popularity ON products(popularity_score DESC, id)")
             
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             conn.commit()
             print("Database tables created successfully")
+
+        conversation_store.start_maintenance(self.db_path)
     
     @contextmanager
     def get_connection(self):
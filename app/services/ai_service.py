@@ -3,66 +3,50 @@ Simple Working AI Service - GUARANTEED TO WORK
 """
 
 import os
-import requests
 import json
 import sqlite3
 import random
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 from dotenv import load_dotenv
+from app.config.settings import DATABASE_URL, HF_MODELS
+from app.models.database import get_db_manager
+from app.services.generation_backend import create_backend
+from app.services.batch_scheduler import MicroBatchScheduler
+from app.services.preference_extractor import preference_extractor
+from app.utils.streaming import chunk_text
 
 load_dotenv()
 
+API_PARAMETERS = {"max_new_tokens": 60, "temperature": 0.7}
+
 class WorkingAIService:
     def __init__(self):
         self.hf_key = os.getenv("HUGGINGFACE_API_KEY")
-        self.db_path = "./data/foodiebot.db"
+        self.db_path = DATABASE_URL
         self.user_sessions = {}
+        # Primary model only when generating through the HuggingFace API
+        self.backend = create_backend(models=HF_MODELS[:1])
+        # Concurrent sessions share batched backend calls
+        self.scheduler = MicroBatchScheduler(self.backend, name="working_ai")
         
     def process_message(self, user_message: str, session_id: str, 
                        recommended_products: List[Dict] = None) -> Tuple[str, Dict]:
         """Simple working message processing"""
         
         # Extract preferences
-        preferences = self._extract_preferences(user_message)
+        preferences = self.extract_preferences(user_message)
         
         # Get products from database
         products = self._get_products_from_db(user_message, preferences)
         
         # Generate response
-        response = self._generate_response(user_message, products, session_id)
+        response = self.generate_response(user_message, products, session_id)
         
         return response, preferences
     
-    def _extract_preferences(self, message: str) -> Dict:
-        """Extract preferences simply"""
-        message_lower = message.lower()
-        preferences = {}
-        
-        # Categories
-        if 'pizza' in message_lower:
-            preferences['categories'] = ['Pizza']
-        elif 'burger' in message_lower:
-            preferences['categories'] = ['Burgers']
-        elif 'dessert' in message_lower or 'sweet' in message_lower:
-            preferences['categories'] = ['Desserts']
-        elif 'drink' in message_lower:
-            preferences['categories'] = ['Beverages']
-        elif 'salad' in message_lower or 'healthy' in message_lower:
-            preferences['categories'] = ['Salads & Healthy Options']
-        
-        # Dietary
-        if 'vegetarian' in message_lower:
-            preferences['dietary'] = ['vegetarian']
-        elif 'vegan' in message_lower:
-            preferences['dietary'] = ['vegan']
-        
-        # Mood
-        if 'spicy' in message_lower or 'hot' in message_lower:
-            preferences['mood'] = ['spicy']
-        elif 'sweet' in message_lower:
-            preferences['mood'] = ['sweet']
-        
-        return preferences
+    def extract_preferences(self, message: str) -> Dict:
+        """Extract preferences from the current message"""
+        return preference_extractor.extract(message)
     
     def _get_products_from_db(self, message: str, preferences: Dict) -> List[Dict]:
         """Get products from database"""
@@ -114,16 +98,78 @@ class WorkingAIService:
             print(f"Database error: {e}")
             return []
     
-    def _generate_response(self, message: str, products: List[Dict], session_id: str) -> str:
+    def recommend_products(self, preferences: Dict) -> List[Dict]:
+        """Get product recommendations based on user preferences"""
+        if not preferences:
+            return []
+        
+        try:
+            db = get_db_manager()
+            
+            with db.get_connection() as conn:
+                query = "SELECT * FROM products WHERE 1=1"
+                params = []
+                
+                # Filter by budget
+                if 'max_budget' in preferences:
+                    query += " AND price <= ?"
+                    params.append(preferences['max_budget'])
+                
+                # Filter by dietary preferences
+                if 'dietary' in preferences:
+                    for diet in preferences['dietary']:
+                        query += " AND (dietary_tags LIKE ? OR mood_tags LIKE ?)"
+                        params.extend([f"%{diet}%", f"%{diet}%"])
+                
+                # Filter by mood preferences
+                if 'mood' in preferences:
+                    mood_conditions = []
+                    for mood in preferences['mood']:
+                        mood_conditions.append("(mood_tags LIKE ? OR dietary_tags LIKE ?)")
+                        params.extend([f"%{mood}%", f"%{mood}%"])
+                    if mood_conditions:
+                        query += " AND (" + " OR ".join(mood_conditions) + ")"
+                
+                query += " ORDER BY popularity_score DESC LIMIT 5"
+                
+                cursor = conn.execute(query, params)
+                rows = cursor.fetchall()
+                
+                return [db.parse_json_fields(dict(row)) for row in rows]
+        
+        except Exception as e:
+            print(f"Recommendation error: {e}")
+            return []
+    
+    def generate_response(self, message: str, products: List[Dict], session_id: str) -> str:
         """Generate response using API or simple logic"""
         
-        # Try HuggingFace API
-        if self.hf_key and products:
+        # Try the generation backend
+        if self.backend.available and products:
             api_response = self._try_api(message, products[0])
             if api_response:
                 return api_response
         
-        # Simple contextual responses
+        return self._template_response(message, products)
+    
+    def stream_response(self, message: str, products: List[Dict]) -> Iterator[str]:
+        """Yield the reply in chunks - model tokens as they arrive, else the template reply"""
+        if self.backend.available and products:
+            streamed = False
+            for token in self.backend.stream(
+                self._api_prompt(message, products[0]),
+                API_PARAMETERS,
+                self._accept_api_reply
+            ):
+                streamed = True
+                yield token
+            if streamed:
+                return
+        
+        yield from chunk_text(self._template_response(message, products))
+    
+    def _template_response(self, message: str, products: List[Dict]) -> str:
+        """Simple contextual responses"""
         message_lower = message.lower()
         
         # Greetings
@@ -158,32 +204,27 @@ class WorkingAIService:
                 return "I'd love to help you find something delicious! What type of food are you in the mood for? Pizza, burgers, something healthy, or maybe a sweet treat?"
     
     def _try_api(self, message: str, product: Dict) -> str:
-        """Try HuggingFace API"""
+        """Try the configured generation backend"""
         try:
-            url = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
-            headers = {"Authorization": f"Bearer {self.hf_key}"}
-            
-            context = f"User wants food. Recommend: {product['name']} (${product['price']:.2f}). User said: {message}"
-            
-            payload = {
-                "inputs": f"{context}\nFoodieBot:",
-                "parameters": {"max_new_tokens": 60, "temperature": 0.7},
-                "options": {"wait_for_model": True}
-            }
+            reply = self.scheduler.generate(
+                self._api_prompt(message, product),
+                API_PARAMETERS,
+                self._accept_api_reply
+            )
             
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if isinstance(result, list) and len(result) > 0:
-                    generated = result[0].get('generated_text', '')
-                    if 'FoodieBot:' in generated:
-                        return generated.split('FoodieBot:')[-1].strip()
-            
-            return None
+            return reply or None
             
         except:
             return None
+    
+    def _api_prompt(self, message: str, product: Dict) -> str:
+        context = f"User wants food. Recommend: {product['name']} (${product['price']:.2f}). User said: {message}"
+        return f"{context}\nFoodieBot:"
+    
+    def _accept_api_reply(self, generated: str) -> str:
+        if 'FoodieBot:' in generated:
+            return generated.split('FoodieBot:')[-1].strip()
+        return ""
 
 # Global service
 ai_service = WorkingAIService()
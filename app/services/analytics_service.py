@@ -0,0 +1,179 @@
+"""
+Incremental Analytics Service
+Running aggregates are updated with every stored conversation so analytics reads are O(1)
+"""
+
+import hashlib
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.models.database import get_db_manager
+
+class HyperLogLog:
+    """Fixed-size distinct counter (~1.6% standard error at precision 12)"""
+
+    def __init__(self, precision: int = 12, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+
+    def add(self, value: str) -> bool:
+        """Add a value, returns True when a register changed"""
+        hashed = int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], 'big')
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other: 'HyperLogLog'):
+        """Take the register-wise maximum of two sketches"""
+        for i, rank in enumerate(other.registers):
+            if rank > self.registers[i]:
+                self.registers[i] = rank
+
+    def count(self) -> int:
+        """Estimate the number of distinct values"""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -rank for rank in self.registers)
+
+        # Small range correction (linear counting)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+class AnalyticsService:
+    def record_conversation(self, conn, session_id: str, interest_score: float,
+                            timestamp: Optional[datetime] = None):
+        """
+        Update running aggregates for one stored turn, inside the caller's transaction
+        """
+        timestamp = timestamp or datetime.utcnow()
+        hour = timestamp.strftime('%Y-%m-%d %H:00')
+        scored = 1 if interest_score and interest_score > 0 else 0
+        score = interest_score if scored else 0.0
+
+        conn.execute("""
+        UPDATE analytics_totals
+        SET total_conversations = total_conversations + 1,
+            scored_conversations = scored_conversations + ?,
+            interest_score_sum = interest_score_sum + ?
+        WHERE id = 1
+        """, (scored, score))
+
+        conn.execute("""
+        INSERT INTO analytics_hourly (hour, conversations, scored_conversations, interest_score_sum)
+        VALUES (?, 1, ?, ?)
+        ON CONFLICT(hour) DO UPDATE SET
+            conversations = conversations + 1,
+            scored_conversations = scored_conversations + excluded.scored_conversations,
+            interest_score_sum = interest_score_sum + excluded.interest_score_sum
+        """, (hour, scored, score))
+
+        # Most sessions land in an already-saturated register - only rewrite on change
+        row = conn.execute("SELECT session_hll FROM analytics_totals WHERE id = 1").fetchone()
+        sketch = HyperLogLog(registers=row[0] if row else None)
+        if sketch.add(session_id):
+            conn.execute("UPDATE analytics_totals SET session_hll = ? WHERE id = 1", (sketch.to_bytes(),))
+
+    def get_summary(self, conn) -> Dict:
+        """Read the running totals (constant time regardless of table size)"""
+        row = conn.execute("""
+        SELECT total_conversations, scored_conversations, interest_score_sum, session_hll
+        FROM analytics_totals WHERE id = 1
+        """).fetchone()
+
+        if not row:
+            return {'total_conversations': 0, 'average_interest_score': 0, 'active_sessions': 0}
+
+        total, scored, score_sum, registers = row
+        average = score_sum / scored if scored else 0
+
+        return {
+            'total_conversations': total,
+            'average_interest_score': round(average, 1) if average else 0,
+            'active_sessions': HyperLogLog(registers=registers).count() if registers else 0
+        }
+
+    def get_hourly(self, conn, hours: int = 24) -> List[Dict]:
+        """Read the most recent hourly rollups"""
+        cursor = conn.execute("""
+        SELECT hour, conversations, scored_conversations, interest_score_sum
+        FROM analytics_hourly
+        ORDER BY hour DESC
+        LIMIT ?
+        """, (hours,))
+
+        return [
+            {
+                "hour": hour,
+                "conversations": conversations,
+                "average_interest_score": round(score_sum / scored, 1) if scored else 0
+            }
+            for hour, conversations, scored, score_sum in cursor.fetchall()
+        ]
+
+    def backfill(self, batch_size: int = 1000) -> Dict:
+        """
+        Rebuild every aggregate from the conversations view - the daily partitions and the
+        conversations_archive table. Days exported to gzipped NDJSON by retention are not included
+        """
+        db = get_db_manager()
+        sketch = HyperLogLog()
+        hourly = {}
+        total = scored_total = 0
+        score_sum_total = 0.0
+
+        with db.get_connection() as conn:
+            cursor = conn.execute("SELECT session_id, interest_score, timestamp FROM conversations")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for session_id, interest_score, timestamp in rows:
+                    scored = 1 if interest_score and interest_score > 0 else 0
+                    score = interest_score if scored else 0.0
+                    hour = self._hour_key(timestamp)
+
+                    total += 1
+                    scored_total += scored
+                    score_sum_total += score
+                    sketch.add(session_id)
+
+                    bucket = hourly.setdefault(hour, [0, 0, 0.0])
+                    bucket[0] += 1
+                    bucket[1] += scored
+                    bucket[2] += score
+
+            conn.execute("DELETE FROM analytics_hourly")
+            conn.executemany("""
+            INSERT INTO analytics_hourly (hour, conversations, scored_conversations, interest_score_sum)
+            VALUES (?, ?, ?, ?)
+            """, [(hour, *values) for hour, values in hourly.items()])
+            conn.execute("""
+            UPDATE analytics_totals
+            SET total_conversations = ?, scored_conversations = ?,
+                interest_score_sum = ?, session_hll = ?
+            WHERE id = 1
+            """, (total, scored_total, score_sum_total, sketch.to_bytes()))
+            conn.commit()
+
+        return {'conversations': total, 'hours': len(hourly), 'sessions': sketch.count()}
+
+    @staticmethod
+    def _hour_key(timestamp: Optional[str]) -> str:
+        """Normalize stored timestamps ('YYYY-MM-DD HH:MM:SS' or ISO 8601) to an hour key"""
+        if not timestamp:
+            return datetime.utcnow().strftime('%Y-%m-%d %H:00')
+        return str(timestamp).replace('T', ' ')[:13] + ':00'
+
+# Global analytics service
+analytics_service = AnalyticsService()
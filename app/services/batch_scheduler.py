@@ -0,0 +1,190 @@
+"""
+Micro-batching Scheduler - Coalesce concurrent generation requests
+Prompts arriving within a short window are sent to the backend as one batched call
+and each caller gets its own reply back through a future
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, InvalidStateError, TimeoutError
+from typing import Callable, Dict, List, Optional
+from app.config.settings import (
+    GENERATION_BATCH_WINDOW_MS, GENERATION_MAX_BATCH, GENERATION_BATCH_WORKERS, GENERATION_LATENCY_BUDGET
+)
+from app.services.generation_backend import GenerationBackend, generation_backend
+
+class PendingGeneration:
+    def __init__(self, prompt: str, parameters: Dict, accept: Callable[[str], str]):
+        self.prompt = prompt
+        self.parameters = parameters
+        self.accept = accept
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def group_key(self):
+        """Only requests with the same parameters and reply parser can share a batch"""
+        return json.dumps(self.parameters, sort_keys=True), self.accept
+
+class MicroBatchScheduler:
+    # Every scheduler, for the metrics endpoint
+    instances = []
+
+    def __init__(self, backend: GenerationBackend, name: Optional[str] = None,
+                 window_ms: float = GENERATION_BATCH_WINDOW_MS, max_batch: int = GENERATION_MAX_BATCH,
+                 workers: int = GENERATION_BATCH_WORKERS, budget: float = GENERATION_LATENCY_BUDGET):
+        self.backend = backend
+        self.name = name or backend.name
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        # Callers stop waiting a little after the backend's own budget, so a lost batch cannot hang them
+        self.timeout = budget + self.window + 1.0
+        self.queue: List[PendingGeneration] = []
+        self.condition = threading.Condition()
+        self.collector = None
+        # Batches run here so the collector keeps gathering while a batch is in flight
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"batch-{self.name}")
+
+        self.batches = 0
+        self.requests = 0
+        self.deduplicated = 0
+        self.timeouts = 0
+        self.max_batch_seen = 0
+        self.batch_sizes = deque(maxlen=500)
+        self.queue_delays = deque(maxlen=500)
+
+        MicroBatchScheduler.instances.append(self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend.batched and self.window > 0 and self.max_batch > 1
+
+    def generate(self, prompt: str, parameters: Dict, accept: Callable[[str], str],
+                 timeout: Optional[float] = None) -> str:
+        """Blocking call for one session - returns once its batch has finished ("" if it never does)"""
+        if not self.enabled:
+            return self.backend.generate(prompt, parameters, accept)
+        future = self.submit(prompt, parameters, accept)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            print(f"⏱️ Batch {self.name} did not answer in time, falling back")
+            return ""
+
+    def submit(self, prompt: str, parameters: Dict, accept: Callable[[str], str]) -> Future:
+        pending = PendingGeneration(prompt, parameters, accept)
+
+        with self.condition:
+            if self.collector is None:
+                self.collector = threading.Thread(target=self._collect, name=f"batch-collector-{self.name}", daemon=True)
+                self.collector.start()
+            self.queue.append(pending)
+            self.condition.notify()
+
+        return pending.future
+
+    def get_stats(self) -> Dict:
+        sizes = list(self.batch_sizes)
+        delays = sorted(self.queue_delays)
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "deduplicated_prompts": self.deduplicated,
+            "timeouts": self.timeouts,
+            "average_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0,
+            "max_batch_size": self.max_batch_seen,
+            "average_queue_delay_ms": round(sum(delays) / len(delays) * 1000, 2) if delays else 0,
+            "p95_queue_delay_ms": round(delays[min(len(delays) - 1, int(len(delays) * 0.95))] * 1000, 2) if delays else 0,
+            "queued": len(self.queue)
+        }
+
+    def _collect(self):
+        """Wait for the window to close (or the batch to fill), then hand the batch off"""
+        while True:
+            with self.condition:
+                while not self.queue:
+                    self.condition.wait()
+
+                closes_at = self.queue[0].enqueued_at + self.window
+                while len(self.queue) < self.max_batch:
+                    remaining = closes_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                batch = self.queue[:self.max_batch]
+                del self.queue[:self.max_batch]
+
+            groups = {}
+            for pending in batch:
+                groups.setdefault(pending.group_key, []).append(pending)
+            for group in groups.values():
+                self.executor.submit(self._run_batch, group)
+
+    def _run_batch(self, group: List[PendingGeneration]):
+        try:
+            self._generate_group(group)
+        except Exception as e:
+            print(f"Batch generation error: {e}")
+        finally:
+            # Every caller gets an answer, whatever happened above
+            for pending in group:
+                self._resolve(pending, "")
+
+    def _generate_group(self, group: List[PendingGeneration]):
+        started = time.monotonic()
+        for pending in group:
+            self.queue_delays.append(started - pending.enqueued_at)
+
+        parameters = group[0].parameters
+        # Greedy decoding gives identical prompts identical replies - generate each once
+        deterministic = not (parameters.get('temperature', 0) > 0 and parameters.get('do_sample', True))
+        if deterministic:
+            prompts = list(dict.fromkeys(pending.prompt for pending in group))
+        else:
+            prompts = [pending.prompt for pending in group]
+
+        self.batches += 1
+        self.requests += len(group)
+        self.deduplicated += len(group) - len(prompts)
+        self.batch_sizes.append(len(prompts))
+        self.max_batch_seen = max(self.max_batch_seen, len(prompts))
+
+        try:
+            replies = self.backend.generate_batch(prompts, parameters, group[0].accept)
+        except Exception as e:
+            print(f"Batch generation error: {e}")
+            replies = [""] * len(prompts)
+
+        replies = list(replies or [])
+        if len(replies) < len(prompts):
+            print(f"⚠️ Batch {self.name} returned {len(replies)} replies for {len(prompts)} prompts")
+            replies += [""] * (len(prompts) - len(replies))
+
+        if deterministic:
+            by_prompt = dict(zip(prompts, replies))
+            for pending in group:
+                self._resolve(pending, by_prompt.get(pending.prompt, ""))
+        else:
+            for pending, reply in zip(group, replies):
+                self._resolve(pending, reply)
+
+    @staticmethod
+    def _resolve(pending: PendingGeneration, reply: str):
+        """Set a caller's reply unless it already has one or gave up waiting"""
+        if pending.future.done():
+            return
+        try:
+            pending.future.set_result(reply)
+        except InvalidStateError:
+            pass
+
+# Global scheduler in front of the shared generation backend
+generation_scheduler = MicroBatchScheduler(generation_backend, name="shared")
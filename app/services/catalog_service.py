@@ -0,0 +1,181 @@
+"""
+Catalog Service - Product listing with keyset pagination
+Pages are ordered by (popularity_score DESC, id) and addressed by an opaque cursor
+"""
+
+import base64
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import PRODUCT_COUNT_CACHE_TTL, PRODUCT_COUNT_CACHE_SIZE
+from app.models.database import get_db_manager
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+class CatalogService:
+    def __init__(self, count_cache_ttl: float = PRODUCT_COUNT_CACHE_TTL,
+                 count_cache_size: int = PRODUCT_COUNT_CACHE_SIZE):
+        self.count_cache_ttl = count_cache_ttl
+        self.count_cache_size = count_cache_size
+        self.count_cache = {}
+
+    def get_products_page(self, category: Optional[str] = None, search: Optional[str] = None,
+                          min_price: Optional[float] = None, max_price: Optional[float] = None,
+                          limit: int = 24, cursor: Optional[str] = None) -> Dict:
+        """
+        Return one page of products plus the total match count and the next cursor
+        """
+        conditions, params = self.build_filters(category, search, min_price, max_price)
+        db = get_db_manager()
+
+        with db.get_connection() as conn:
+            total = self.count_products(conn, conditions, params)
+
+            page_conditions = list(conditions)
+            page_params = list(params)
+
+            # Keyset predicate: the leading range on popularity_score lets SQLite
+            # seek into idx_product_popularity instead of skipping earlier pages
+            if cursor:
+                last_popularity, last_id = self.decode_cursor(cursor)
+                page_conditions.append("popularity_score <= ? AND (popularity_score < ? OR id > ?)")
+                page_params.extend([last_popularity, last_popularity, last_id])
+
+            query = "SELECT * FROM products"
+            if page_conditions:
+                query += " WHERE " + " AND ".join(page_conditions)
+
+            # Fetch one extra row to know whether another page exists
+            query += " ORDER BY popularity_score DESC, id ASC LIMIT ?"
+            page_params.append(limit + 1)
+
+            rows = conn.execute(query, page_params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        products = [db.parse_json_fields(dict(row)) for row in rows]
+
+        next_cursor = None
+        if has_more and products:
+            last = products[-1]
+            next_cursor = self.encode_cursor(last['popularity_score'], last['id'])
+
+        return {
+            "products": products,
+            "total": total,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
+
+    def build_filters(self, category: Optional[str] = None, search: Optional[str] = None,
+                      min_price: Optional[float] = None,
+                      max_price: Optional[float] = None) -> Tuple[List[str], List]:
+        """Build WHERE conditions and parameters for the product filters"""
+        conditions = []
+        params = []
+
+        if category and category != "all":
+            conditions.append("category = ?")
+            params.append(category)
+
+        if search:
+            conditions.append("(name LIKE ? OR description LIKE ?)")
+            params.extend([f"%{search}%", f"%{search}%"])
+
+        if min_price is not None:
+            conditions.append("price >= ?")
+            params.append(min_price)
+
+        if max_price is not None:
+            conditions.append("price <= ?")
+            params.append(max_price)
+
+        return conditions, params
+
+    def count_products(self, conn, conditions: List[str], params: List) -> int:
+        """Count matching products, cached per filter signature"""
+        signature = (tuple(conditions), tuple(params))
+        cached = self.count_cache.get(signature)
+        now = time.monotonic()
+
+        if cached and now - cached[1] < self.count_cache_ttl:
+            return cached[0]
+
+        query = "SELECT COUNT(*) FROM products"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        total = conn.execute(query, params).fetchone()[0]
+
+        # Bounded cache - drop the oldest signature when full
+        if len(self.count_cache) >= self.count_cache_size and signature not in self.count_cache:
+            oldest = min(self.count_cache, key=lambda key: self.count_cache[key][1])
+            del self.count_cache[oldest]
+
+        self.count_cache[signature] = (total, now)
+        return total
+
+    def get_categories(self) -> List[str]:
+        """Get all product categories"""
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            cursor = conn.execute("SELECT DISTINCT category FROM products ORDER BY category")
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_products_by_ids(self, product_ids: List[str]) -> List[Dict]:
+        """Products for the given product_ids, in the same order (unknown ids are skipped)"""
+        if not product_ids:
+            return []
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            cursor = conn.execute(
+                f"SELECT * FROM products WHERE product_id IN ({','.join('?' * len(product_ids))})",
+                list(product_ids)
+            )
+            by_id = {row['product_id']: db.parse_json_fields(dict(row)) for row in cursor.fetchall()}
+        return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+    def get_catalog_signature(self, include_popularity: bool = True) -> str:
+        """
+        Cheap fingerprint of the product rows, so precomputed indexes can tell
+        when they were built from an older catalog. Indexes that never look at
+        popularity_score leave it out, so live popularity updates do not rebuild them
+        """
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            # Popularity is weighted by row so two products trading scores still changes it
+            row = conn.execute("""
+                SELECT COUNT(*), COALESCE(MAX(id), 0),
+                       COALESCE(SUM(LENGTH(name) + LENGTH(description) + LENGTH(ingredients)
+                                    + LENGTH(mood_tags) + LENGTH(dietary_tags)), 0),
+                       COALESCE(SUM(price), 0), COALESCE(SUM(spice_level), 0),
+                       COALESCE(SUM(popularity_score * (id % 7919 + 1)), 0)
+                FROM products
+            """).fetchone()
+        if not include_popularity:
+            row = row[:-1]
+        return ":".join(str(value) for value in row)
+
+    def invalidate(self):
+        """Drop cached counts - call after any write to the products table"""
+        self.count_cache.clear()
+
+    @staticmethod
+    def encode_cursor(popularity_score: int, product_row_id: int) -> str:
+        """Encode the last row of a page as an opaque cursor token"""
+        raw = json.dumps([popularity_score, product_row_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, int]:
+        """Decode a cursor token back into (popularity_score, id)"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            popularity_score, product_row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return int(popularity_score), int(product_row_id)
+        except Exception:
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+
+# Global catalog service
+catalog_service = CatalogService()
@@ -0,0 +1,283 @@
+"""
+Catalog Snapshot - The products table as a versioned, memory-mapped binary file set
+Fixed-width columns live in one structured array, text in a shared string table and the
+tag lists as bitsets over small vocabularies. Every worker process maps the same files
+read-only, so they share one copy through the page cache and loading costs only the
+open() calls, however large the catalog is. Each build is published as a whole version
+directory (see app.utils.index_versions). Live popularity does not rebuild it: its
+popularity_score values and order are as of the build, and ranked_products() overlays the
+current scores for the indexes that rank by them.
+"""
+
+import json
+import mmap
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+from app.config.settings import CATALOG_SNAPSHOT_DIR, CATALOG_SNAPSHOT_TTL
+from app.models.database import get_db_manager
+from app.services.catalog_service import catalog_service
+from app.utils.index_versions import new_version, publish, current_version
+
+# Bump whenever the layout below changes - older snapshots are rebuilt
+SNAPSHOT_FORMAT = 1
+# Product columns in table order, so products() matches `SELECT * FROM products`
+PRODUCT_COLUMNS = [
+    'id', 'product_id', 'name', 'category', 'description', 'ingredients', 'price', 'calories',
+    'prep_time', 'dietary_tags', 'mood_tags', 'allergens', 'popularity_score', 'chef_special',
+    'limited_time', 'spice_level', 'image_prompt', 'created_at'
+]
+STRING_COLUMNS = ['product_id', 'name', 'category', 'description', 'prep_time', 'image_prompt', 'created_at']
+TAG_COLUMNS = ['dietary_tags', 'mood_tags', 'allergens']
+# String reference for NULL
+NO_STRING = 0xFFFFFFFF
+
+ROW_DTYPE = np.dtype(
+    [('id', '<i8'), ('price', '<f8'), ('calories', '<i4'), ('popularity_score', '<i4'),
+     ('spice_level', '<i2'), ('chef_special', 'u1'), ('limited_time', 'u1'),
+     ('ingredients_start', '<u4'), ('ingredients_count', '<u2')]
+    + [(column, '<u4') for column in STRING_COLUMNS]
+)
+
+class MappedSnapshot:
+    """One published version, mapped - never changed once built, so readers need no lock"""
+
+    def __init__(self, path: str, signature: str, rows: np.ndarray, ingredients: np.ndarray,
+                 tags: Dict[str, np.ndarray], vocabularies: Dict[str, List[str]],
+                 string_offsets: np.ndarray, strings, id_order: np.ndarray):
+        self.path = path
+        self.signature = signature
+        self.rows = rows
+        self.ingredients = ingredients
+        self.tags = tags
+        self.vocabularies = vocabularies
+        self.string_offsets = string_offsets
+        self.strings = strings
+        self.id_order = id_order
+
+    def product(self, position: int) -> Dict:
+        """One product as a dict, shaped like a parsed `products` row"""
+        # One conversion to Python values instead of a numpy scalar per field
+        values = dict(zip(ROW_DTYPE.names, self.rows[position].tolist()))
+        start = values.pop('ingredients_start')
+        values['ingredients'] = [self.string(ref) for ref in self.ingredients[start:start + values.pop('ingredients_count')].tolist()]
+        for column in STRING_COLUMNS:
+            values[column] = self.string(values[column])
+        for column in TAG_COLUMNS:
+            values[column] = self.tag_list(column, position)
+        return {column: values[column] for column in PRODUCT_COLUMNS}
+
+    def position_of(self, product_id: str) -> Optional[int]:
+        """Binary search over the product_id-sorted positions - no per-process dict to build"""
+        low, high = 0, len(self.id_order)
+        while low < high:
+            middle = (low + high) // 2
+            candidate = self.string(int(self.rows[self.id_order[middle]]['product_id']))
+            if candidate < product_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.id_order) and self.string(int(self.rows[self.id_order[low]]['product_id'])) == product_id:
+            return int(self.id_order[low])
+        return None
+
+    def string(self, ref: int) -> Optional[str]:
+        if ref == NO_STRING:
+            return None
+        start, end = self.string_offsets[ref:ref + 2].tolist()
+        return self.strings[start:end].decode('utf-8')
+
+    def tag_list(self, column: str, position: int) -> List[str]:
+        vocabulary = self.vocabularies[column]
+        words = self.tags[column][position].tolist()
+        return [tag for bit, tag in enumerate(vocabulary) if words[bit // 64] >> (bit % 64) & 1]
+
+class CatalogSnapshot:
+    def __init__(self, directory: str = CATALOG_SNAPSHOT_DIR, ttl: float = CATALOG_SNAPSHOT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.checked_at = 0.0
+        # Swapped in whole by _open - readers take one reference and use only that
+        self.mapped: Optional[MappedSnapshot] = None
+        self.lock = threading.Lock()
+
+    @property
+    def path(self) -> Optional[str]:
+        """The version directory currently mapped"""
+        mapped = self.mapped
+        return mapped.path if mapped else None
+
+    @property
+    def signature(self) -> Optional[str]:
+        mapped = self.mapped
+        return mapped.signature if mapped else None
+
+    def ensure_loaded(self):
+        """Map the saved snapshot, rebuilding it when the catalog has changed"""
+        if self.mapped is not None and time.monotonic() - self.checked_at < self.ttl:
+            return
+        with self.lock:
+            if self.mapped is not None and time.monotonic() - self.checked_at < self.ttl:
+                return
+            signature = catalog_service.get_catalog_signature(include_popularity=False)
+            if self.mapped is None or signature != self.signature:
+                if not self._open(signature):
+                    self.build(signature)
+            self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        self.checked_at = 0.0
+
+    def __len__(self) -> int:
+        self.ensure_loaded()
+        return len(self.mapped.rows)
+
+    def products(self) -> Iterator[Dict]:
+        """Every product, most popular first as of the build (popularity_score DESC, id ASC)"""
+        self.ensure_loaded()
+        # A rebuild while iterating does not mix versions - this one stays mapped
+        mapped = self.mapped
+        for position in range(len(mapped.rows)):
+            yield mapped.product(position)
+
+    def ranked_products(self) -> List[Dict]:
+        """Every product with its current popularity_score, most popular first"""
+        products = list(self.products())
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            scores = dict(conn.execute("SELECT product_id, popularity_score FROM products").fetchall())
+        for product in products:
+            product['popularity_score'] = scores.get(product['product_id'], product['popularity_score']) or 0
+        products.sort(key=lambda product: (-product['popularity_score'], product['id']))
+        return products
+
+    def get_products_by_ids(self, product_ids: List[str]) -> List[Dict]:
+        """Products for the given product_ids, in the same order (unknown ids are skipped)"""
+        self.ensure_loaded()
+        mapped = self.mapped
+        products = []
+        for product_id in product_ids:
+            position = mapped.position_of(product_id)
+            if position is not None:
+                products.append(mapped.product(position))
+        return products
+
+    def build(self, signature: Optional[str] = None):
+        """Write the snapshot from the products table"""
+        started = time.perf_counter()
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            cursor = conn.execute("SELECT * FROM products ORDER BY popularity_score DESC, id ASC")
+            products = [db.parse_json_fields(dict(row)) for row in cursor.fetchall()]
+
+        strings: Dict[str, int] = {}
+
+        def intern(value) -> int:
+            if value is None:
+                return NO_STRING
+            value = str(value)
+            if value not in strings:
+                strings[value] = len(strings)
+            return strings[value]
+
+        vocabularies = {
+            column: sorted({str(tag) for product in products for tag in product.get(column) or []})
+            for column in TAG_COLUMNS
+        }
+        tags = {
+            column: np.zeros((len(products), max(1, (len(vocabularies[column]) + 63) // 64)), dtype=np.uint64)
+            for column in TAG_COLUMNS
+        }
+        tag_bits = {column: {tag: bit for bit, tag in enumerate(vocabularies[column])} for column in TAG_COLUMNS}
+
+        rows = np.zeros(len(products), dtype=ROW_DTYPE)
+        ingredients = []
+        for position, product in enumerate(products):
+            row = rows[position]
+            row['id'] = product['id']
+            row['price'] = product['price']
+            row['calories'] = product['calories']
+            row['popularity_score'] = product['popularity_score'] or 0
+            row['spice_level'] = product['spice_level'] or 0
+            row['chef_special'] = bool(product['chef_special'])
+            row['limited_time'] = bool(product['limited_time'])
+            row['ingredients_start'] = len(ingredients)
+            row['ingredients_count'] = len(product['ingredients'])
+            ingredients.extend(intern(ingredient) for ingredient in product['ingredients'])
+            for column in STRING_COLUMNS:
+                row[column] = intern(product.get(column))
+            for column in TAG_COLUMNS:
+                for tag in product.get(column) or []:
+                    bit = tag_bits[column][str(tag)]
+                    tags[column][position, bit // 64] |= np.uint64(1 << (bit % 64))
+
+        encoded = [value.encode('utf-8') for value in strings]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        string_offsets[1:] = np.cumsum([len(value) for value in encoded])
+        product_ids = [product['product_id'] for product in products]
+        id_order = np.array(sorted(range(len(products)), key=product_ids.__getitem__), dtype=np.int32)
+
+        # Several workers may build at once - each writes a version of its own, then publishes it
+        version = new_version(self.directory)
+        arrays = [("rows.npy", rows), ("ingredients.npy", np.array(ingredients, dtype=np.uint32)),
+                  ("string_offsets.npy", string_offsets), ("id_order.npy", id_order)]
+        arrays += [(f"tags_{column}.npy", tags[column]) for column in TAG_COLUMNS]
+        for name, array in arrays:
+            with open(os.path.join(version, name), "wb") as f:
+                np.save(f, array)
+        with open(os.path.join(version, "strings.bin"), "wb") as f:
+            f.write(b"".join(encoded))
+
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "signature": signature or catalog_service.get_catalog_signature(include_popularity=False),
+            "products": len(products),
+            "vocabularies": vocabularies
+        }
+        with open(os.path.join(version, "snapshot.json"), "w") as f:
+            json.dump(meta, f)
+        publish(self.directory, version)
+
+        self._open(meta["signature"])
+        print(f"🗃️ Catalog snapshot built: {len(products)} products, {len(strings)} strings, "
+              f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _open(self, signature: str) -> bool:
+        """Memory-map the published snapshot if it matches the catalog and this format"""
+        path = current_version(self.directory)
+        if path is None:
+            return False
+
+        def file(name: str) -> str:
+            return os.path.join(path, name)
+
+        try:
+            with open(file("snapshot.json")) as f:
+                meta = json.load(f)
+            if meta["format"] != SNAPSHOT_FORMAT or meta["signature"] != signature:
+                return False
+            rows = np.load(file("rows.npy"), mmap_mode="r")
+            if rows.dtype != ROW_DTYPE:
+                return False
+            with open(file("strings.bin"), "rb") as f:
+                # mmap cannot map an empty file
+                strings = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(file("strings.bin")) else b""
+            mapped = MappedSnapshot(
+                path=path, signature=signature, rows=rows,
+                ingredients=np.load(file("ingredients.npy"), mmap_mode="r"),
+                tags={column: np.load(file(f"tags_{column}.npy"), mmap_mode="r") for column in TAG_COLUMNS},
+                vocabularies=meta["vocabularies"],
+                string_offsets=np.load(file("string_offsets.npy"), mmap_mode="r"),
+                strings=strings,
+                id_order=np.load(file("id_order.npy"), mmap_mode="r")
+            )
+            # One assignment - readers see the old version or the new one, never a mix
+            self.mapped = mapped
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+# Global catalog snapshot
+catalog_snapshot = CatalogSnapshot()
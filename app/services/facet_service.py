@@ -0,0 +1,219 @@
+"""
+Faceted Search Service - In-memory bitmap index over the product catalog
+Each facet value maps to a Python int used as a bitset (bit i = i-th most popular product)
+"""
+
+import time
+from typing import Dict, List, Optional
+from app.config.settings import FACET_INDEX_TTL
+from app.services.catalog_snapshot import catalog_snapshot
+
+# Price facet buckets: (label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ("under_5", 0.0, 5.0),
+    ("5_to_10", 5.0, 10.0),
+    ("10_to_15", 10.0, 15.0),
+    ("15_to_20", 15.0, 20.0),
+    ("20_plus", 20.0, None),
+]
+
+# Bucket widths for the numeric range filters
+RANGE_BUCKET_WIDTHS = {
+    'price': 1.0,
+    'calories': 50,
+}
+
+def _popcount(bits: int) -> int:
+    """Count set bits (int.bit_count needs Python 3.10)"""
+    return bin(bits).count("1")
+
+def _price_bucket(price: float) -> str:
+    for label, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return label
+    return PRICE_BUCKETS[-1][0]
+
+class FacetIndex:
+    def __init__(self, ttl: float = FACET_INDEX_TTL):
+        self.ttl = ttl
+        self.loaded_at = 0.0
+        self.products: List[Dict] = []
+        self.all_bits = 0
+        self.facets: Dict[str, Dict] = {}
+        self.range_buckets: Dict[str, Dict[int, int]] = {}
+        self.search_cache: Dict[str, int] = {}
+
+    def load(self):
+        """Load the catalog and build one bitmap per facet value"""
+        # Re-check the snapshot against the catalog rather than trusting its TTL
+        catalog_snapshot.invalidate()
+        products = catalog_snapshot.ranked_products()
+
+        facets = {
+            'category': {},
+            'dietary': {},
+            'allergens': {},
+            'price': {label: 0 for label, _, _ in PRICE_BUCKETS},
+            'spice_level': {},
+        }
+        range_buckets = {column: {} for column in RANGE_BUCKET_WIDTHS}
+
+        for position, product in enumerate(products):
+            bit = 1 << position
+
+            facets['category'][product['category']] = facets['category'].get(product['category'], 0) | bit
+            for tag in product.get('dietary_tags', []):
+                facets['dietary'][tag] = facets['dietary'].get(tag, 0) | bit
+            for allergen in product.get('allergens', []):
+                facets['allergens'][allergen] = facets['allergens'].get(allergen, 0) | bit
+
+            price_label = _price_bucket(product['price'])
+            facets['price'][price_label] |= bit
+
+            spice = int(product.get('spice_level') or 0)
+            facets['spice_level'][spice] = facets['spice_level'].get(spice, 0) | bit
+
+            for column, width in RANGE_BUCKET_WIDTHS.items():
+                bucket = int(product[column] // width)
+                range_buckets[column][bucket] = range_buckets[column].get(bucket, 0) | bit
+
+        self.products = products
+        self.all_bits = (1 << len(products)) - 1
+        self.facets = facets
+        self.range_buckets = range_buckets
+        self.search_cache = {}
+        self.loaded_at = time.monotonic()
+
+        print(f"🧮 Facet index built: {len(products)} products")
+
+    def ensure_loaded(self):
+        """Rebuild the index when it has never been loaded or has expired"""
+        if not self.loaded_at or time.monotonic() - self.loaded_at > self.ttl:
+            self.load()
+
+    def invalidate(self):
+        """Force a rebuild on the next search"""
+        self.loaded_at = 0.0
+
+    def search(self, categories: Optional[List[str]] = None, dietary: Optional[List[str]] = None,
+               exclude_allergens: Optional[List[str]] = None, price_buckets: Optional[List[str]] = None,
+               spice_levels: Optional[List[int]] = None, min_spice: Optional[int] = None,
+               max_spice: Optional[int] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, max_calories: Optional[int] = None,
+               search: Optional[str] = None, limit: int = 24, offset: int = 0) -> Dict:
+        """
+        Filter products and compute facet counts for the current selection
+        """
+        self.ensure_loaded()
+
+        # Disjunctive facets (OR within the facet) are counted without their own
+        # filter so the UI can show how many results each alternative would give
+        facet_filters = {
+            'category': self._any_of('category', categories),
+            'price': self._any_of('price', price_buckets),
+            'spice_level': self._spice_bits(spice_levels, min_spice, max_spice),
+        }
+
+        # Conjunctive filters apply to every facet count
+        base = self.all_bits
+        for tag in dietary or []:
+            base &= self.facets['dietary'].get(tag, 0)
+        for allergen in exclude_allergens or []:
+            base &= ~self.facets['allergens'].get(allergen, 0)
+        if min_price is not None or max_price is not None:
+            base &= self._range_bits('price', min_price, max_price)
+        if max_calories is not None:
+            base &= self._range_bits('calories', None, max_calories)
+        if search:
+            base &= self._search_bits(search)
+        base &= self.all_bits
+
+        matched = base
+        for bits in facet_filters.values():
+            matched &= bits
+
+        facet_counts = {}
+        for facet, values in self.facets.items():
+            facet_base = base
+            for other, bits in facet_filters.items():
+                if other != facet:
+                    facet_base &= bits
+            # Price buckets keep their natural order, other facets sort by value
+            items = values.items() if facet == 'price' else sorted(values.items())
+            facet_counts[facet] = {str(value): _popcount(facet_base & bits) for value, bits in items}
+
+        return {
+            "products": self._take(matched, offset, limit),
+            "total": _popcount(matched),
+            "facets": facet_counts
+        }
+
+    def _any_of(self, facet: str, values: Optional[List]) -> int:
+        if not values:
+            return self.all_bits
+        bits = 0
+        for value in values:
+            bits |= self.facets[facet].get(value, 0)
+        return bits
+
+    def _spice_bits(self, levels: Optional[List[int]], min_spice: Optional[int],
+                    max_spice: Optional[int]) -> int:
+        if not levels and min_spice is None and max_spice is None:
+            return self.all_bits
+        selected = set(levels) if levels else set(self.facets['spice_level'])
+        if min_spice is not None:
+            selected = {level for level in selected if level >= min_spice}
+        if max_spice is not None:
+            selected = {level for level in selected if level <= max_spice}
+        return self._any_of('spice_level', list(selected)) if selected else 0
+
+    def _range_bits(self, column: str, low: Optional[float], high: Optional[float]) -> int:
+        """OR together whole buckets inside the range, check edge buckets row by row"""
+        width = RANGE_BUCKET_WIDTHS[column]
+        bits = 0
+        for bucket, bucket_bits in self.range_buckets[column].items():
+            bucket_low = bucket * width
+            bucket_high = bucket_low + width
+            if (low is not None and bucket_high <= low) or (high is not None and bucket_low > high):
+                continue
+            if (low is None or bucket_low >= low) and (high is None or bucket_high <= high):
+                bits |= bucket_bits
+                continue
+            for position in self._positions(bucket_bits):
+                value = self.products[position][column]
+                if (low is None or value >= low) and (high is None or value <= high):
+                    bits |= 1 << position
+        return bits
+
+    def _search_bits(self, term: str) -> int:
+        term = term.lower().strip()
+        if term not in self.search_cache:
+            bits = 0
+            for position, product in enumerate(self.products):
+                if term in product['name'].lower() or term in product['description'].lower():
+                    bits |= 1 << position
+            if len(self.search_cache) >= 256:
+                self.search_cache.pop(next(iter(self.search_cache)))
+            self.search_cache[term] = bits
+        return self.search_cache[term]
+
+    def _take(self, bits: int, offset: int, limit: int) -> List[Dict]:
+        """Return products for the set bits, lowest bit (most popular) first"""
+        results = []
+        for index, position in enumerate(self._positions(bits)):
+            if index < offset:
+                continue
+            if len(results) >= limit:
+                break
+            results.append(dict(self.products[position]))
+        return results
+
+    @staticmethod
+    def _positions(bits: int):
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+# Global facet index
+facet_index = FacetIndex()
@@ -0,0 +1,279 @@
+"""
+Generation Backends - Interchangeable reply generators
+HuggingFace Inference API, a CPU-only local template generator that needs no network,
+and an optional small transformers model loaded once and kept warm
+"""
+
+import hashlib
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+from app.config.settings import (
+    GENERATION_BACKEND, HUGGINGFACE_API_KEY, HF_MODELS, GENERATION_LATENCY_BUDGET,
+    GENERATION_TOKEN_BUDGET, LOCAL_GENERATION_MODEL, HF_POOL_SIZE
+)
+from app.services.generation_cache import generation_cache
+from app.services.inference_client import inference_client
+from app.utils.streaming import chunk_text
+
+class GenerationBackend:
+    """
+    Every backend returns raw generated text (prompt included, like the Inference API),
+    so the services' `accept` callbacks work unchanged. "" means nothing usable.
+    """
+    name = "base"
+    # Whether concurrent requests gain from being sent as one batch
+    batched = False
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def generate(self, prompt: str, parameters: Dict, accept: Callable[[str], str]) -> str:
+        return self.generate_batch([prompt], parameters, accept)[0]
+
+    def generate_batch(self, prompts: List[str], parameters: Dict,
+                       accept: Callable[[str], str]) -> List[str]:
+        """One accepted reply (or "") per prompt, in order"""
+        raise NotImplementedError
+
+    def stream(self, prompt: str, parameters: Dict, accept: Callable[[str], str]) -> Iterator[str]:
+        """Reply chunks as they are produced; backends without native streaming chunk the reply"""
+        yield from chunk_text(self.generate(prompt, parameters, accept))
+
+    def warm_up(self):
+        """Load whatever the backend needs before the first request"""
+
+    def _budgeted(self, parameters: Dict) -> Dict:
+        """Cap max_new_tokens so local generation time stays predictable"""
+        budgeted = dict(parameters)
+        budgeted['max_new_tokens'] = min(parameters.get('max_new_tokens', GENERATION_TOKEN_BUDGET), GENERATION_TOKEN_BUDGET)
+        return budgeted
+
+class HuggingFaceBackend(GenerationBackend):
+    name = "huggingface"
+    # One API call per prompt either way - holding prompts for a batch would only add the
+    # coalescing window and make each caller wait for the slowest prompt of its batch
+    batched = False
+
+    def __init__(self, models: Optional[List[str]] = None, budget: float = GENERATION_LATENCY_BUDGET):
+        self.models = models or HF_MODELS
+        self.budget = budget
+        # Separate from the client's pool, which parallel/hedged dispatch submits to
+        self.executor = ThreadPoolExecutor(max_workers=HF_POOL_SIZE, thread_name_prefix="hf-batch")
+
+    @property
+    def available(self) -> bool:
+        return inference_client.enabled
+
+    def generate(self, prompt: str, parameters: Dict, accept: Callable[[str], str]) -> str:
+        return inference_client.generate_with_fallback(
+            self.models, prompt, parameters, budget=self.budget, accept=accept
+        )
+
+    def generate_batch(self, prompts: List[str], parameters: Dict,
+                       accept: Callable[[str], str]) -> List[str]:
+        """The Inference API takes one prompt per call - fan out over the keep-alive pool"""
+        if len(prompts) == 1:
+            return [self.generate(prompts[0], parameters, accept)]
+
+        futures = [
+            self.executor.submit(self.generate, prompt, parameters, accept)
+            for prompt in prompts
+        ]
+        replies = []
+        for future in futures:
+            try:
+                replies.append(future.result())
+            except Exception as e:
+                print(f"Batch generation error: {e}")
+                replies.append("")
+        return replies
+
+    def stream(self, prompt: str, parameters: Dict, accept: Callable[[str], str]) -> Iterator[str]:
+        return inference_client.stream_with_fallback(
+            self.models, prompt, parameters, budget=self.budget, accept=accept
+        )
+
+class LocalTemplateBackend(GenerationBackend):
+    """
+    Composes a reply from the facts in the prompt (recommended product, alternatives,
+    dietary needs, what the user said). Pure Python, microseconds per reply. Prompts
+    without a product get no reply so the services use their own guidance.
+    """
+    name = "local"
+
+    PROMPT_FIELDS = {
+        'product': re.compile(r'Recommend: (?P<name>.+?) \(\$(?P<price>[\d.]+)\)(?: - (?P<description>[^\n]+))?'),
+        'alternatives': re.compile(r'Alternatives: ([^\n]+)'),
+        'dietary': re.compile(r'User dietary needs: ([^\n]+)'),
+        'message': re.compile(r'User said: ([^\n]+)')
+    }
+
+    OPENERS = {
+        'spicy': ["Bring on the heat!", "Spice lovers, this one's for you!", "Ready for some fire?"],
+        'sweet': ["Sweet tooth alert!", "Time for a treat!", "Dessert is always a good idea!"],
+        'healthy': ["Fresh and good for you!", "Light but satisfying!", "A great wholesome pick!"],
+        'default': ["Great question!", "I've got just the thing!", "You're going to love this!"]
+    }
+
+    PITCHES = [
+        "The {name} at ${price} is one of our favorites",
+        "I'd go with the {name} for ${price}",
+        "Try the {name} - just ${price}"
+    ]
+
+    CLOSERS = [
+        "Want to give it a try?",
+        "Does that sound good?",
+        "Shall I add it to your order?"
+    ]
+
+    MOOD_WORDS = {
+        'spicy': ['spicy', 'hot', 'fire', 'heat'],
+        'sweet': ['sweet', 'dessert', 'chocolate', 'cake'],
+        'healthy': ['healthy', 'light', 'fresh', 'salad']
+    }
+
+    def generate_batch(self, prompts: List[str], parameters: Dict,
+                       accept: Callable[[str], str]) -> List[str]:
+        budgeted = self._budgeted(parameters)
+        replies = []
+        for prompt in prompts:
+            composed = self._compose(prompt, budgeted)
+            replies.append(accept(f"{prompt} {composed}") if composed else "")
+        return replies
+
+    def _compose(self, prompt: str, parameters: Dict) -> str:
+        """Phrase the recommendation in the prompt ("" when there is none to phrase)"""
+        facts = {field: pattern.search(prompt) for field, pattern in self.PROMPT_FIELDS.items()}
+        product = facts['product']
+        if not product:
+            return ""
+
+        # Greedy decoding is deterministic - same prompt, same reply
+        if parameters.get('temperature', 0) > 0 and parameters.get('do_sample', True):
+            rng = random.Random()
+        else:
+            rng = random.Random(hashlib.md5(prompt.encode()).hexdigest())
+
+        message = facts['message'].group(1).lower() if facts['message'] else ""
+        mood = next((mood for mood, words in self.MOOD_WORDS.items()
+                     if any(word in message for word in words)), 'default')
+
+        parts = [rng.choice(self.OPENERS[mood])]
+
+        pitch = rng.choice(self.PITCHES).format(name=product.group('name'), price=product.group('price'))
+        if product.group('description'):
+            pitch += f" - {product.group('description').rstrip('.').lower()}"
+        parts.append(pitch + ".")
+
+        if facts['dietary']:
+            parts.append(f"It works with your {facts['dietary'].group(1)} preferences.")
+        if facts['alternatives']:
+            parts.append(f"If you want options, there's also {facts['alternatives'].group(1)}.")
+
+        parts.append(rng.choice(self.CLOSERS))
+
+        words = " ".join(parts).split()
+        return " ".join(words[:parameters['max_new_tokens']])
+
+class TransformersBackend(GenerationBackend):
+    """Small causal LM on CPU via transformers (optional dependency)"""
+    name = "transformers"
+    batched = True
+
+    # Loaded pipelines, shared by every instance using the same model
+    pipelines = {}
+
+    def __init__(self, model_name: str = LOCAL_GENERATION_MODEL):
+        self.model_name = model_name
+        self.generator = None
+        self.load_failed = False
+
+    @property
+    def available(self) -> bool:
+        return not self.load_failed
+
+    def warm_up(self):
+        if self.generator is not None or self.load_failed:
+            return
+        if self.model_name in self.pipelines:
+            self.generator = self.pipelines[self.model_name]
+            return
+        try:
+            from transformers import pipeline
+            self.generator = pipeline("text-generation", model=self.model_name, device=-1)
+            # Batched prompts need padding on the left for decoder-only models
+            tokenizer = self.generator.tokenizer
+            tokenizer.padding_side = "left"
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            self.pipelines[self.model_name] = self.generator
+            print(f"✅ Local generation model loaded: {self.model_name}")
+        except ImportError:
+            self.load_failed = True
+            print("⚠️ transformers not available, local model generation disabled")
+        except Exception as e:
+            self.load_failed = True
+            print(f"❌ Could not load {self.model_name}: {e}")
+
+    def generate_batch(self, prompts: List[str], parameters: Dict,
+                       accept: Callable[[str], str]) -> List[str]:
+        self.warm_up()
+        if self.generator is None:
+            return [""] * len(prompts)
+
+        budgeted = self._budgeted(parameters)
+        replies = [generation_cache.get(prompt, budgeted) for prompt in prompts]
+        missing = [i for i, reply in enumerate(replies) if not reply]
+        if not missing:
+            return replies
+
+        try:
+            outputs = self.generator(
+                [prompts[i] for i in missing],
+                batch_size=len(missing),
+                max_new_tokens=budgeted['max_new_tokens'],
+                do_sample=budgeted.get('temperature', 0) > 0,
+                temperature=budgeted.get('temperature') or None,
+                top_p=budgeted.get('top_p'),
+                pad_token_id=self.generator.tokenizer.pad_token_id
+            )
+        except Exception as e:
+            print(f"Local generation error: {e}")
+            return [reply or "" for reply in replies]
+
+        for i, output in zip(missing, outputs):
+            reply = accept(output[0]['generated_text'])
+            if reply:
+                generation_cache.put(prompts[i], budgeted, reply)
+            replies[i] = reply
+        return replies
+
+BACKENDS = {
+    'huggingface': HuggingFaceBackend,
+    'local': LocalTemplateBackend,
+    'transformers': TransformersBackend
+}
+
+def create_backend(name: str = GENERATION_BACKEND, **options) -> GenerationBackend:
+    """
+    Build a backend by name; 'auto' uses HuggingFace when an API key is set,
+    otherwise the local template generator
+    """
+    if name == 'auto':
+        name = 'huggingface' if HUGGINGFACE_API_KEY else 'local'
+
+    if name not in BACKENDS:
+        print(f"⚠️ Unknown generation backend '{name}', using local")
+        name = 'local'
+
+    if name != 'huggingface':
+        options.pop('models', None)
+
+    return BACKENDS[name](**options)
+
+# Global generation backend
+generation_backend = create_backend()
@@ -0,0 +1,165 @@
+"""
+Generation Cache - Reuse LLM replies for identical prompts
+Keyed by a hash of the normalized prompt and generation parameters, bounded by TTL and
+size, and persisted to its own SQLite file so it survives restarts
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from app.config.settings import (
+    GENERATION_CACHE_PATH, GENERATION_CACHE_TTL, GENERATION_CACHE_MAX_ENTRIES,
+    GENERATION_CACHE_SAMPLED_VARIANTS
+)
+
+# Sampling knobs are not part of the key; temperature decides how many variants are kept
+SAMPLING_PARAMETERS = {'temperature', 'do_sample', 'top_p', 'top_k'}
+
+class GenerationCache:
+    def __init__(self, path: str = GENERATION_CACHE_PATH, ttl: float = GENERATION_CACHE_TTL,
+                 max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+                 sampled_variants: int = GENERATION_CACHE_SAMPLED_VARIANTS):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sampled_variants = sampled_variants
+        self.lock = threading.Lock()
+        self.conn = None
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def get(self, prompt: str, parameters: Dict) -> Optional[str]:
+        """
+        Return a cached reply, or None when the caller should generate a new one
+        """
+        if self.max_entries <= 0:
+            return None
+
+        key = self.make_key(prompt, parameters)
+        now = time.time()
+
+        with self.lock:
+            conn = self._connection()
+            rows = conn.execute(
+                "SELECT variant, response FROM generation_cache WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl)
+            ).fetchall()
+
+            # Sampled generations keep collecting variants until the pool is full
+            if not rows or len(rows) < self._variants_for(parameters):
+                self.stats['misses'] += 1
+                return None
+
+            variant, response = random.choice(rows)
+            conn.execute(
+                "UPDATE generation_cache SET last_used = ? WHERE key = ? AND variant = ?",
+                (now, key, variant)
+            )
+            conn.commit()
+            self.stats['hits'] += 1
+            return response
+
+    def put(self, prompt: str, parameters: Dict, response: str):
+        """Store a generated reply"""
+        if self.max_entries <= 0 or not response:
+            return
+
+        key = self.make_key(prompt, parameters)
+        now = time.time()
+
+        with self.lock:
+            conn = self._connection()
+
+            # Expired variants are replaced rather than mixed with fresh ones
+            conn.execute("DELETE FROM generation_cache WHERE key = ? AND created_at <= ?", (key, now - self.ttl))
+            taken = {row[0] for row in conn.execute("SELECT variant FROM generation_cache WHERE key = ?", (key,))}
+            # Evictions leave gaps, so take the lowest free slot rather than the count
+            free = [variant for variant in range(self._variants_for(parameters)) if variant not in taken]
+            if not free:
+                conn.commit()
+                return
+
+            # Never overwrite a live reply another worker stored in the same slot meanwhile
+            conn.execute("""
+            INSERT OR IGNORE INTO generation_cache (key, variant, response, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?)
+            """, (key, free[0], response, now, now))
+            self.stats['stores'] += 1
+
+            self._evict(conn, now)
+            conn.commit()
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0
+        }
+
+    def clear(self):
+        with self.lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM generation_cache")
+            conn.commit()
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Case and whitespace differences should not miss the cache"""
+        return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+    def make_key(self, prompt: str, parameters: Dict) -> str:
+        key_parameters = {k: v for k, v in parameters.items() if k not in SAMPLING_PARAMETERS}
+        material = self.normalize_prompt(prompt) + "\n" + json.dumps(key_parameters, sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _variants_for(self, parameters: Dict) -> int:
+        """Greedy decoding is deterministic - one reply is enough"""
+        if parameters.get('temperature', 0) > 0 and parameters.get('do_sample', True):
+            return max(1, self.sampled_variants)
+        return 1
+
+    def _evict(self, conn, now: float):
+        """Drop expired rows, then least recently used rows above max_entries"""
+        evicted = conn.execute(
+            "DELETE FROM generation_cache WHERE created_at <= ?", (now - self.ttl,)
+        ).rowcount
+
+        overflow = conn.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            evicted += conn.execute("""
+            DELETE FROM generation_cache WHERE rowid IN (
+                SELECT rowid FROM generation_cache ORDER BY last_used LIMIT ?
+            )
+            """, (overflow,)).rowcount
+
+        self.stats['evictions'] += evicted
+
+    def _connection(self):
+        if self.conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS generation_cache (
+                key TEXT NOT NULL,
+                variant INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (key, variant)
+            )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_cache_last_used ON generation_cache(last_used)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_cache_created ON generation_cache(created_at)")
+            self.conn.commit()
+        return self.conn
+
+# Global generation cache
+generation_cache = GenerationCache()
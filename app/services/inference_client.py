@@ -0,0 +1,393 @@
+"""
+Pooled HuggingFace Inference Client
+One keep-alive session shared by every AI service, a circuit breaker per model
+and an overall latency budget per chat turn. Models can be tried in order,
+all at once, or hedged (the next one starts when the previous is slower than its p95).
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, List, Optional
+from app.config.settings import (
+    HUGGINGFACE_API_KEY, HF_API_BASE, HF_POOL_SIZE, HF_REQUEST_TIMEOUT,
+    HF_BREAKER_FAILURES, HF_BREAKER_COOLDOWN, HF_DISPATCH_MODE, HF_HEDGE_DELAY
+)
+from app.services.generation_cache import generation_cache
+from app.utils.streaming import chunk_text
+
+class CircuitBreaker:
+    """
+    Skip a model for `cooldown` seconds after `failure_threshold` consecutive failures,
+    then let a single trial request through (half-open) before closing again
+    """
+
+    def __init__(self, failure_threshold: int = HF_BREAKER_FAILURES, cooldown: float = HF_BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return 'closed'
+        if self.trial_started_at or time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Closed breakers let every request through, half-open ones exactly one trial"""
+        with self.lock:
+            if self.failures < self.failure_threshold:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.cooldown:
+                return False
+            # A trial is in flight - wait for its outcome (or a cooldown, should it never report)
+            if self.trial_started_at and now - self.trial_started_at < self.cooldown:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def release(self):
+        """Hand back a trial that was granted but never sent"""
+        with self.lock:
+            self.trial_started_at = 0.0
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = 0.0
+            self.trial_started_at = 0.0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                # (Re)open - a failed half-open trial restarts the cooldown
+                self.opened_at = time.monotonic()
+                self.trial_started_at = 0.0
+
+class InferenceClient:
+    def __init__(self, api_key: Optional[str] = HUGGINGFACE_API_KEY, base_url: str = HF_API_BASE,
+                 pool_size: int = HF_POOL_SIZE, request_timeout: float = HF_REQUEST_TIMEOUT,
+                 dispatch_mode: str = HF_DISPATCH_MODE, hedge_delay: float = HF_HEDGE_DELAY):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.request_timeout = request_timeout
+        self.dispatch_mode = dispatch_mode
+        self.hedge_delay = hedge_delay
+        self.pool_size = pool_size
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="inference")
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, deque] = {}
+        self._session = None
+        self.session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Keep-alive connection pool - no TCP/TLS handshake per message. Built on the first
+        call, so apps that never reach the Inference API do not import requests at startup
+        """
+        if self._session is None:
+            with self.session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    if self.api_key:
+                        session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+                    self._session = session
+        return self._session
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker()
+        return self.breakers[model]
+
+    def generate(self, model: str, prompt: str, parameters: Dict, timeout: Optional[float] = None) -> str:
+        """
+        Call one model and return its raw generated_text (raises on any failure)
+        """
+        payload = {
+            "inputs": prompt,
+            "parameters": parameters,
+            # Never block the chat turn on a cold model - fail fast and fall back
+            "options": {"wait_for_model": False}
+        }
+
+        # A full URL selects a different backend (e.g. a local stand-in server)
+        url = model if model.startswith(('http://', 'https://')) else f"{self.base_url}/{model}"
+
+        started = time.monotonic()
+        response = self.session.post(url, json=payload, timeout=timeout or self.request_timeout)
+        response.raise_for_status()
+
+        result = response.json()
+        if not isinstance(result, list) or not result:
+            raise ValueError(f"Unexpected response from {model}: {str(result)[:100]}")
+
+        self._record_latency(model, time.monotonic() - started)
+        return result[0].get('generated_text', '')
+
+    def generate_with_fallback(self, models: List[str], prompt: str, parameters: Dict,
+                               budget: float, accept: Callable[[str], str]) -> str:
+        """
+        Try models within `budget` seconds, skipping models whose breaker is open.
+        `accept` turns raw text into the final reply, or "" when it is not usable.
+        Accepted replies are cached, so a repeated prompt skips the network entirely.
+        """
+        cached = self._cached_reply(prompt, parameters)
+        if cached:
+            return cached
+
+        reply = self._dispatch(models, prompt, parameters, budget, accept)
+        self._cache_reply(prompt, parameters, reply)
+        return reply
+
+    def stream_with_fallback(self, models: List[str], prompt: str, parameters: Dict,
+                             budget: float, accept: Callable[[str], str]) -> Iterator[str]:
+        """
+        Yield reply text as the model produces it. Models are tried in order until one
+        starts answering within `budget`; once text has been yielded there is no fallback.
+        Yields nothing when every model fails, so the caller can use its own reply.
+        """
+        cached = self._cached_reply(prompt, parameters)
+        if cached:
+            yield from chunk_text(cached)
+            return
+
+        deadline = time.monotonic() + budget
+
+        for model in models:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.05:
+                print("⏱️ Generation budget exhausted, falling back")
+                return
+
+            breaker = self.breaker(model)
+            if not breaker.allow():
+                print(f"⚡ Skipping {model} (circuit open)")
+                continue
+
+            streamed = []
+            try:
+                for token in self._stream_model(model, prompt, parameters, min(self.request_timeout, remaining), accept):
+                    streamed.append(token)
+                    yield token
+                breaker.record_success()
+            except Exception as e:
+                breaker.record_failure()
+                print(f"Model {model} failed: {e}")
+                if not streamed:
+                    continue
+                # Cut off mid-reply - never cache the truncated text
+                return
+
+            if streamed:
+                self._cache_reply(prompt, parameters, accept(prompt + "".join(streamed)))
+                return
+
+    def _stream_model(self, model: str, prompt: str, parameters: Dict, timeout: float,
+                      accept: Callable[[str], str]) -> Iterator[str]:
+        """
+        Stream one model's tokens. Backends that ignore "stream" answer with plain JSON,
+        in which case the accepted reply is yielded in word chunks.
+        """
+        payload = {
+            "inputs": prompt,
+            "parameters": parameters,
+            "stream": True,
+            "options": {"wait_for_model": False}
+        }
+        url = model if model.startswith(('http://', 'https://')) else f"{self.base_url}/{model}"
+
+        started = time.monotonic()
+        with self.session.post(url, json=payload, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+
+            if 'text/event-stream' not in response.headers.get('Content-Type', ''):
+                result = response.json()
+                if not isinstance(result, list) or not result:
+                    raise ValueError(f"Unexpected response from {model}: {str(result)[:100]}")
+                self._record_latency(model, time.monotonic() - started)
+                yield from chunk_text(accept(result[0].get('generated_text', '')))
+                return
+
+            first_token = True
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                event = json.loads(line[5:].strip())
+                if 'error' in event:
+                    raise ValueError(event['error'])
+                token = event.get('token', {})
+                if token.get('special'):
+                    continue
+                if first_token:
+                    # Time to first token is what hedging and budgets care about
+                    self._record_latency(model, time.monotonic() - started)
+                    first_token = False
+                yield token.get('text', '')
+
+    def _cached_reply(self, prompt: str, parameters: Dict) -> Optional[str]:
+        try:
+            cached = generation_cache.get(prompt, parameters)
+        except Exception as e:
+            print(f"⚠️ Generation cache unavailable: {e}")
+            return None
+        if cached:
+            print("💾 Generation cache hit")
+        return cached
+
+    def _cache_reply(self, prompt: str, parameters: Dict, reply: str):
+        if not reply:
+            return
+        try:
+            generation_cache.put(prompt, parameters, reply)
+        except Exception as e:
+            print(f"⚠️ Could not cache generated reply: {e}")
+
+    def _dispatch(self, models: List[str], prompt: str, parameters: Dict,
+                  budget: float, accept: Callable[[str], str]) -> str:
+        if self.dispatch_mode in ('parallel', 'hedged') and len(models) > 1:
+            return self._generate_first_response(models, prompt, parameters, budget, accept)
+
+        deadline = time.monotonic() + budget
+
+        for model in models:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.05:
+                print("⏱️ Generation budget exhausted, falling back")
+                break
+
+            if not self.breaker(model).allow():
+                print(f"⚡ Skipping {model} (circuit open)")
+                continue
+
+            reply = self._attempt(model, prompt, parameters, min(self.request_timeout, remaining), accept)
+            if reply:
+                return reply
+
+        return ""
+
+    def _generate_first_response(self, models: List[str], prompt: str, parameters: Dict,
+                                 budget: float, accept: Callable[[str], str]) -> str:
+        """
+        Race the models and return the first acceptable reply.
+        'parallel' starts every model at once; 'hedged' starts the next model only
+        when the previous one has not answered within its observed p95 latency.
+        """
+        deadline = time.monotonic() + budget
+        pending = {}
+        launched = []
+        # Models not yet tried - the breaker is asked right before each one is sent, so a
+        # backup that is never launched does not use up its half-open trial
+        untried = list(models)
+
+        def launch() -> bool:
+            while untried:
+                model = untried.pop(0)
+                if not self.breaker(model).allow():
+                    print(f"⚡ Skipping {model} (circuit open)")
+                    continue
+                launched.append(model)
+                timeout = min(self.request_timeout, max(deadline - time.monotonic(), 0.05))
+                pending[self.executor.submit(self._attempt, model, prompt, parameters, timeout, accept)] = model
+                return True
+            return False
+
+        if not launch():
+            print("⚡ All generation backends are circuit-open")
+            return ""
+        if self.dispatch_mode == 'parallel':
+            while launch():
+                pass
+
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print("⏱️ Generation budget exhausted, falling back")
+                    break
+
+                can_hedge = bool(untried)
+                wait_for = remaining
+                if can_hedge:
+                    hedge_after = self.latency_percentile(launched[-1]) or self.hedge_delay
+                    wait_for = min(remaining, hedge_after)
+
+                done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    model = pending.pop(future)
+                    reply = future.result()
+                    if reply:
+                        print(f"🏁 {model} answered first")
+                        return reply
+
+                # Slow or unusable answer - bring in the next backend
+                if can_hedge and (not done or not pending):
+                    launch()
+        finally:
+            # Drop whatever is still queued; in-flight calls finish in the background
+            for future, model in pending.items():
+                if future.cancel():
+                    self.breaker(model).release()
+
+        return ""
+
+    def _attempt(self, model: str, prompt: str, parameters: Dict, timeout: float,
+                 accept: Callable[[str], str]) -> str:
+        """One model call with breaker bookkeeping, returns "" on failure"""
+        breaker = self.breaker(model)
+        try:
+            generated = self.generate(model, prompt, parameters, timeout=timeout)
+            breaker.record_success()
+        except Exception as e:
+            breaker.record_failure()
+            print(f"Model {model} failed: {e}")
+            return ""
+        return accept(generated)
+
+    def latency_percentile(self, model: str, percentile: float = 0.95) -> Optional[float]:
+        """Observed latency percentile for a model, None until enough samples exist"""
+        samples = sorted(self.latencies.get(model, []))
+        if len(samples) < 5:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile))]
+
+    def get_stats(self) -> Dict:
+        return {
+            "models": {
+                model: {
+                    "state": breaker.state,
+                    "consecutive_failures": breaker.failures,
+                    "p95_latency": self.latency_percentile(model)
+                }
+                for model, breaker in self.breakers.items()
+            },
+            "cache": generation_cache.get_stats()
+        }
+
+    def _record_latency(self, model: str, seconds: float):
+        if model not in self.latencies:
+            self.latencies[model] = deque(maxlen=200)
+        self.latencies[model].append(seconds)
+
+# Global inference client shared by the AI services
+inference_client = InferenceClient()
@@ -0,0 +1,222 @@
+"""
+Implicit-feedback Collaborative Filtering - Learned from the conversations log
+Training streams every stored turn into a sparse session x product matrix (how often a
+product was recommended, weighted by the interest score of the turn), factorizes it with
+a randomized truncated SVD in NumPy, and writes the item factors. Requests memory-map
+the factors: a session's history folds into a d-dimensional vector in O(k*d).
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from app.config.settings import CF_MODEL_DIR, CF_FACTORS, CF_MODEL_TTL
+from app.models.database import get_db_manager
+
+# Power iterations and oversampling for the randomized SVD (Halko et al.)
+SVD_POWER_ITERATIONS = 3
+SVD_OVERSAMPLING = 8
+
+def _recommended_ids(raw: Optional[str]) -> List[str]:
+    """Stored as a JSON list of product ids (older rows may hold product dicts)"""
+    if not raw:
+        return []
+    try:
+        products = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(products, list):
+        return []
+    product_ids = []
+    for item in products:
+        if isinstance(item, dict):
+            item = item.get('product_id')
+        if isinstance(item, str):
+            product_ids.append(item)
+    return product_ids
+
+class InteractionMatrix:
+    """Sparse matrix as COO arrays, with the two products the SVD needs"""
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, values: np.ndarray, shape):
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.shape = shape
+
+    def dot(self, dense: np.ndarray) -> np.ndarray:
+        """R @ dense"""
+        result = np.zeros((self.shape[0], dense.shape[1]))
+        np.add.at(result, self.rows, self.values[:, np.newaxis] * dense[self.cols])
+        return result
+
+    def transpose_dot(self, dense: np.ndarray) -> np.ndarray:
+        """R.T @ dense"""
+        result = np.zeros((self.shape[1], dense.shape[1]))
+        np.add.at(result, self.cols, self.values[:, np.newaxis] * dense[self.rows])
+        return result
+
+class InteractionModel:
+    def __init__(self, directory: str = CF_MODEL_DIR, factors: int = CF_FACTORS, ttl: float = CF_MODEL_TTL):
+        self.directory = directory
+        self.factors = factors
+        self.ttl = ttl
+        self.checked_at = 0.0
+        self.loaded_mtime = None
+        self.item_factors: Optional[np.ndarray] = None
+        self.product_ids: List[str] = []
+        self.columns: Dict[str, int] = {}
+        self.meta: Dict = {}
+        self.lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def available(self) -> bool:
+        self.ensure_loaded()
+        return self.item_factors is not None
+
+    def ensure_loaded(self):
+        """(Re)open the factors when a newer model has been trained"""
+        if time.monotonic() - self.checked_at < self.ttl:
+            return
+        with self.lock:
+            self.checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self._file("model.json"))
+            except OSError:
+                return
+            if mtime == self.loaded_mtime:
+                return
+            try:
+                with open(self._file("model.json")) as f:
+                    meta = json.load(f)
+                self.item_factors = np.load(self._file("item_factors.npy"), mmap_mode="r")
+                self.product_ids = meta["product_ids"]
+                self.columns = {product_id: column for column, product_id in enumerate(self.product_ids)}
+                self.meta = meta
+                self.loaded_mtime = mtime
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Could not load collaborative filtering model: {e}")
+
+    def score(self, history: Dict[str, float], limit: int = 10) -> List[tuple]:
+        """
+        (product_id, affinity 0-1) for products that co-occur with the weighted history,
+        best first, history items excluded
+        """
+        if not history or not self.available:
+            return []
+
+        known = [(self.columns[product_id], weight) for product_id, weight in history.items()
+                 if product_id in self.columns]
+        if not known:
+            return []
+
+        # Fold the session in: O(k*d) for k history items
+        columns = np.array([column for column, _ in known])
+        weights = np.array([weight for _, weight in known], dtype=np.float32)
+        session_vector = weights @ self.item_factors[columns]
+
+        scores = self.item_factors @ session_vector
+        scores[columns] = -np.inf
+        top = min(limit, len(scores) - len(columns))
+        if top <= 0:
+            return []
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+
+        peak = scores[best[0]]
+        if not np.isfinite(peak) or peak <= 0:
+            return []
+        return [(self.product_ids[column], float(scores[column] / peak)) for column in best if scores[column] > 0]
+
+    def train(self, batch_size: int = 1000) -> Dict:
+        """Stream the conversations log, factorize it and write the item factors"""
+        started = time.perf_counter()
+        db = get_db_manager()
+
+        with db.get_connection() as conn:
+            product_ids = [row[0] for row in conn.execute("SELECT product_id FROM products ORDER BY id")]
+            columns = {product_id: column for column, product_id in enumerate(product_ids)}
+
+            sessions = {}
+            interactions = {}
+            turns = 0
+            cursor = conn.execute("SELECT session_id, interest_score, recommended_products FROM conversations")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for session_id, interest_score, recommended in rows:
+                    turns += 1
+                    # Being shown a product is weak evidence; interest in the turn makes it stronger
+                    weight = 0.5 + max(interest_score or 0.0, 0.0) / 100
+                    for product_id in _recommended_ids(recommended):
+                        column = columns.get(product_id)
+                        if column is None:
+                            continue
+                        row = sessions.setdefault(session_id, len(sessions))
+                        interactions[(row, column)] = interactions.get((row, column), 0.0) + weight
+
+        if not interactions:
+            print("⚠️ No recommendations in the conversations log yet, nothing to train")
+            return {'turns': turns, 'sessions': 0, 'interactions': 0}
+
+        keys = np.array(list(interactions), dtype=np.int64)
+        matrix = InteractionMatrix(
+            keys[:, 0], keys[:, 1],
+            # Diminishing returns for products shown over and over in one session
+            np.log1p(np.fromiter(interactions.values(), dtype=np.float64, count=len(interactions))),
+            (len(sessions), len(product_ids))
+        )
+
+        factors = max(1, min(self.factors, len(sessions), len(product_ids)))
+        item_factors, singular_values = self._truncated_svd(matrix, factors)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._file("item_factors.npy.tmp"), "wb") as f:
+            np.save(f, item_factors.astype(np.float32))
+        os.replace(self._file("item_factors.npy.tmp"), self._file("item_factors.npy"))
+
+        meta = {
+            "product_ids": product_ids,
+            "factors": factors,
+            "singular_values": [round(float(value), 4) for value in singular_values],
+            "sessions": len(sessions),
+            "interactions": len(interactions),
+            "turns": turns,
+            "trained_at": datetime.utcnow().isoformat()
+        }
+        with open(self._file("model.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(self._file("model.json.tmp"), self._file("model.json"))
+
+        self.checked_at = 0.0
+        elapsed = time.perf_counter() - started
+        print(f"🧠 Collaborative model trained: {len(sessions)} sessions x {len(product_ids)} products, "
+              f"{len(interactions)} interactions, {factors} factors in {elapsed:.2f}s")
+        return {'turns': turns, 'sessions': len(sessions), 'interactions': len(interactions), 'factors': factors}
+
+    @staticmethod
+    def _truncated_svd(matrix: InteractionMatrix, rank: int):
+        """Randomized SVD: item factors (products x rank) and the top singular values"""
+        rng = np.random.default_rng(0)
+        sketch_size = min(rank + SVD_OVERSAMPLING, min(matrix.shape))
+
+        # Range of R, sharpened with power iterations
+        sketch, _ = np.linalg.qr(matrix.dot(rng.standard_normal((matrix.shape[1], sketch_size))))
+        for _ in range(SVD_POWER_ITERATIONS):
+            items, _ = np.linalg.qr(matrix.transpose_dot(sketch))
+            sketch, _ = np.linalg.qr(matrix.dot(items))
+
+        # Small SVD of B = Q.T @ R
+        small = matrix.transpose_dot(sketch).T
+        _, singular_values, item_basis = np.linalg.svd(small, full_matrices=False)
+        return item_basis[:rank].T, singular_values[:rank]
+
+# Global collaborative filtering model
+interaction_model = InteractionModel()
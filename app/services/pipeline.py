@@ -0,0 +1,340 @@
+"""
+Chat Pipeline - One turn = extract -> score -> retrieve -> rank -> generate
+Each stage is an interchangeable component, so the three bot engines (smart, working,
+lightweight) and the RecommendationEngine can be mixed, configured and benchmarked
+under the same harness. Preferences travel between stages in one shape:
+{'categories': [...], 'dietary': [...], 'mood': [...], 'max_budget': int}
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+from app.config.settings import (
+    CHAT_PIPELINE, PIPELINE_EXTRACTOR, PIPELINE_SCORER, PIPELINE_RETRIEVER, PIPELINE_RANKER,
+    PIPELINE_GENERATOR
+)
+from app.services.ai_service import ai_service
+from app.services.preference_extractor import smart_to_canonical, canonical_to_smart
+from app.services.real_ai_service import LightweightAIService, real_ai_service
+from app.services.recommendation_service import RecommendationEngine, recommendation_engine
+from app.services.scoring_service import RobustInterestScoringService, scoring_service
+from app.services.smart_bot_service import SmartFoodieBotService, smart_bot_service
+from app.utils.streaming import chunk_text
+
+@dataclass
+class Turn:
+    """Everything the stages know about one chat turn"""
+    message: str
+    session_id: str
+    messages: List[str]
+    preferences: Dict = field(default_factory=dict)
+    profile: Dict = field(default_factory=dict)
+    interest_score: float = 0.0
+    stage: str = 'discovery'
+    candidates: List[Dict] = field(default_factory=list)
+    products: List[Dict] = field(default_factory=list)
+    response: str = ""
+    timings: Dict[str, float] = field(default_factory=dict)
+
+# Engines the stages call, by name - the shared singletons unless a pipeline gets its own
+SERVICES = {
+    'smart': smart_bot_service,
+    'working': ai_service,
+    'lightweight': real_ai_service,
+    'scoring': scoring_service,
+    'engine': recommendation_engine
+}
+
+def isolated_services() -> Dict:
+    """
+    Fresh instances of every engine that keeps per-session state or running analytics,
+    for pipelines that must not touch the live ones (shadow candidates, warm-up)
+    """
+    return {
+        **SERVICES,
+        'smart': SmartFoodieBotService(),
+        'lightweight': LightweightAIService(),
+        'scoring': RobustInterestScoringService(),
+        'engine': RecommendationEngine()
+    }
+
+class Component:
+    SERVICE = None
+
+    def __init__(self, services: Optional[Dict] = None):
+        self.service = (services or SERVICES).get(self.SERVICE)
+
+# Extractors - message (+ session memory) -> preferences
+
+class SmartExtractor(Component):
+    """Preferences stick for the whole session, newest value wins"""
+    SERVICE = 'smart'
+
+    def extract(self, turn: Turn) -> Dict:
+        context = self.service.get_context(turn.session_id)
+        context['messages'].append(turn.message)
+        self.service.update_user_preferences(turn.message, context)
+        return smart_to_canonical(context['preferences'])
+
+class WorkingExtractor(Component):
+    """Preferences from the current message only"""
+    SERVICE = 'working'
+
+    def extract(self, turn: Turn) -> Dict:
+        return self.service.extract_preferences(turn.message)
+
+class LightweightExtractor(Component):
+    """Per-message preferences plus a profile of lasting restrictions and dislikes"""
+    SERVICE = 'lightweight'
+
+    def extract(self, turn: Turn) -> Dict:
+        profile = self.service.get_profile(turn.session_id)
+        preferences = self.service.extract_preferences(turn.message, profile)
+        self.service.update_user_profile(profile, preferences, turn.message)
+        turn.profile = profile
+        return preferences
+
+# Scorers - interest score 0-100
+
+class SmartScorer(Component):
+    SERVICE = 'smart'
+
+    def score(self, turn: Turn) -> float:
+        context = {'stage': turn.stage, 'preferences': canonical_to_smart(turn.preferences), 'messages': turn.messages}
+        return self.service.calculate_smart_interest(turn.message, context)
+
+class ConversationScorer(Component):
+    """Engagement factors, sentiment and conversation context"""
+    SERVICE = 'scoring'
+
+    def score(self, turn: Turn) -> float:
+        return self.service.calculate_interest_score(turn.message, turn.session_id)
+
+# Retrievers - preferences -> candidate products
+
+class SmartRetriever(Component):
+    SERVICE = 'smart'
+
+    def retrieve(self, turn: Turn, limit: int) -> List[Dict]:
+        context = {'preferences': canonical_to_smart(turn.preferences), 'messages': turn.messages, 'stage': turn.stage}
+        products = self.service.get_smart_recommendations(turn.message, context)
+        turn.stage = context['stage']
+        return products
+
+class WorkingRetriever(Component):
+    SERVICE = 'working'
+
+    def retrieve(self, turn: Turn, limit: int) -> List[Dict]:
+        return self.service.recommend_products(turn.preferences)
+
+class LightweightRetriever(Component):
+    """Honours dislikes and lasting dietary restrictions from the profile"""
+    SERVICE = 'lightweight'
+
+    def retrieve(self, turn: Turn, limit: int) -> List[Dict]:
+        profile = turn.profile or {'dietary_restrictions': turn.preferences.get('dietary', []), 'dislikes': []}
+        return self.service.query_products(turn.message, turn.preferences, profile)
+
+class EngineRetriever(Component):
+    """RecommendationEngine - six algorithms blended by interest score"""
+    SERVICE = 'engine'
+
+    def retrieve(self, turn: Turn, limit: int) -> List[Dict]:
+        return self.service.get_smart_recommendations(
+            turn.preferences, turn.session_id, turn.interest_score, limit=limit, message=turn.message
+        )
+
+class SemanticRetriever(Component):
+    """Free-text similarity only (budget, dietary and allergens still apply)"""
+    SERVICE = 'engine'
+
+    def retrieve(self, turn: Turn, limit: int) -> List[Dict]:
+        return [product for product, _ in self.service.get_semantic_matches(turn.message, turn.preferences, limit)]
+
+# Rankers - candidates -> final products
+
+class RetrievalOrderRanker(Component):
+    def rank(self, turn: Turn, limit: int) -> List[Dict]:
+        return turn.candidates[:limit]
+
+class PreferenceRanker(Component):
+    SERVICE = 'engine'
+
+    def rank(self, turn: Turn, limit: int) -> List[Dict]:
+        return self.service.rank_products(turn.candidates, turn.preferences, limit=limit)
+
+# Generators - reply text
+
+class SmartGenerator(Component):
+    SERVICE = 'smart'
+
+    def generate(self, turn: Turn) -> str:
+        context = {'preferences': canonical_to_smart(turn.preferences)}
+        return self.service.generate_smart_response(turn.message, turn.products, context)
+
+    def stream(self, turn: Turn) -> Iterator[str]:
+        return chunk_text(self.generate(turn))
+
+class WorkingGenerator(Component):
+    SERVICE = 'working'
+
+    def generate(self, turn: Turn) -> str:
+        return self.service.generate_response(turn.message, turn.products, turn.session_id)
+
+    def stream(self, turn: Turn) -> Iterator[str]:
+        return self.service.stream_response(turn.message, turn.products)
+
+class LightweightGenerator(Component):
+    SERVICE = 'lightweight'
+
+    def generate(self, turn: Turn) -> str:
+        profile = turn.profile or {'dietary_restrictions': [], 'dislikes': []}
+        return self.service.generate_response(turn.message, profile, turn.products)
+
+    def stream(self, turn: Turn) -> Iterator[str]:
+        return chunk_text(self.generate(turn))
+
+COMPONENTS = {
+    'extractor': {'smart': SmartExtractor, 'working': WorkingExtractor, 'lightweight': LightweightExtractor},
+    'scorer': {'smart': SmartScorer, 'conversation': ConversationScorer},
+    'retriever': {'smart': SmartRetriever, 'working': WorkingRetriever,
+                  'lightweight': LightweightRetriever, 'engine': EngineRetriever, 'semantic': SemanticRetriever},
+    'ranker': {'none': RetrievalOrderRanker, 'preference': PreferenceRanker},
+    'generator': {'smart': SmartGenerator, 'working': WorkingGenerator, 'lightweight': LightweightGenerator}
+}
+
+# The three original engines, plus RecommendationEngine behind the lightweight dialogue
+PRESETS = {
+    'smart': {'extractor': 'smart', 'scorer': 'smart', 'retriever': 'smart', 'ranker': 'none', 'generator': 'smart'},
+    'working': {'extractor': 'working', 'scorer': 'conversation', 'retriever': 'working', 'ranker': 'none', 'generator': 'working'},
+    'lightweight': {'extractor': 'lightweight', 'scorer': 'conversation', 'retriever': 'lightweight', 'ranker': 'none', 'generator': 'lightweight'},
+    'engine': {'extractor': 'lightweight', 'scorer': 'conversation', 'retriever': 'engine', 'ranker': 'preference', 'generator': 'lightweight'}
+}
+
+class ChatPipeline:
+    STAGES = ['extract', 'score', 'retrieve', 'rank']
+
+    def __init__(self, name: str, extractor, scorer, retriever, ranker, generator, limit: int = 5):
+        self.name = name
+        self.extractor = extractor
+        self.scorer = scorer
+        self.retriever = retriever
+        self.ranker = ranker
+        self.generator = generator
+        self.limit = limit
+        self.sessions: Dict[str, List[str]] = {}
+        self.turns = 0
+        self.stage_totals = {stage: 0.0 for stage in self.STAGES + ['generate']}
+
+    def run(self, message: str, session_id: str) -> Turn:
+        """Process one turn end to end"""
+        turn = self.prepare(message, session_id)
+
+        started = time.perf_counter()
+        turn.response = self.generator.generate(turn)
+        self._record(turn, 'generate', started)
+
+        return turn
+
+    def stream(self, message: str, session_id: str):
+        """
+        Everything but generation runs now; returns the turn (products, score) and
+        a lazy iterator of reply chunks
+        """
+        turn = self.prepare(message, session_id)
+
+        def chunks() -> Iterator[str]:
+            started = time.perf_counter()
+            parts = []
+            try:
+                for chunk in self.generator.stream(turn):
+                    parts.append(chunk)
+                    yield chunk
+            finally:
+                # Whatever was sent is the reply, even if generation stopped early
+                turn.response = "".join(parts).strip()
+                self._record(turn, 'generate', started)
+
+        return turn, chunks()
+
+    def prepare(self, message: str, session_id: str, preferences: Optional[Dict] = None) -> Turn:
+        """
+        Run the stages before generation; known preferences (e.g. a stored turn being
+        replayed) skip extraction
+        """
+        history = self.sessions.setdefault(session_id, [])
+        history.append(message)
+        turn = Turn(message=message, session_id=session_id, messages=history)
+        turn.stage = 'discovery' if len(history) <= 2 else 'recommendation'
+
+        started = time.perf_counter()
+        turn.preferences = self.extractor.extract(turn) if preferences is None else preferences
+        started = self._record(turn, 'extract', started)
+
+        turn.interest_score = self.scorer.score(turn)
+        started = self._record(turn, 'score', started)
+
+        turn.candidates = self.retriever.retrieve(turn, self.limit)
+        started = self._record(turn, 'retrieve', started)
+
+        turn.products = self.ranker.rank(turn, self.limit)
+        self._record(turn, 'rank', started)
+
+        self.turns += 1
+        return turn
+
+    def isolated(self) -> 'ChatPipeline':
+        """The same stages on engines of their own (see isolated_services) - records nothing live"""
+        services = isolated_services()
+        return ChatPipeline(self.name, limit=self.limit, **{
+            stage: type(getattr(self, stage))(services)
+            for stage in ['extractor', 'scorer', 'retriever', 'ranker', 'generator']
+        })
+
+    def get_stats(self) -> Dict:
+        return {
+            'pipeline': self.name,
+            'turns': self.turns,
+            'average_stage_ms': {
+                stage: round(total / self.turns, 3) if self.turns else 0
+                for stage, total in self.stage_totals.items()
+            }
+        }
+
+    def _record(self, turn: Turn, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        elapsed = (now - started) * 1000
+        turn.timings[stage] = round(elapsed, 3)
+        self.stage_totals[stage] += elapsed
+        return now
+
+def build_pipeline(preset: str = 'smart', services: Optional[Dict] = None, **overrides) -> ChatPipeline:
+    """
+    Build a pipeline from a preset, with any stage swapped by name,
+    e.g. build_pipeline('smart', retriever='engine', ranker='preference').
+    `services` (see isolated_services) replaces the shared engines the stages call
+    """
+    if preset not in PRESETS:
+        print(f"⚠️ Unknown pipeline preset '{preset}', using smart")
+        preset = 'smart'
+
+    choice = dict(PRESETS[preset])
+    for stage, component in overrides.items():
+        if component:
+            if component not in COMPONENTS[stage]:
+                raise ValueError(f"Unknown {stage} '{component}', choose from {sorted(COMPONENTS[stage])}")
+            choice[stage] = component
+
+    name = preset if choice == PRESETS[preset] else f"{preset}[" + ",".join(
+        f"{stage}={component}" for stage, component in choice.items() if component != PRESETS[preset][stage]
+    ) + "]"
+
+    return ChatPipeline(name, **{stage: COMPONENTS[stage][component](services) for stage, component in choice.items()})
+
+def configured_pipeline(default_preset: str) -> ChatPipeline:
+    """The app's pipeline: CHAT_PIPELINE preset (or the app default) plus PIPELINE_* overrides"""
+    return build_pipeline(
+        CHAT_PIPELINE or default_preset,
+        extractor=PIPELINE_EXTRACTOR, scorer=PIPELINE_SCORER, retriever=PIPELINE_RETRIEVER,
+        ranker=PIPELINE_RANKER, generator=PIPELINE_GENERATOR
+    )
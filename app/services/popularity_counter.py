@@ -0,0 +1,188 @@
+"""
+Live Popularity - Decayed demand counters flushed to products.popularity_score in batches
+Recommendations shown, and more so those of high-interest turns, bump an in-memory counter.
+Counts use forward decay (each increment is scaled up by when it happened, relative to a
+landmark) so recording is one dict update, with no per-counter clock. A background thread
+folds the pending counts into product_demand and rewrites the popularity_score of every
+product whose score moved, in one transaction.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable
+from app.config.settings import (
+    POPULARITY_FLUSH_INTERVAL, POPULARITY_HALF_LIFE_HOURS, POPULARITY_PRIOR_WEIGHT, POPULARITY_HIGH_INTEREST
+)
+from app.models.database import get_db_manager
+from app.services.catalog_service import catalog_service
+from app.services.popularity_lists import popularity_lists
+from app.services.smart_bot_service import answer_table
+
+# The chat UIs show the top three recommendations of a turn
+SHOWN_PRODUCTS = 3
+SHOWN_WEIGHT = 1.0
+# Added on top for products shown in a high-interest turn
+HIGH_INTEREST_WEIGHT = 2.0
+# Demand below this has decayed away - the row is dropped and the seeded score restored
+MIN_DEMAND = 0.01
+
+class PopularityCounter:
+    def __init__(self, flush_interval: float = POPULARITY_FLUSH_INTERVAL,
+                 half_life_hours: float = POPULARITY_HALF_LIFE_HOURS,
+                 prior_weight: float = POPULARITY_PRIOR_WEIGHT,
+                 high_interest: float = POPULARITY_HIGH_INTEREST):
+        self.flush_interval = flush_interval
+        self.half_life = max(half_life_hours, 0.001) * 3600
+        self.prior_weight = prior_weight
+        self.high_interest = high_interest
+
+        # Forward-decayed counts since the last flush, relative to landmark
+        self.pending: Dict[str, float] = {}
+        self.landmark = time.time()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.worker = None
+
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    def record_turn(self, turn):
+        """Count the products a chat turn showed"""
+        self.record([product['product_id'] for product in turn.products[:SHOWN_PRODUCTS]], turn.interest_score)
+
+    def record(self, product_ids: Iterable[str], interest_score: float = 0.0):
+        """One showing of each product; never touches the database"""
+        if not self.enabled:
+            return
+        weight = SHOWN_WEIGHT + (HIGH_INTEREST_WEIGHT if (interest_score or 0) >= self.high_interest else 0.0)
+
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._work, name="popularity-flush", daemon=True)
+                self.worker.start()
+            boost = weight * self._growth(time.time() - self.landmark)
+            for product_id in product_ids:
+                self.pending[product_id] = self.pending.get(product_id, 0.0) + boost
+            self.recorded += 1
+
+    def flush(self) -> Dict[str, int]:
+        """Write the pending counts and every moved score in one transaction; returns the new scores"""
+        if not self.enabled:
+            return {}
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            landmark, self.landmark = self.landmark, time.time()
+        now = self.landmark
+        # Pending counts as of now
+        pending = {product_id: count / self._growth(now - landmark) for product_id, count in pending.items()}
+
+        started = time.perf_counter()
+        with self.flush_lock:
+            try:
+                changed = self._write(pending, now)
+            except Exception as e:
+                # Keep the counts for the next attempt (they are "as of now", the new landmark)
+                with self.lock:
+                    for product_id, count in pending.items():
+                        self.pending[product_id] = self.pending.get(product_id, 0.0) + count
+                    self.errors += 1
+                print(f"⚠️ Popularity flush failed: {e}")
+                return {}
+
+        self.flushes += 1
+        self.rows_written += len(changed)
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        if changed:
+            # Products were written - drop cached match counts and re-rank the precomputed
+            # orders in place (the popularity-free snapshot and indexes are not rebuilt)
+            catalog_service.invalidate()
+            signature = catalog_service.get_catalog_signature()
+            try:
+                popularity_lists.apply_updates(changed, signature)
+                answer_table.apply_updates(changed, signature)
+            except Exception as e:
+                print(f"⚠️ Popularity lists update failed: {e}")
+        return changed
+
+    def _write(self, pending: Dict[str, float], now: float) -> Dict[str, int]:
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            # Take the write lock before reading, so workers flushing at once add up instead of overwriting
+            conn.execute("BEGIN IMMEDIATE")
+            tracked = {
+                row[0]: row[1:] for row in conn.execute("""
+                    SELECT d.product_id, d.prior, d.demand, d.updated_at, p.popularity_score
+                    FROM product_demand d JOIN products p ON p.product_id = d.product_id
+                """)
+            }
+            new_ids = [product_id for product_id in pending if product_id not in tracked]
+            for start in range(0, len(new_ids), 500):
+                chunk = new_ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT product_id, popularity_score FROM products WHERE product_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for product_id, score in rows:
+                    # The seeded score becomes the prior live demand is blended with
+                    tracked[product_id] = (score or 0, 0.0, now, score or 0)
+
+            upserts, deletes, changed = [], [], {}
+            for product_id, (prior, demand, updated_at, current) in tracked.items():
+                demand = demand / self._growth(now - updated_at) + pending.get(product_id, 0.0)
+                if demand < MIN_DEMAND:
+                    deletes.append((product_id,))
+                    score = prior
+                else:
+                    if product_id in pending:
+                        upserts.append((product_id, prior, demand, now))
+                    # Bayesian average: prior_weight pseudo-events at the seeded score, each live one at 100
+                    score = round((self.prior_weight * prior + 100 * demand) / (self.prior_weight + demand))
+                if score != current:
+                    changed[product_id] = score
+
+            conn.executemany("""
+                INSERT INTO product_demand (product_id, prior, demand, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(product_id) DO UPDATE SET demand = excluded.demand, updated_at = excluded.updated_at
+            """, upserts)
+            conn.executemany("DELETE FROM product_demand WHERE product_id = ?", deletes)
+            conn.executemany("UPDATE products SET popularity_score = ? WHERE product_id = ?",
+                             [(score, product_id) for product_id, score in changed.items()])
+            conn.commit()
+        return changed
+
+    def _growth(self, seconds: float) -> float:
+        return 2 ** (seconds / self.half_life)
+
+    def _work(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Popularity flush error: {e}")
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            "enabled": self.enabled,
+            "flush_interval": self.flush_interval,
+            "half_life_hours": round(self.half_life / 3600, 3),
+            "recorded_turns": self.recorded,
+            "pending_products": pending,
+            "flushes": self.flushes,
+            "scores_written": self.rows_written,
+            "last_flush_ms": self.last_flush_ms,
+            "errors": self.errors
+        }
+
+# Global live popularity counter
+popularity_counter = PopularityCounter()
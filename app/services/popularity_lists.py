@@ -0,0 +1,208 @@
+"""
+Popularity Lists - Pre-sorted top-N products overall, per category and per tag
+Most queries end in `ORDER BY popularity_score DESC LIMIT n` with at most one category or
+tag filter; with the lists kept at load time they become a slice (or a merge of a few
+sorted lists) instead of a sort. Popularity changes are applied to the affected lists in
+place; a list that can no longer tell who is next in line is refilled from SQL. Updates
+swap in a new dict of lists, so readers never see one half-applied. Scores flushed by
+other workers are picked up from the products table every sync interval.
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.config.settings import POPULARITY_TOP_N, POPULARITY_FLUSH_INTERVAL, CATALOG_SNAPSHOT_TTL
+from app.models.database import get_db_manager
+from app.services.catalog_service import catalog_service
+from app.services.catalog_snapshot import catalog_snapshot, TAG_COLUMNS
+
+# Tag columns with their own lists (allergens are only ever excluded, never ranked)
+LIST_TAG_COLUMNS = ['dietary_tags', 'mood_tags']
+
+def _rank(product: Dict) -> Tuple[int, int]:
+    """Sort key matching `ORDER BY popularity_score DESC, id ASC`"""
+    return -(product['popularity_score'] or 0), product['id']
+
+def _list_keys(product: Dict) -> List[tuple]:
+    """Every list the product belongs to"""
+    keys = [('all', None), ('category', product['category'])]
+    for column in LIST_TAG_COLUMNS:
+        keys.extend((column, tag) for tag in product.get(column) or [])
+    return keys
+
+class PopularityLists:
+    def __init__(self, depth: int = POPULARITY_TOP_N,
+                 sync_interval: float = POPULARITY_FLUSH_INTERVAL or CATALOG_SNAPSHOT_TTL):
+        self.depth = depth
+        self.sync_interval = sync_interval
+        # Replaced as a whole, never changed in place - readers take one reference
+        self.lists: Dict[tuple, List[Dict]] = {}
+        # product_id -> popularity_score the lists reflect
+        self.scores: Dict[str, int] = {}
+        self.synced_at = 0.0
+        # Lists whose tail fell out of view after an update, refilled on next use
+        self.stale = set()
+        # Snapshot the lists were built from, and the catalog (scores included) they reflect
+        self.source_signature = None
+        self.signature = None
+        self.lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """
+        Rebuild when the snapshot changed (products added, removed or edited) and pick up
+        scores written by other workers every sync_interval
+        """
+        catalog_snapshot.ensure_loaded()
+        if catalog_snapshot.signature == self.source_signature and self.lists:
+            if time.monotonic() - self.synced_at >= self.sync_interval:
+                self.sync()
+            return
+        with self.lock:
+            if catalog_snapshot.signature != self.source_signature or not self.lists:
+                self.build()
+
+    def sync(self):
+        """Apply every score that differs from what the lists reflect (other workers' flushes)"""
+        self.synced_at = time.monotonic()
+        signature = catalog_service.get_catalog_signature()
+        if signature == self.signature:
+            return
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            rows = conn.execute("SELECT product_id, popularity_score FROM products").fetchall()
+        moved = {product_id: score or 0 for product_id, score in rows if self.scores.get(product_id) != (score or 0)}
+        self.apply_updates(moved, signature)
+
+    def build(self):
+        """Walk the products once, most popular first, and keep the top N of each list"""
+        # Read before the scores, so a write in between shows up at the next sync
+        signature = catalog_service.get_catalog_signature()
+        lists: Dict[tuple, List[Dict]] = {}
+        scores: Dict[str, int] = {}
+        for product in catalog_snapshot.ranked_products():
+            scores[product['product_id']] = product['popularity_score'] or 0
+            for key in _list_keys(product):
+                entries = lists.setdefault(key, [])
+                if len(entries) < self.depth:
+                    entries.append(product)
+        self.lists = lists
+        self.scores = scores
+        self.stale = set()
+        self.source_signature = catalog_snapshot.signature
+        self.signature = signature
+        self.synced_at = time.monotonic()
+
+    def top(self, limit: int, categories: Optional[Iterable[str]] = None,
+            tag_column: Optional[str] = None, tag_terms: Optional[Iterable[str]] = None) -> Optional[List[Dict]]:
+        """
+        Most popular products overall, in any of the categories, or with a tag containing
+        any of the terms (the `tag_column LIKE '%term%'` match) - copies, best first.
+        None when the lists cannot answer exactly (limit deeper than the lists)
+        """
+        if limit > self.depth:
+            return None
+        self.ensure_loaded()
+        lists = self.lists
+
+        if categories is not None:
+            keys = [('category', category) for category in categories]
+        elif tag_column is not None:
+            if tag_column not in LIST_TAG_COLUMNS:
+                return None
+            terms = [term.lower() for term in tag_terms or []]
+            keys = [key for key in lists
+                    if key[0] == tag_column and any(term in key[1].lower() for term in terms)]
+        else:
+            keys = [('all', None)]
+
+        if any(key in self.stale for key in keys):
+            with self.lock:
+                for key in keys:
+                    if key in self.stale:
+                        self._refill(key)
+                lists = self.lists
+        sorted_lists = [lists.get(key, []) for key in keys]
+
+        merged = []
+        seen = set()
+        for product in heapq.merge(*sorted_lists, key=_rank):
+            if product['product_id'] in seen:
+                continue
+            seen.add(product['product_id'])
+            merged.append(dict(product))
+            if len(merged) == limit:
+                break
+        return merged
+
+    def apply_updates(self, scores: Dict[str, int], signature: Optional[str] = None):
+        """
+        New popularity_score per product_id, already committed to the products table.
+        Pass the catalog signature after the commit so the next sync does not re-read them
+        """
+        self.ensure_loaded()
+        with self.lock:
+            # Work on a copy and swap it in whole, so readers never see half an update
+            lists = dict(self.lists)
+            current = {}
+            for entries in lists.values():
+                for product in entries:
+                    current[product['product_id']] = product
+            missing = [product_id for product_id in scores if product_id not in current]
+            for product in catalog_snapshot.get_products_by_ids(missing):
+                current[product['product_id']] = product
+
+            for product_id, score in scores.items():
+                self.scores[product_id] = int(score)
+                if product_id not in current:
+                    continue
+                updated = dict(current[product_id], popularity_score=int(score))
+                for key in _list_keys(updated):
+                    lists[key] = self._reposition(key, lists.get(key, []), updated)
+
+            self.lists = lists
+            if signature:
+                self.signature = signature
+
+    def _reposition(self, key: tuple, entries: List[Dict], updated: Dict) -> List[Dict]:
+        """Copy of one list with the product moved to its new place (copy-on-write for readers)"""
+        was_member = any(product['product_id'] == updated['product_id'] for product in entries)
+        # A list shorter than N holds every product with the key, so it is always exact
+        full = len(entries) >= self.depth
+        entries = [product for product in entries if product['product_id'] != updated['product_id']]
+
+        if full and entries and _rank(updated) > _rank(entries[-1]):
+            if not was_member:
+                # Still outside the top N
+                return entries
+            # Dropped to the end - an unlisted product may now be ahead of it
+            self.stale.add(key)
+
+        ranks = [_rank(product) for product in entries]
+        entries.insert(bisect.bisect_right(ranks, _rank(updated)), updated)
+        return entries[:self.depth]
+
+    def _refill(self, key: tuple):
+        """Reload one list from SQL (idx_product_category_popularity / idx_product_popularity)"""
+        kind, value = key
+        query = "SELECT * FROM products"
+        params = []
+        if kind == 'category':
+            query += " WHERE category = ?"
+            params.append(value)
+        elif kind in TAG_COLUMNS:
+            # Tags are stored as a JSON list - match the quoted tag exactly
+            query += f" WHERE {kind} LIKE ?"
+            params.append(f'%"{value}"%')
+        query += " ORDER BY popularity_score DESC, id ASC LIMIT ?"
+        params.append(self.depth)
+
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        self.lists = {**self.lists, key: [db.parse_json_fields(dict(row)) for row in rows]}
+        self.stale.discard(key)
+
+# Global popularity lists
+popularity_lists = PopularityLists()
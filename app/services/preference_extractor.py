@@ -0,0 +1,152 @@
+"""
+Preference Extractor - One lexicon, one regex pass
+The category, dietary and mood vocabularies plus the budget phrases are compiled once
+into a single trie-shaped regex; every engine extracts preferences through it
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# slot -> value -> words that signal it (matched at the start of a word, so plurals count)
+LEXICON = {
+    'categories': {
+        'Pizza': ['pizza', 'slice', 'pepperoni', 'margherita'],
+        'Burgers': ['burger', 'patty', 'sandwich'],
+        'Fried Chicken': ['chicken', 'wings', 'tenders'],
+        'Tacos & Wraps': ['taco', 'wrap', 'burrito', 'mexican', 'quesadilla'],
+        'Desserts': ['dessert', 'sweet', 'cake', 'ice cream', 'chocolate'],
+        'Beverages': ['drink', 'beverage', 'juice', 'soda', 'smoothie', 'shake', 'milkshake'],
+        'Salads & Healthy Options': ['salad', 'healthy', 'fresh', 'greens', 'bowl'],
+        'Breakfast Items': ['breakfast', 'morning', 'pancakes', 'eggs', 'brunch']
+    },
+    'dietary': {
+        'vegetarian': ['vegetarian', 'veggie', 'no meat', 'plant based', 'veg option'],
+        'vegan': ['vegan', 'plant-based', 'no animal products', 'dairy free'],
+        'gluten-free': ['gluten-free', 'gluten free', 'no gluten', 'celiac'],
+        'keto': ['keto', 'low-carb', 'no carbs'],
+        'healthy': ['healthy', 'light', 'fresh', 'clean', 'nutritious']
+    },
+    'mood': {
+        'spicy': ['spicy', 'hot', 'fire', 'heat', 'kick', 'jalapeño', 'jalapeno', 'chili', 'sriracha'],
+        'sweet': ['sweet', 'dessert', 'sugar', 'chocolate', 'vanilla', 'caramel'],
+        'comfort': ['comfort', 'hearty', 'filling', 'satisfying', 'cozy'],
+        'fresh': ['fresh', 'light', 'crisp', 'refreshing', 'clean'],
+        'rich': ['rich', 'creamy', 'indulgent', 'decadent', 'luxurious']
+    }
+}
+
+# The smart engine filters on one diet - a meat-free request outranks the softer ones
+SMART_DIETARY_PRIORITY = ['vegetarian', 'vegan', 'gluten-free', 'keto', 'healthy']
+# ...and on one category, named by a dish: in the order it always checked them, then the rest
+SMART_CATEGORY_PRIORITY = ['Pizza', 'Burgers', 'Salads & Healthy Options', 'Fried Chicken', 'Desserts']
+# Category words that only describe the food - never a category filter for the smart engine
+SMART_SOFT_CATEGORY_WORDS = {'healthy', 'fresh', 'bowl'}
+
+# "under $15", "less than 10", "budget is about 20", ...
+BUDGET_PATTERN = r'(?:(?:under|less than|below|around|maximum|max|up to|no more than)\s*\$?|budget\D*?)(?P<budget>\d+)'
+
+def _trie_pattern(words: List[str]) -> str:
+    """Alternation with shared prefixes factored out, longest match first"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A word can end here - try the longer words first
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+class PreferenceExtractor:
+    def __init__(self, lexicon: Dict = LEXICON):
+        self.lexicon = lexicon
+        # word -> every (slot, value) it signals
+        self.signals = {}
+        for slot, values in lexicon.items():
+            for value, words in values.items():
+                for word in words:
+                    self.signals.setdefault(word, []).append((slot, value))
+
+        self.pattern = re.compile(
+            BUDGET_PATTERN + r'|\b(?P<word>' + _trie_pattern(list(self.signals)) + ')'
+        )
+
+    def extract(self, message: str) -> Dict:
+        """
+        All slots from one scan of the message, values in the order they are mentioned:
+        {'categories': [...], 'dietary': [...], 'mood': [...], 'max_budget': int}
+        """
+        preferences = {}
+
+        for match in self.pattern.finditer(message.lower()):
+            word = match.group('word')
+            if word is None:
+                # First budget mentioned wins
+                preferences.setdefault('max_budget', int(match.group('budget')))
+                continue
+
+            for slot, value in self.signals[word]:
+                values = preferences.setdefault(slot, [])
+                if value not in values:
+                    values.append(value)
+
+        return preferences
+
+def smart_to_canonical(preferences: Dict) -> Dict:
+    """SmartFoodieBotService keeps single values ('dietary': 'vegan', 'flavor', 'category')"""
+    canonical = {}
+    if 'dietary' in preferences:
+        canonical['dietary'] = [preferences['dietary']]
+    if 'flavor' in preferences:
+        canonical['mood'] = [preferences['flavor']]
+    if 'category' in preferences:
+        canonical['categories'] = [preferences['category']]
+    return canonical
+
+def _named_categories(message: str) -> List[str]:
+    """Categories the message names by a dish, leaving out the soft words"""
+    categories = []
+    for match in preference_extractor.pattern.finditer(message.lower()):
+        word = match.group('word')
+        if word is None or word in SMART_SOFT_CATEGORY_WORDS:
+            continue
+        for slot, value in preference_extractor.signals[word]:
+            if slot == 'categories' and value not in categories:
+                categories.append(value)
+    return categories
+
+def canonical_to_smart(preferences: Dict, message: Optional[str] = None) -> Dict:
+    """
+    Pick one value per slot. With the message, the 'healthy' diet needs the word itself
+    (as the smart engine always did) and only dishes count as a category, so 'light',
+    'fresh' or 'bowl' never turn into a category filter
+    """
+    smart = {}
+    diets = preferences.get('dietary', [])
+    if message is not None and 'healthy' not in message.lower():
+        diets = [diet for diet in diets if diet != 'healthy']
+    if diets:
+        smart['dietary'] = min(diets, key=lambda diet: (
+            SMART_DIETARY_PRIORITY.index(diet) if diet in SMART_DIETARY_PRIORITY else len(SMART_DIETARY_PRIORITY)
+        ))
+    flavors = [mood for mood in preferences.get('mood', []) if mood in ('spicy', 'sweet')]
+    if flavors:
+        smart['flavor'] = flavors[0]
+    categories = preferences.get('categories', []) if message is None else _named_categories(message)
+    if categories:
+        smart['category'] = min(categories, key=lambda category: (
+            SMART_CATEGORY_PRIORITY.index(category) if category in SMART_CATEGORY_PRIORITY else len(SMART_CATEGORY_PRIORITY)
+        ))
+    return smart
+
+# Global preference extractor
+preference_extractor = PreferenceExtractor()
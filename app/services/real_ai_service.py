@@ -5,20 +5,25 @@ Lightweight Real AI Service - Uses APIs, not local models
 import os
 import sqlite3
 import json
-import requests
 from typing import Dict, List, Tuple, Optional
 from dotenv import load_dotenv
+from app.config.settings import DATABASE_URL
+from app.services.generation_backend import generation_backend
+from app.services.batch_scheduler import generation_scheduler
+from app.services.preference_extractor import preference_extractor
 
 load_dotenv()
 
 class LightweightAIService:
     def __init__(self):
         self.hf_key = os.getenv("HUGGINGFACE_API_KEY")
-        self.db_path = "./data/foodiebot.db"
+        self.db_path = DATABASE_URL
         self.user_profiles = {}
         
         if self.hf_key:
             print(f"✅ HuggingFace API key loaded: {self.hf_key[:8]}...")
+        elif generation_backend.available:
+            print(f"⚠️ No API key found - generating with the {generation_backend.name} backend")
         else:
             print("⚠️ No API key found - will use intelligent system")
 
@@ -26,28 +31,19 @@ class LightweightAIService:
         """
         Process message with real AI and database integration
         """
-        # Initialize user profile
-        if session_id not in self.user_profiles:
-            self.user_profiles[session_id] = {
-                'preferences': {},
-                'dietary_restrictions': [],
-                'dislikes': [],
-                'conversation_history': []
-            }
-        
-        profile = self.user_profiles[session_id]
+        profile = self.get_profile(session_id)
         
         # Extract preferences intelligently
-        preferences = self._extract_preferences_smartly(user_message, profile)
+        preferences = self.extract_preferences(user_message, profile)
         
         # Update profile
-        self._update_user_profile(profile, preferences, user_message)
+        self.update_user_profile(profile, preferences, user_message)
         
         # Query database based on preferences
-        matching_products = self._query_database_intelligently(user_message, preferences, profile)
+        matching_products = self.query_products(user_message, preferences, profile)
         
         # Generate AI response
-        ai_response = self._generate_real_ai_response(user_message, profile, matching_products)
+        ai_response = self.generate_response(user_message, profile, matching_products)
         
         # Store conversation
         profile['conversation_history'].append({
@@ -59,84 +55,24 @@ class LightweightAIService:
         print(f"🤖 AI processed: {len(matching_products)} products found")
         return ai_response, preferences, matching_products
 
-    def _extract_preferences_smartly(self, message: str, profile: Dict) -> Dict:
+    def get_profile(self, session_id: str) -> Dict:
+        """Initialize user profile"""
+        if session_id not in self.user_profiles:
+            self.user_profiles[session_id] = {
+                'preferences': {},
+                'dietary_restrictions': [],
+                'dislikes': [],
+                'conversation_history': []
+            }
+        return self.user_profiles[session_id]
+
+    def extract_preferences(self, message: str, profile: Dict) -> Dict:
         """
-        Smart preference extraction using pattern matching and context
+        Categories, dietary needs, moods and budget from the shared lexicon
         """
-        preferences = {}
-        message_lower = message.lower().strip()
-        
-        # Category detection with context
-        category_patterns = {
-            'Pizza': ['pizza', 'slice', 'pepperoni', 'margherita', 'cheese pizza'],
-            'Burgers': ['burger', 'patty', 'sandwich', 'beef burger', 'chicken burger'],
-            'Fried Chicken': ['chicken', 'wings', 'fried chicken', 'crispy chicken', 'tenders'],
-            'Tacos & Wraps': ['taco', 'wrap', 'burrito', 'mexican', 'quesadilla'],
-            'Desserts': ['dessert', 'sweet', 'cake', 'ice cream', 'chocolate'],
-            'Beverages': ['drink', 'beverage', 'juice', 'soda', 'smoothie', 'shake'],
-            'Salads & Healthy Options': ['salad', 'healthy', 'fresh', 'greens', 'bowl'],
-            'Breakfast Items': ['breakfast', 'morning', 'pancakes', 'eggs', 'brunch']
-        }
-        
-        detected_categories = []
-        for category, patterns in category_patterns.items():
-            if any(pattern in message_lower for pattern in patterns):
-                detected_categories.append(category)
-        
-        if detected_categories:
-            preferences['categories'] = detected_categories
-        
-        # Dietary restrictions with intelligent detection
-        dietary_patterns = {
-            'vegetarian': ['vegetarian', 'veggie', 'no meat', 'plant based', 'veg option'],
-            'vegan': ['vegan', 'plant-based', 'no animal products', 'dairy free'],
-            'gluten-free': ['gluten-free', 'gluten free', 'no gluten', 'celiac'],
-            'keto': ['keto', 'low-carb', 'no carbs', 'ketogenic'],
-            'healthy': ['healthy', 'light', 'fresh', 'clean', 'nutritious']
-        }
-        
-        dietary_prefs = []
-        for diet, patterns in dietary_patterns.items():
-            if any(pattern in message_lower for pattern in patterns):
-                dietary_prefs.append(diet)
-        
-        if dietary_prefs:
-            preferences['dietary'] = dietary_prefs
-        
-        # Mood/flavor preferences with context
-        mood_patterns = {
-            'spicy': ['spicy', 'hot', 'fire', 'heat', 'kick', 'jalapeño', 'chili', 'sriracha'],
-            'sweet': ['sweet', 'dessert', 'sugar', 'chocolate', 'vanilla', 'caramel'],
-            'comfort': ['comfort', 'hearty', 'filling', 'satisfying', 'cozy'],
-            'fresh': ['fresh', 'light', 'crisp', 'refreshing', 'clean'],
-            'rich': ['rich', 'creamy', 'indulgent', 'decadent', 'luxurious']
-        }
-        
-        mood_prefs = []
-        for mood, patterns in mood_patterns.items():
-            if any(pattern in message_lower for pattern in patterns):
-                mood_prefs.append(mood)
-        
-        if mood_prefs:
-            preferences['mood'] = mood_prefs
-        
-        # Budget extraction with smart patterns
-        import re
-        budget_patterns = [
-            r'under \$?(\d+)', r'less than \$?(\d+)', r'below \$?(\d+)',
-            r'budget.*?(\d+)', r'around \$?(\d+)', r'maximum \$?(\d+)'
-        ]
-        
-        for pattern in budget_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
-                budget = int(match.group(1))
-                preferences['max_budget'] = budget
-                break
-        
-        return preferences
+        return preference_extractor.extract(message)
 
-    def _update_user_profile(self, profile: Dict, new_preferences: Dict, message: str):
+    def update_user_profile(self, profile: Dict, new_preferences: Dict, message: str):
         """
         Update user profile with intelligent context tracking
         """
@@ -165,7 +101,7 @@ class LightweightAIService:
         # Update preferences with context
         profile['preferences'].update(new_preferences)
 
-    def _query_database_intelligently(self, message: str, preferences: Dict, profile: Dict) -> List[Dict]:
+    def query_products(self, message: str, preferences: Dict, profile: Dict) -> List[Dict]:
         """
         Query database with intelligent filtering based on user context
         """
@@ -266,18 +202,18 @@ class LightweightAIService:
             print(f"❌ Database query error: {e}")
             return []
 
-    def _generate_real_ai_response(self, message: str, profile: Dict, products: List[Dict]) -> str:
+    def generate_response(self, message: str, profile: Dict, products: List[Dict]) -> str:
         """
         Generate response using real AI API or intelligent contextual system
         """
         # Build context for AI
         context = self._build_context_for_ai(message, profile, products)
         
-        # Try HuggingFace API first
-        if self.hf_key:
-            api_response = self._call_huggingface_api(context, message)
+        # Try the generation backend first (HuggingFace API or local)
+        if generation_backend.available:
+            api_response = self._call_generation_backend(context, message)
             if api_response and len(api_response.strip()) > 15:
-                print("✅ Generated using HuggingFace AI API")
+                print(f"✅ Generated using {generation_backend.name} backend")
                 return self._enhance_response_with_products(api_response, products)
         
         # Use intelligent contextual generation
@@ -313,62 +249,44 @@ class LightweightAIService:
         
         return "\n".join(context_parts)
 
-    def _call_huggingface_api(self, context: str, message: str) -> str:
+    def _call_generation_backend(self, context: str, message: str) -> str:
         """
-        Call HuggingFace API for real AI generation
+        Generate a reply with the configured backend
         """
         try:
-            models = [
-                "microsoft/DialoGPT-medium",
-                "facebook/blenderbot-400M-distill"
-            ]
+            parameters = {
+                "max_new_tokens": 120,
+                "temperature": 0.8,
+                "do_sample": True,
+                "top_p": 0.9,
+                "repetition_penalty": 1.1
+            }
             
-            for model in models:
-                try:
-                    url = f"https://api-inference.huggingface.co/models/{model}"
-                    headers = {
-                        "Authorization": f"Bearer {self.hf_key}",
-                        "Content-Type": "application/json"
-                    }
-                    
-                    payload = {
-                        "inputs": f"{context}\nFoodieBot:",
-                        "parameters": {
-                            "max_new_tokens": 120,
-                            "temperature": 0.8,
-                            "do_sample": True,
-                            "top_p": 0.9,
-                            "repetition_penalty": 1.1
-                        },
-                        "options": {"wait_for_model": True}
-                    }
-                    
-                    response = requests.post(url, json=payload, headers=headers, timeout=20)
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        if isinstance(result, list) and len(result) > 0:
-                            generated = result[0].get('generated_text', '')
-                            
-                            # Extract response
-                            if 'FoodieBot:' in generated:
-                                response_text = generated.split('FoodieBot:')[-1].strip()
-                                response_text = response_text.split('User:')[0].strip()
-                                response_text = response_text.split('\n')[0].strip()
-                                
-                                if len(response_text) > 15:
-                                    return response_text
-                    
-                except Exception as e:
-                    print(f"Model {model} failed: {e}")
-                    continue
-            
-            return ""
+            # Coalesced with other sessions' prompts into batched backend calls
+            return generation_scheduler.generate(
+                f"{context}\nFoodieBot:",
+                parameters,
+                self._extract_generated_reply
+            )
             
         except Exception as e:
             print(f"API generation error: {e}")
             return ""
 
+    def _extract_generated_reply(self, generated: str) -> str:
+        """
+        Pull the bot's reply out of the generated text ("" when unusable)
+        """
+        if 'FoodieBot:' in generated:
+            response_text = generated.split('FoodieBot:')[-1].strip()
+            response_text = response_text.split('User:')[0].strip()
+            response_text = response_text.split('\n')[0].strip()
+            
+            if len(response_text) > 15:
+                return response_text
+        
+        return ""
+
     def _generate_intelligent_contextual_response(self, message: str, profile: Dict, products: List[Dict]) -> str:
         """
         Generate intelligent contextual responses (not templates)
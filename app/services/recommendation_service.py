@@ -5,18 +5,29 @@ Multiple algorithms as required by assignment
 
 from typing import Dict, List, Optional, Tuple
 import json
+import math
 import random
 from app.models.database import get_db_manager
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.interaction_model import interaction_model
+from app.services.popularity_lists import popularity_lists
+from app.services.semantic_index import semantic_index
+from app.services.similarity_index import similarity_index
 
 class RecommendationEngine:
     def __init__(self):
         self.recommendation_cache = {}
         self.user_interaction_history = {}
+        
+        # Running totals so analytics never walk the history
+        self.total_recommendations = 0
+        self.category_counts = {}
     
     def get_smart_recommendations(self, preferences: Dict, session_id: str, 
-                                interest_score: float, limit: int = 5) -> List[Dict]:
+                                interest_score: float, limit: int = 5, message: str = "") -> List[Dict]:
         """
         Main recommendation engine combining all algorithms
+        (pass the user's message to add free-text semantic matches)
         """
         try:
             db = get_db_manager()
@@ -36,10 +47,13 @@ class RecommendationEngine:
             # Algorithm 5: Collaborative Filtering (simplified)
             collaborative_matches = self._collaborative_filtering(session_id, db, limit)
             
+            # Algorithm 6: Semantic Matching on the free text
+            semantic_matches = self.get_semantic_matches(message, preferences, limit * 2)
+            
             # Combine and rank all recommendations
             all_recommendations = self._combine_recommendations(
                 preference_matches, mood_matches, budget_matches, 
-                dietary_matches, collaborative_matches, interest_score
+                dietary_matches, collaborative_matches, semantic_matches, interest_score=interest_score
             )
             
             # Remove duplicates and limit results
@@ -54,10 +68,77 @@ class RecommendationEngine:
             print(f"Recommendation engine error: {e}")
             return self._fallback_recommendations(limit)
     
+    def rank_products(self, products: List[Dict], preferences: Dict, limit: int = 5) -> List[Dict]:
+        """
+        Re-rank candidates from any retriever by preference match (stable for ties)
+        """
+        scored = [(product, self._calculate_preference_match_score(product, preferences)) for product in products]
+        scored.sort(key=lambda x: x[1], reverse=True)
+        
+        ranked = []
+        for product, score in scored[:limit]:
+            product['recommendation_score'] = round(score, 1)
+            ranked.append(product)
+        return ranked
+    
+    def get_semantic_matches(self, message: str, preferences: Dict, limit: int) -> List[Tuple[Dict, float]]:
+        """
+        Products whose text is closest to the message (cravings the keyword lexicon
+        misses), still honouring budget, dietary needs and allergens
+        """
+        if not message or not message.strip():
+            return []
+        
+        try:
+            # Headroom for the candidates the filters below remove
+            matches = semantic_index.search(message, limit * 3)
+        except Exception as e:
+            print(f"Semantic search error: {e}")
+            return []
+        if not matches:
+            return []
+        
+        db = get_db_manager()
+        similarities = dict(matches)
+        
+        with db.get_connection() as conn:
+            query = f"SELECT * FROM products WHERE product_id IN ({','.join('?' * len(matches))})"
+            params = list(similarities)
+            
+            if 'max_budget' in preferences:
+                query += " AND price <= ?"
+                params.append(preferences['max_budget'])
+            for diet in preferences.get('dietary', []):
+                query += " AND (dietary_tags LIKE ? OR mood_tags LIKE ?)"
+                params.extend([f"%{diet}%", f"%{diet}%"])
+            
+            rows = conn.execute(query, params).fetchall()
+        
+        best = matches[0][1]
+        recommendations = []
+        for row in rows:
+            product = db.parse_json_fields(dict(row))
+            if self._check_allergen_compatibility(product, preferences):
+                # Closest match scores 130, on par with a strong preference match
+                semantic_score = 70.0 + 60.0 * similarities[product['product_id']] / best
+                recommendations.append((product, semantic_score))
+        
+        recommendations.sort(key=lambda x: x[1], reverse=True)
+        return recommendations[:limit]
+    
     def _preference_matching(self, preferences: Dict, db, limit: int) -> List[Tuple[Dict, float]]:
         """Algorithm 1: Match conversation keywords to product tags"""
         recommendations = []
         
+        if 'mood' not in preferences and 'dietary' not in preferences:
+            # Only a category filter (or none) - a merge of the pre-sorted popularity lists
+            categories = preferences.get('categories') or None
+            products = popularity_lists.top(limit, categories=categories)
+            if products is not None:
+                score_multiplier = 1.3 if categories else 1.0
+                return [(product, self._calculate_preference_match_score(product, preferences) * score_multiplier)
+                        for product in products]
+        
         with db.get_connection() as conn:
             # Build dynamic query based on preferences
             query = "SELECT * FROM products WHERE 1=1"
@@ -88,7 +169,7 @@ class RecommendationEngine:
                     params.extend([f"%{diet}%", f"%{diet}%"])
                     score_multiplier += 0.2
             
-            query += " ORDER BY popularity_score DESC LIMIT ?"
+            query += " ORDER BY popularity_score DESC, id ASC LIMIT ?"
             params.append(limit)
             
             cursor = conn.execute(query, params)
@@ -108,6 +189,10 @@ class RecommendationEngine:
         if 'mood' not in preferences:
             return recommendations
         
+        products = popularity_lists.top(limit, tag_column='mood_tags', tag_terms=preferences['mood'])
+        if products is not None:
+            return [(product, self._calculate_mood_match_score(product, preferences['mood'])) for product in products]
+        
         with db.get_connection() as conn:
             mood_conditions = []
             params = []
@@ -120,7 +205,7 @@ class RecommendationEngine:
                 query = f"""
                 SELECT * FROM products 
                 WHERE ({' OR '.join(mood_conditions)}) 
-                ORDER BY popularity_score DESC 
+                ORDER BY popularity_score DESC, id ASC 
                 LIMIT ?
                 """
                 params.append(limit)
@@ -155,10 +240,14 @@ class RecommendationEngine:
             cursor = conn.execute(query, (max_budget, limit))
             rows = cursor.fetchall()
             
-            for row in rows:
-                product = db.parse_json_fields(dict(row))
-                # Calculate value score (popularity per dollar)
-                value_score = (product['popularity_score'] / max(product['price'], 1)) * 10
+            products = [db.parse_json_fields(dict(row)) for row in rows]
+            values = [product['popularity_score'] / max(product['price'], 1) for product in products]
+            best_value = max(values, default=0) or 1
+            
+            for product, value in zip(products, values):
+                # Value score (popularity per dollar) on a 50-100 scale like the other algorithms,
+                # instead of growing without bound as prices drop
+                value_score = 50.0 + 50.0 * value / best_value
                 recommendations.append((product, value_score))
         
         return recommendations
@@ -173,19 +262,18 @@ class RecommendationEngine:
         with db.get_connection() as conn:
             for dietary_pref in preferences['dietary']:
                 # Positive matching for dietary preferences
-                query = """
-                SELECT * FROM products 
-                WHERE dietary_tags LIKE ? 
-                ORDER BY popularity_score DESC 
-                LIMIT ?
-                """
-                
-                cursor = conn.execute(query, (f"%{dietary_pref}%", limit))
-                rows = cursor.fetchall()
+                products = popularity_lists.top(limit, tag_column='dietary_tags', tag_terms=[dietary_pref])
+                if products is None:
+                    query = """
+                    SELECT * FROM products 
+                    WHERE dietary_tags LIKE ? 
+                    ORDER BY popularity_score DESC, id ASC 
+                    LIMIT ?
+                    """
+                    cursor = conn.execute(query, (f"%{dietary_pref}%", limit))
+                    products = [db.parse_json_fields(dict(row)) for row in cursor.fetchall()]
                 
-                for row in rows:
-                    product = db.parse_json_fields(dict(row))
-                    
+                for product in products:
                     # Check allergen compatibility
                     if self._check_allergen_compatibility(product, preferences):
                         dietary_score = 95.0  # High score for dietary matches
@@ -194,7 +282,10 @@ class RecommendationEngine:
         return recommendations
     
     def _collaborative_filtering(self, session_id: str, db, limit: int) -> List[Tuple[Dict, float]]:
-        """Algorithm 5: 'Customers who liked X also liked Y' (simplified)"""
+        """
+        Algorithm 5: 'Customers who liked X also liked Y' - learned co-occurrence from the
+        conversations log when a model is trained, blended with the item similarity index
+        """
         recommendations = []
         
         # Get user's interaction history
@@ -202,46 +293,50 @@ class RecommendationEngine:
         
         if not user_history:
             # New user - recommend popular items
-            with db.get_connection() as conn:
-                cursor = conn.execute("""
-                SELECT * FROM products 
-                ORDER BY popularity_score DESC 
-                LIMIT ?
-                """, (limit,))
-                rows = cursor.fetchall()
-                
-                for row in rows:
-                    product = db.parse_json_fields(dict(row))
-                    popularity_score = product['popularity_score'] / 100.0 * 80  # Scale to 80 max
-                    recommendations.append((product, popularity_score))
-        else:
-            # Existing user - find similar products
-            with db.get_connection() as conn:
-                # Find products in same categories as previously liked items
-                liked_categories = [item['category'] for item in user_history if item.get('liked')]
-                
-                if liked_categories:
-                    category_conditions = []
-                    params = []
-                    for category in set(liked_categories):
-                        category_conditions.append("category = ?")
-                        params.append(category)
-                    
-                    query = f"""
+            products = popularity_lists.top(limit)
+            if products is None:
+                with db.get_connection() as conn:
+                    cursor = conn.execute("""
                     SELECT * FROM products 
-                    WHERE ({' OR '.join(category_conditions)})
-                    ORDER BY popularity_score DESC 
+                    ORDER BY popularity_score DESC, id ASC 
                     LIMIT ?
-                    """
-                    params.append(limit)
-                    
-                    cursor = conn.execute(query, params)
-                    rows = cursor.fetchall()
-                    
-                    for row in rows:
-                        product = db.parse_json_fields(dict(row))
-                        similarity_score = 70.0  # Base collaborative score
-                        recommendations.append((product, similarity_score))
+                    """, (limit,))
+                    products = [db.parse_json_fields(dict(row)) for row in cursor.fetchall()]
+            
+            for product in products:
+                popularity_score = product['popularity_score'] / 100.0 * 80  # Scale to 80 max
+                recommendations.append((product, popularity_score))
+        else:
+            # Existing user - precomputed neighbours of the last items they liked (or were
+            # shown); O(k) per seed instead of a category query
+            liked = [item for item in user_history if item.get('liked')]
+            seeds = [item['product_id'] for item in (liked or user_history)][-10:]
+            seen = {item['product_id'] for item in user_history}
+            
+            similarities = {}
+            for product_id in seeds:
+                for similar_id, similarity in similarity_index.similar(product_id, limit):
+                    if similar_id not in seen:
+                        similarities[similar_id] = max(similarities.get(similar_id, 0.0), similarity)
+            
+            
+            # Fold the whole history into the trained item factors (repeat showings count less)
+            shown = {}
+            for item in user_history:
+                shown[item['product_id']] = shown.get(item['product_id'], 0) + 1
+            affinities = dict(interaction_model.score(
+                {product_id: math.log1p(count) for product_id, count in shown.items()}, limit
+            ))
+            if affinities:
+                similarities = {
+                    product_id: (similarities.get(product_id, 0.0) + affinities.get(product_id, 0.0)) / 2
+                    for product_id in set(similarities) | set(affinities)
+                }
+            
+            closest = sorted(similarities, key=similarities.get, reverse=True)[:limit]
+            for product in catalog_snapshot.get_products_by_ids(closest):
+                similarity_score = 50.0 + 50.0 * similarities[product['product_id']]
+                recommendations.append((product, similarity_score))
         
         return recommendations
     
@@ -264,16 +359,16 @@ class RecommendationEngine:
         """Get algorithm weights based on interest score"""
         if interest_score >= 80:
             # High interest - prioritize order-focused algorithms
-            return [1.2, 1.0, 0.8, 1.1, 0.9]  # Preference, Mood, Budget, Dietary, Collaborative
+            return [1.2, 1.0, 0.8, 1.1, 0.9, 1.0]  # Preference, Mood, Budget, Dietary, Collaborative, Semantic
         elif interest_score >= 60:
             # Medium-high interest - balanced approach
-            return [1.0, 1.1, 1.0, 1.0, 0.8]
+            return [1.0, 1.1, 1.0, 1.0, 0.8, 1.1]
         elif interest_score >= 40:
             # Medium interest - focus on discovery
-            return [0.9, 1.2, 1.1, 0.9, 1.0]
+            return [0.9, 1.2, 1.1, 0.9, 1.0, 1.2]
         else:
             # Low interest - popular items and budget
-            return [0.8, 0.9, 1.3, 0.8, 1.2]
+            return [0.8, 0.9, 1.3, 0.8, 1.2, 1.2]
     
     def _deduplicate_and_rank(self, recommendations: List[Tuple], limit: int) -> List[Dict]:
         """Remove duplicates and return top recommendations"""
@@ -375,6 +470,8 @@ class RecommendationEngine:
             self.user_interaction_history[session_id] = []
         
         for rec in recommendations:
+            self.total_recommendations += 1
+            self.category_counts[rec['category']] = self.category_counts.get(rec['category'], 0) + 1
             self.user_interaction_history[session_id].append({
                 'product_id': rec['product_id'],
                 'category': rec['category'],
@@ -389,11 +486,14 @@ class RecommendationEngine:
     def _fallback_recommendations(self, limit: int) -> List[Dict]:
         """Fallback recommendations when main engine fails"""
         try:
+            products = popularity_lists.top(limit)
+            if products is not None:
+                return products
             db = get_db_manager()
             with db.get_connection() as conn:
                 cursor = conn.execute("""
                 SELECT * FROM products 
-                ORDER BY popularity_score DESC 
+                ORDER BY popularity_score DESC, id ASC 
                 LIMIT ?
                 """, (limit,))
                 rows = cursor.fetchall()
@@ -404,14 +504,8 @@ class RecommendationEngine:
     def get_recommendation_analytics(self) -> Dict:
         """Get analytics about recommendation performance"""
         total_sessions = len(self.user_interaction_history)
-        total_recommendations = sum(len(history) for history in self.user_interaction_history.values())
-        
-        # Category analysis
-        category_counts = {}
-        for history in self.user_interaction_history.values():
-            for item in history:
-                category = item.get('category', 'Unknown')
-                category_counts[category] = category_counts.get(category, 0) + 1
+        total_recommendations = self.total_recommendations
+        category_counts = self.category_counts
         
         return {
             'total_sessions_with_recommendations': total_sessions,
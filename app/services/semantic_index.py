@@ -0,0 +1,301 @@
+"""
+Semantic Index - Free-text craving search over the catalog, CPU only
+Products become TF-IDF vectors over word stems and stem pairs (so "cheesy" still finds
+"cheese"), kept in a memory-mapped float32 matrix; queries are answered with a batched
+NumPy cosine top-k, optionally probing IVF partitions
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config.settings import (
+    SEMANTIC_INDEX_DIR, SEMANTIC_MAX_FEATURES, SEMANTIC_INDEX_TTL, SEMANTIC_MIN_SCORE,
+    SEMANTIC_IVF_MIN_PRODUCTS, SEMANTIC_IVF_PROBES
+)
+from app.services.catalog_service import catalog_service
+from app.services.catalog_snapshot import catalog_snapshot
+from app.utils.index_versions import new_version, publish, current_version
+
+# Words people type for a craving -> words the catalog uses for it
+QUERY_EXPANSIONS = {
+    'warm': ['comfort', 'hot'],
+    'cozy': ['comfort'],
+    'rainy': ['comfort'],
+    'cold': ['comfort'],
+    'cheesy': ['cheese'],
+    'crunchy': ['crispy'],
+    'filling': ['satisfying'],
+    'hungry': ['satisfying'],
+    'treat': ['indulgent', 'dessert'],
+    'adventurous': ['bold'],
+    'boring': ['familiar'],
+    'thirsty': ['drink', 'refreshing'],
+}
+
+# Words that say nothing about the food
+STOPWORDS = {
+    'a', 'an', 'and', 'the', 'for', 'with', 'of', 'on', 'in', 'to', 'or', 'some', 'something',
+    'anything', 'i', 'im', 'am', 'me', 'my', 'we', 'want', 'would', 'like', 'love', 'need', 'please',
+    'can', 'could', 'you', 'have', 'get', 'is', 'it', 'that', 'this', 'what', 'any', 'really', 'very'
+}
+STEM_SUFFIXES = ('ies', 'ing', 'ed', 'es', 's', 'y', 'e')
+SCORE_CHUNK_ROWS = 65536
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 20000
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so cheesy/cheese and wraps/wrap share a feature"""
+    for suffix in STEM_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def _features(text: str, expand: bool = False) -> Dict[str, float]:
+    """Word stems and adjacent stem pairs with their counts"""
+    words = [word for word in re.findall(r'[^\W\d_]+', text.lower()) if word not in STOPWORDS]
+    if expand:
+        words = words + [extra for word in words for extra in QUERY_EXPANSIONS.get(word, [])]
+    stems = [_stem(word) for word in words]
+
+    features = {}
+    for stem in stems:
+        features['w:' + stem] = features.get('w:' + stem, 0) + 1
+    for first, second in zip(stems, stems[1:]):
+        features[f"b:{first} {second}"] = features.get(f"b:{first} {second}", 0) + 1
+    return features
+
+def _product_text(product: Dict) -> str:
+    parts = [product['name'], product['name'], product['category'], product['description']]
+    for field in ['ingredients', 'mood_tags', 'dietary_tags']:
+        parts.extend(str(value).replace('_', ' ') for value in product.get(field) or [])
+    return " ".join(parts)
+
+class SemanticIndex:
+    def __init__(self, directory: str = SEMANTIC_INDEX_DIR, max_features: int = SEMANTIC_MAX_FEATURES,
+                 ttl: float = SEMANTIC_INDEX_TTL):
+        self.directory = directory
+        self.max_features = max_features
+        self.ttl = ttl
+        self.checked_at = 0.0
+        self.signature = None
+        self.vectors: Optional[np.ndarray] = None
+        self.idf: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.list_offsets: List[int] = []
+        self.product_ids: List[str] = []
+        # feature -> matrix column
+        self.vocabulary: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """Open the saved index, rebuilding it when the catalog has changed"""
+        if self.vectors is not None and time.monotonic() - self.checked_at < self.ttl:
+            return
+        with self.lock:
+            if self.vectors is not None and time.monotonic() - self.checked_at < self.ttl:
+                return
+            signature = catalog_service.get_catalog_signature(include_popularity=False)
+            if self.vectors is None or signature != self.signature:
+                if not self._open(signature):
+                    self.build(signature)
+            self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        self.checked_at = 0.0
+
+    def build(self, signature: Optional[str] = None):
+        """Vectorize the whole catalog and write the index files"""
+        started = time.perf_counter()
+        catalog_snapshot.invalidate()
+        products = list(catalog_snapshot.products())
+
+        documents = [_features(_product_text(product)) for product in products]
+
+        # The most widespread features fill the columns; rarer ones beyond the cap are dropped
+        document_frequency = Counter(feature for document in documents for feature in document)
+        ranked = sorted(document_frequency, key=lambda feature: (-document_frequency[feature], feature))
+        vocabulary = {feature: column for column, feature in enumerate(ranked[:self.max_features])}
+
+        # Smoothed inverse document frequency per column
+        idf = np.array([
+            math.log((1 + len(documents)) / (1 + document_frequency[feature])) + 1 for feature in vocabulary
+        ], dtype=np.float32)
+
+        vectors = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+        for row, document in enumerate(documents):
+            self._fill(vectors[row], document, vocabulary)
+        vectors *= idf
+        vectors = self._normalize(vectors)
+
+        product_ids = [product['product_id'] for product in products]
+        centroids, list_offsets = None, []
+        if SEMANTIC_IVF_MIN_PRODUCTS and len(products) >= SEMANTIC_IVF_MIN_PRODUCTS:
+            centroids, order, list_offsets = self._partition(vectors)
+            vectors = vectors[order]
+            product_ids = [product_ids[i] for i in order]
+
+        # Write a whole new version, then publish it so readers never see half an index
+        version = new_version(self.directory)
+        matrix = np.lib.format.open_memmap(os.path.join(version, "vectors.npy"), mode="w+", dtype=np.float32,
+                                           shape=vectors.shape)
+        matrix[:] = vectors
+        matrix.flush()
+        del matrix
+
+        with open(os.path.join(version, "idf.npy"), "wb") as f:
+            np.save(f, idf)
+
+        if centroids is not None:
+            with open(os.path.join(version, "centroids.npy"), "wb") as f:
+                np.save(f, centroids)
+
+        meta = {
+            "signature": signature or catalog_service.get_catalog_signature(include_popularity=False),
+            "vocabulary": list(vocabulary),
+            "product_ids": product_ids,
+            "list_offsets": list_offsets
+        }
+        with open(os.path.join(version, "index.json"), "w") as f:
+            json.dump(meta, f)
+        publish(self.directory, version)
+
+        self._open(meta["signature"])
+        partitions = f", {len(list_offsets) - 1} IVF lists" if list_offsets else ""
+        print(f"🧭 Semantic index built: {len(product_ids)} products{partitions} "
+              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries: List[str], k: int = 10) -> List[List[Tuple[str, float]]]:
+        """
+        Top-k (product_id, cosine similarity) per query, best first; matches below
+        SEMANTIC_MIN_SCORE are dropped
+        """
+        self.ensure_loaded()
+        if self.vectors is None or not len(self.product_ids):
+            return [[] for _ in queries]
+
+        encoded = np.vstack([self.encode(query) for query in queries])
+
+        if self.centroids is not None:
+            candidates = [self._search_partitions(vector, k) for vector in encoded]
+        else:
+            candidates = self._search_all(encoded, k)
+
+        return [
+            [(self.product_ids[row], float(score)) for row, score in matches if score >= SEMANTIC_MIN_SCORE]
+            for matches in candidates
+        ]
+
+    def encode(self, text: str) -> np.ndarray:
+        """Query vector; words the catalog never uses are ignored"""
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        self._fill(vector, _features(text, expand=True), self.vocabulary)
+        vector *= self.idf
+        return self._normalize(vector[np.newaxis, :])[0]
+
+    def _search_all(self, encoded: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """Brute-force cosine over the matrix in row chunks, keeping a running top-k"""
+        best_rows = np.empty((len(encoded), 0), dtype=np.int64)
+        best_scores = np.empty((len(encoded), 0), dtype=np.float32)
+
+        for start in range(0, len(self.product_ids), SCORE_CHUNK_ROWS):
+            scores = encoded @ self.vectors[start:start + SCORE_CHUNK_ROWS].T
+            rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        return [
+            list(zip(np.take(rows, ranking).tolist(), np.take(scores, ranking).tolist()))
+            for rows, scores, ranking in zip(best_rows, best_scores, order)
+        ]
+
+    def _search_partitions(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Score only the rows in the IVF lists whose centroids are closest to the query"""
+        probes = min(SEMANTIC_IVF_PROBES, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+
+        rows = np.concatenate([
+            np.arange(self.list_offsets[cluster], self.list_offsets[cluster + 1]) for cluster in nearest
+        ])
+        if not len(rows):
+            return []
+        scores = self.vectors[rows] @ vector
+        top = min(k, len(rows))
+        keep = np.argpartition(-scores, top - 1)[:top]
+        keep = keep[np.argsort(-scores[keep])]
+        return list(zip(rows[keep].tolist(), scores[keep].tolist()))
+
+    def _partition(self, vectors: np.ndarray):
+        """Spherical k-means; returns centroids, the row order grouping each list, and list offsets"""
+        lists = max(1, int(math.sqrt(len(vectors))))
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE), replace=False)]
+        centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(lists):
+                members = sample[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.sum(axis=0)
+            centroids = self._normalize(centroids)
+
+        assignment = np.concatenate([
+            np.argmax(vectors[start:start + SCORE_CHUNK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), SCORE_CHUNK_ROWS)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=lists)
+        list_offsets = [0] + np.cumsum(counts).tolist()
+        return centroids, order, list_offsets
+
+    def _open(self, signature: str) -> bool:
+        """Memory-map the published index if it matches the catalog"""
+        path = current_version(self.directory)
+        if path is None:
+            return False
+        try:
+            with open(os.path.join(path, "index.json")) as f:
+                meta = json.load(f)
+            if meta["signature"] != signature or len(meta["vocabulary"]) > self.max_features:
+                return False
+            self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            self.idf = np.load(os.path.join(path, "idf.npy"))
+            self.list_offsets = meta["list_offsets"]
+            self.centroids = np.load(os.path.join(path, "centroids.npy")) if self.list_offsets else None
+            self.product_ids = meta["product_ids"]
+            self.vocabulary = {feature: column for column, feature in enumerate(meta["vocabulary"])}
+            self.signature = signature
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    @staticmethod
+    def _fill(vector: np.ndarray, features: Dict[str, float], vocabulary: Dict[str, int]):
+        """Log-scaled term frequency into the vocabulary's columns"""
+        for feature, count in features.items():
+            column = vocabulary.get(feature)
+            if column is not None:
+                vector[column] = 1 + math.log(count)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32)
+
+# Global semantic index
+semantic_index = SemanticIndex()
@@ -4,6 +4,7 @@ Works even if NLP libraries are missing
 """
 
 import re
+import threading
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 
@@ -21,17 +22,11 @@ class SentimentResult:
 
 class RobustSentimentAnalyzer:
     def __init__(self):
-        # Try to import NLP libraries
+        # NLP libraries are loaded on first use (see load_nlp) so importing stays cheap
         self.nlp_available = False
         self.vader_analyzer = None
-        
-        try:
-            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-            self.vader_analyzer = SentimentIntensityAnalyzer()
-            self.nlp_available = True
-            print("✅ NLP libraries loaded successfully")
-        except ImportError:
-            print("⚠️ NLP libraries not available, using enhanced rule-based analysis")
+        self.nlp_checked = False
+        self.nlp_lock = threading.Lock()
         
         # Enhanced food-related dictionaries
         self.food_sentiment_words = {
@@ -65,12 +60,31 @@ class RobustSentimentAnalyzer:
             'low': ['whenever', 'no rush', 'take your time', 'eventually', 'later']
         }
     
+    def load_nlp(self) -> bool:
+        """
+        Try to import and build VADER once; False means rule-based analysis. Callers that
+        arrive while another thread (the warm-up) is loading it wait for the outcome
+        """
+        if not self.nlp_checked:
+            with self.nlp_lock:
+                if not self.nlp_checked:
+                    try:
+                        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                        self.vader_analyzer = SentimentIntensityAnalyzer()
+                        self.nlp_available = True
+                        print("✅ NLP libraries loaded successfully")
+                    except ImportError:
+                        print("⚠️ NLP libraries not available, using enhanced rule-based analysis")
+                    # Only once VADER is built (or known missing)
+                    self.nlp_checked = True
+        return self.nlp_available
+    
     def analyze_comprehensive_sentiment(self, text: str, context: str = 'general') -> SentimentResult:
         """
         Analyze sentiment with robust error handling
         """
         try:
-            if self.nlp_available and self.vader_analyzer:
+            if self.load_nlp() and self.vader_analyzer:
                 return self._advanced_nlp_analysis(text)
             else:
                 return self._enhanced_rule_analysis(text)
@@ -0,0 +1,185 @@
+"""
+Shadow Mode - Run a candidate pipeline beside the live one and diff the answers
+Sampled sessions are queued after the primary has answered and replayed through the
+candidate on a background thread, so users never wait for it. Recommendations, interest
+scores and stage latency are compared turn by turn and aggregated for the metrics API.
+"""
+
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Dict
+from app.config.settings import (
+    CHAT_PIPELINE, PIPELINE_EXTRACTOR, PIPELINE_SCORER, PIPELINE_RETRIEVER, PIPELINE_RANKER,
+    SHADOW_SAMPLE_RATE, SHADOW_PIPELINE, SHADOW_EXTRACTOR, SHADOW_SCORER, SHADOW_RETRIEVER,
+    SHADOW_RANKER, SHADOW_QUEUE_SIZE
+)
+from app.services.pipeline import ChatPipeline, Turn, build_pipeline, isolated_services
+
+# Interest scores closer than this count as the same answer
+SCORE_TOLERANCE = 0.5
+
+class ShadowTurn:
+    """What the primary answered, captured before the turn object can change"""
+
+    def __init__(self, turn: Turn):
+        self.message = turn.message
+        self.session_id = turn.session_id
+        self.product_ids = [product['product_id'] for product in turn.products]
+        self.interest_score = turn.interest_score
+        self.latency_ms = sum(ms for stage, ms in turn.timings.items() if stage != 'generate')
+
+class ShadowRunner:
+    # Every runner, for the metrics endpoint
+    instances = []
+
+    def __init__(self, primary: ChatPipeline, candidate: ChatPipeline,
+                 sample_rate: float = SHADOW_SAMPLE_RATE, queue_size: int = SHADOW_QUEUE_SIZE):
+        self.primary = primary
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.worker = None
+
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.compared = 0
+        self.identical = 0
+        self.same_top = 0
+        self.overlap_total = 0.0
+        self.score_delta_total = 0.0
+        self.max_score_delta = 0.0
+        self.primary_latencies = deque(maxlen=500)
+        self.candidate_latencies = deque(maxlen=500)
+        self.mismatches = deque(maxlen=10)
+
+        ShadowRunner.instances.append(self)
+
+    @property
+    def name(self) -> str:
+        return f"{self.primary.name} vs {self.candidate.name}"
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def sampled(self, session_id: str) -> bool:
+        """Whole sessions are shadowed, so the candidate sees the same conversation history"""
+        return zlib.crc32(session_id.encode()) % 10000 < self.sample_rate * 10000
+
+    def submit(self, turn: Turn):
+        """Queue a finished primary turn for the candidate; never blocks"""
+        if not self.enabled or not self.sampled(turn.session_id):
+            return
+
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._work, name="shadow-runner", daemon=True)
+                self.worker.start()
+            self.submitted += 1
+
+        try:
+            self.queue.put_nowait(ShadowTurn(turn))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            compared = self.compared
+            return {
+                "enabled": self.enabled,
+                "primary": self.primary.name,
+                "candidate": self.candidate.name,
+                "sample_rate": self.sample_rate,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "queued": self.queue.qsize(),
+                "compared": compared,
+                "identical_rate": round(self.identical / compared, 4) if compared else 0,
+                "same_top_product_rate": round(self.same_top / compared, 4) if compared else 0,
+                "average_overlap": round(self.overlap_total / compared, 4) if compared else 0,
+                "average_interest_delta": round(self.score_delta_total / compared, 2) if compared else 0,
+                "max_interest_delta": round(self.max_score_delta, 2),
+                "primary_latency_ms": self._percentiles(self.primary_latencies),
+                "candidate_latency_ms": self._percentiles(self.candidate_latencies),
+                "recent_mismatches": list(self.mismatches)
+            }
+
+    @staticmethod
+    def _percentiles(samples) -> Dict:
+        ordered = sorted(samples)
+        if not ordered:
+            return {"p50": 0, "p95": 0}
+        return {
+            "p50": round(ordered[len(ordered) // 2], 3),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3)
+        }
+
+    def _work(self):
+        while True:
+            primary = self.queue.get()
+            try:
+                started = time.perf_counter()
+                # Own session namespace so the candidate's memory never mixes with the primary's
+                shadow = self.candidate.prepare(primary.message, f"shadow:{primary.session_id}")
+                latency = (time.perf_counter() - started) * 1000
+                self._compare(primary, shadow, latency)
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                print(f"⚠️ Shadow pipeline error: {e}")
+
+    def _compare(self, primary: ShadowTurn, shadow: Turn, latency_ms: float):
+        product_ids = [product['product_id'] for product in shadow.products]
+        score_delta = abs(shadow.interest_score - primary.interest_score)
+        same_products = product_ids == primary.product_ids
+        reference = primary.product_ids or product_ids
+        overlap = len(set(product_ids) & set(primary.product_ids)) / len(reference) if reference else 1.0
+
+        with self.lock:
+            self.compared += 1
+            self.primary_latencies.append(primary.latency_ms)
+            self.candidate_latencies.append(latency_ms)
+            self.overlap_total += overlap
+            self.score_delta_total += score_delta
+            self.max_score_delta = max(self.max_score_delta, score_delta)
+            self.same_top += product_ids[:1] == primary.product_ids[:1]
+            if same_products and score_delta <= SCORE_TOLERANCE:
+                self.identical += 1
+            else:
+                self.mismatches.append({
+                    "message": primary.message[:200],
+                    "primary_products": primary.product_ids,
+                    "candidate_products": product_ids,
+                    "primary_interest": primary.interest_score,
+                    "candidate_interest": shadow.interest_score
+                })
+
+def configured_shadow(default_preset: str, primary: ChatPipeline) -> ShadowRunner:
+    """
+    The app's shadow: SHADOW_PIPELINE (or the app's own preset and PIPELINE_* choices)
+    with SHADOW_* stage overrides; idle unless SHADOW_SAMPLE_RATE > 0. The candidate runs
+    on its own engine instances, so its sessions and recommendation history never share
+    the request threads' dicts or show up in the live analytics
+    """
+    inherited = {} if SHADOW_PIPELINE else {
+        'extractor': PIPELINE_EXTRACTOR, 'scorer': PIPELINE_SCORER,
+        'retriever': PIPELINE_RETRIEVER, 'ranker': PIPELINE_RANKER
+    }
+    overrides = {
+        'extractor': SHADOW_EXTRACTOR, 'scorer': SHADOW_SCORER,
+        'retriever': SHADOW_RETRIEVER, 'ranker': SHADOW_RANKER
+    }
+    candidate = build_pipeline(
+        SHADOW_PIPELINE or CHAT_PIPELINE or default_preset,
+        # An idle shadow never runs, so it need not build engines of its own
+        services=isolated_services() if SHADOW_SAMPLE_RATE > 0 else None,
+        **{stage: overrides[stage] or inherited.get(stage, '') for stage in overrides}
+    )
+    return ShadowRunner(primary, candidate)
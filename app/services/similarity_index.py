@@ -0,0 +1,188 @@
+"""
+Item Similarity Index - Precomputed "similar items" for every product
+Similarity blends ingredient/tag Jaccard with price and spice closeness. Small catalogs
+compare every pair; large ones only compare MinHash-LSH candidates. The top neighbours
+per product are stored as memory-mapped arrays, so a lookup is one row read.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from app.config.settings import (
+    SIMILARITY_INDEX_DIR, SIMILARITY_INDEX_TTL, SIMILAR_ITEMS_K, SIMILARITY_EXACT_MAX_PRODUCTS,
+    SIMILARITY_MINHASH_PERMUTATIONS, SIMILARITY_LSH_BANDS
+)
+from app.services.catalog_service import catalog_service
+from app.services.catalog_snapshot import catalog_snapshot
+from app.utils.index_versions import new_version, publish, current_version
+
+# How much each signal contributes to the final similarity (sums to 1)
+SIMILARITY_WEIGHTS = {'jaccard': 0.7, 'price': 0.15, 'spice': 0.15}
+# Small enough that a*x + b never overflows uint64 for 32-bit feature hashes
+MERSENNE_PRIME = (1 << 31) - 1
+# Buckets this crowded are generic features, not evidence of similarity
+MAX_BUCKET_SIZE = 500
+
+def _feature_set(product: Dict) -> Set[str]:
+    features = {f"c:{product['category']}"}
+    for ingredient in product.get('ingredients') or []:
+        ingredient = str(ingredient).lower()
+        features.add(f"i:{ingredient}")
+        features.update(f"w:{word}" for word in ingredient.split())
+    features.update(f"d:{tag}" for tag in product.get('dietary_tags') or [])
+    features.update(f"m:{tag}" for tag in product.get('mood_tags') or [])
+    return features
+
+def _jaccard(first: Set[str], second: Set[str]) -> float:
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+class SimilarityIndex:
+    def __init__(self, directory: str = SIMILARITY_INDEX_DIR, k: int = SIMILAR_ITEMS_K,
+                 ttl: float = SIMILARITY_INDEX_TTL):
+        self.directory = directory
+        self.k = k
+        self.ttl = ttl
+        self.checked_at = 0.0
+        self.signature = None
+        self.neighbors: Optional[np.ndarray] = None
+        self.scores: Optional[np.ndarray] = None
+        self.product_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """Open the saved index, rebuilding it when the catalog has changed"""
+        if self.neighbors is not None and time.monotonic() - self.checked_at < self.ttl:
+            return
+        with self.lock:
+            if self.neighbors is not None and time.monotonic() - self.checked_at < self.ttl:
+                return
+            signature = catalog_service.get_catalog_signature(include_popularity=False)
+            if self.neighbors is None or signature != self.signature:
+                if not self._open(signature):
+                    self.build(signature)
+            self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        self.checked_at = 0.0
+
+    def similar(self, product_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """(product_id, similarity) of the closest products, best first"""
+        self.ensure_loaded()
+        row = self.rows.get(product_id)
+        if row is None:
+            return []
+        similar = []
+        for neighbor, score in zip(self.neighbors[row][:limit], self.scores[row][:limit]):
+            if neighbor < 0:
+                break
+            similar.append((self.product_ids[neighbor], float(score)))
+        return similar
+
+    def build(self, signature: Optional[str] = None):
+        """Score product pairs and write each product's top-k neighbours"""
+        started = time.perf_counter()
+        catalog_snapshot.invalidate()
+        products = list(catalog_snapshot.products())
+
+        features = [_feature_set(product) for product in products]
+        prices = [product['price'] for product in products]
+        price_range = max(prices) - min(prices) if prices else 0
+        price_range = price_range or 1.0
+
+        def similarity(i: int, j: int) -> float:
+            price_closeness = 1 - abs(products[i]['price'] - products[j]['price']) / price_range
+            spice_closeness = 1 - abs((products[i].get('spice_level') or 0) - (products[j].get('spice_level') or 0)) / 10
+            return (SIMILARITY_WEIGHTS['jaccard'] * _jaccard(features[i], features[j])
+                    + SIMILARITY_WEIGHTS['price'] * price_closeness
+                    + SIMILARITY_WEIGHTS['spice'] * spice_closeness)
+
+        exact = len(products) <= SIMILARITY_EXACT_MAX_PRODUCTS
+        if exact:
+            candidates = [range(len(products)) for _ in products]
+        else:
+            candidates = self._lsh_candidates(features)
+
+        neighbors = np.full((len(products), self.k), -1, dtype=np.int32)
+        scores = np.zeros((len(products), self.k), dtype=np.float32)
+        for i in range(len(products)):
+            best = heapq.nlargest(self.k, ((similarity(i, j), j) for j in candidates[i] if j != i))
+            for column, (score, j) in enumerate(best):
+                neighbors[i, column] = j
+                scores[i, column] = score
+
+        # Write a whole new version, then publish it so readers never see half an index
+        version = new_version(self.directory)
+        for name, array in [("neighbors.npy", neighbors), ("scores.npy", scores)]:
+            with open(os.path.join(version, name), "wb") as f:
+                np.save(f, array)
+
+        meta = {
+            "signature": signature or catalog_service.get_catalog_signature(include_popularity=False),
+            "k": self.k,
+            "product_ids": [product['product_id'] for product in products]
+        }
+        with open(os.path.join(version, "index.json"), "w") as f:
+            json.dump(meta, f)
+        publish(self.directory, version)
+
+        self._open(meta["signature"])
+        method = "all pairs" if exact else "MinHash-LSH candidates"
+        print(f"🧩 Similarity index built: {len(products)} products, {method}, "
+              f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _lsh_candidates(self, features: List[Set[str]]) -> List[Set[int]]:
+        """Products sharing at least one LSH band of their MinHash signatures"""
+        permutations = SIMILARITY_MINHASH_PERMUTATIONS
+        bands = max(1, min(SIMILARITY_LSH_BANDS, permutations))
+        rows_per_band = permutations // bands
+
+        rng = np.random.default_rng(0)
+        a = rng.integers(1, MERSENNE_PRIME, size=(permutations, 1), dtype=np.uint64)
+        b = rng.integers(0, MERSENNE_PRIME, size=(permutations, 1), dtype=np.uint64)
+
+        signatures = np.zeros((len(features), permutations), dtype=np.uint64)
+        for row, feature_set in enumerate(features):
+            hashes = np.array([zlib.crc32(feature.encode()) for feature in feature_set] or [0], dtype=np.uint64)
+            # Universal hashing h(x) = (a*x + b) mod p, one row per permutation
+            signatures[row] = ((a * hashes + b) % MERSENNE_PRIME).min(axis=1)
+
+        candidates = [set() for _ in features]
+        for band in range(bands):
+            buckets = {}
+            band_values = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+            for row, values in enumerate(band_values):
+                buckets.setdefault(values.tobytes(), []).append(row)
+            for members in buckets.values():
+                if 1 < len(members) <= MAX_BUCKET_SIZE:
+                    for row in members:
+                        candidates[row].update(members)
+        return candidates
+
+    def _open(self, signature: str) -> bool:
+        """Memory-map the published index if it matches the catalog"""
+        path = current_version(self.directory)
+        if path is None:
+            return False
+        try:
+            with open(os.path.join(path, "index.json")) as f:
+                meta = json.load(f)
+            if meta["signature"] != signature or meta["k"] != self.k:
+                return False
+            self.neighbors = np.load(os.path.join(path, "neighbors.npy"), mmap_mode="r")
+            self.scores = np.load(os.path.join(path, "scores.npy"), mmap_mode="r")
+            self.product_ids = meta["product_ids"]
+            self.rows = {product_id: row for row, product_id in enumerate(self.product_ids)}
+            self.signature = signature
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+# Global similarity index
+similarity_index = SimilarityIndex()
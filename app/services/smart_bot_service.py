@@ -0,0 +1,352 @@
+"""
+Smart FoodieBot Service - Stage-aware recommendations and responses
+The engine behind the Streamlit UI (formerly defined inline in server.py). Its slots
+only take a few values, so recommendations come from a table precomputed per catalog.
+"""
+
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+from app.config.settings import CATALOG_SNAPSHOT_TTL
+from app.models.database import get_db_manager
+from app.services.catalog_service import catalog_service
+from app.services.preference_extractor import preference_extractor, canonical_to_smart
+
+# Products shown per conversation stage
+STAGE_LIMITS = {'discovery': 3, 'recommendation': 2}
+# Slot values that filter; any other value of the slot filters nothing
+DIETARY_FILTERS = {
+    'vegetarian': ('dietary_tags', 'vegetarian'),
+    'vegan': ('dietary_tags', 'vegan'),
+    'healthy': ('category', 'Salads & Healthy Options')
+}
+FLAVOR_FILTERS = {
+    'spicy': ('spice_level', 6),
+    'sweet': ('category', 'Desserts')
+}
+
+def answer_key(prefs: Dict) -> tuple:
+    dietary = prefs.get('dietary')
+    flavor = prefs.get('flavor')
+    return (
+        dietary if dietary in DIETARY_FILTERS else None,
+        prefs.get('category'),
+        flavor if flavor in FLAVOR_FILTERS else None
+    )
+
+def _matches(row: Dict, dietary: Optional[str], category: Optional[str], flavor: Optional[str]) -> bool:
+    """The SQL filters in Python: LIKE '%x%' is a case-insensitive substring of the JSON text"""
+    for slot in (DIETARY_FILTERS.get(dietary), FLAVOR_FILTERS.get(flavor)):
+        if slot is None:
+            continue
+        column, value = slot
+        if column == 'dietary_tags' and value not in (row['dietary_tags'] or '').lower():
+            return False
+        if column == 'category' and row['category'] != value:
+            return False
+        if column == 'spice_level' and (row['spice_level'] is None or row['spice_level'] < value):
+            return False
+    return category is None or row['category'] == category
+
+def _rank(product: Dict) -> tuple:
+    """Sort key matching `ORDER BY popularity_score DESC, id ASC`"""
+    return -(product['popularity_score'] or 0), product['id']
+
+def _parse_product(product: Dict) -> Dict:
+    for field in ['ingredients', 'dietary_tags', 'mood_tags', 'allergens']:
+        if product[field]:
+            try:
+                product[field] = json.loads(product[field])
+            except:
+                product[field] = []
+    return product
+
+class AnswerTable:
+    """
+    (dietary, category, flavor) -> top products, shared by every SmartFoodieBotService.
+    Requests never build it: a change of catalog starts a rebuild on a background thread
+    and the old table keeps answering until the new one is swapped in. Popularity moves
+    are applied in place - by the flush of this worker, and every ttl for other workers'
+    """
+
+    def __init__(self, ttl: float = CATALOG_SNAPSHOT_TTL):
+        self.ttl = ttl
+        self.table: Dict[tuple, List[Dict]] = {}
+        # Popularity-independent catalog signature the table was built for
+        self.signature = None
+        # Full catalog signature, and the product_id -> popularity_score, it reflects
+        self.scores_signature = None
+        self.scores: Dict[str, int] = {}
+        self.checked_at = 0.0
+        self.builder = None
+        self.lock = threading.Lock()
+        self.update_lock = threading.Lock()
+
+    def current(self) -> Optional[Dict[tuple, List[Dict]]]:
+        """The table to answer from (None until the first build has finished)"""
+        if time.monotonic() - self.checked_at >= self.ttl:
+            self.checked_at = time.monotonic()
+            if catalog_service.get_catalog_signature() != self.scores_signature:
+                self.refresh()
+        return self.table or None
+
+    def refresh(self):
+        """Rebuild or re-rank in the background unless that is already running"""
+        with self.lock:
+            if self.builder is not None and self.builder.is_alive():
+                return
+            self.builder = threading.Thread(target=self._update_quietly, name="smart-answer-table", daemon=True)
+            self.builder.start()
+
+    def ensure_built(self):
+        """Blocking build when the table is missing or out of date (warm-up, scripts)"""
+        signature = catalog_service.get_catalog_signature(include_popularity=False)
+        if not self.table or self.signature != signature:
+            self.build()
+        self.checked_at = time.monotonic()
+
+    def build(self):
+        """
+        Every (dietary, category, flavor) combination the slots can take, mapped to its
+        top products - the same filters and order as query_recommendations
+        """
+        signature = catalog_service.get_catalog_signature(include_popularity=False)
+        scores_signature = catalog_service.get_catalog_signature()
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            rows = [dict(row) for row in conn.execute("SELECT * FROM products ORDER BY popularity_score DESC, id ASC")]
+        
+        categories = [None] + sorted({row['category'] for row in rows})
+        table = {}
+        for dietary in [None] + list(DIETARY_FILTERS):
+            for category in categories:
+                for flavor in [None] + list(FLAVOR_FILTERS):
+                    matches = [row for row in rows if _matches(row, dietary, category, flavor)]
+                    table[(dietary, category, flavor)] = [_parse_product(dict(row)) for row in matches[:max(STAGE_LIMITS.values())]]
+        
+        # One assignment - readers see the old table or the new one
+        with self.update_lock:
+            self.table = table
+            self.signature = signature
+            self.scores_signature = scores_signature
+            self.scores = {row['product_id']: row['popularity_score'] or 0 for row in rows}
+        print(f"📇 Smart answer table built: {len(table)} slot combinations")
+
+    def sync(self):
+        """Apply every score that differs from what the table reflects (other workers' flushes)"""
+        signature = catalog_service.get_catalog_signature()
+        if signature == self.scores_signature:
+            return
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            rows = conn.execute("SELECT product_id, popularity_score FROM products").fetchall()
+        moved = {product_id: score or 0 for product_id, score in rows if self.scores.get(product_id) != (score or 0)}
+        self.apply_updates(moved, signature)
+
+    def apply_updates(self, scores: Dict[str, int], signature: Optional[str] = None):
+        """
+        New popularity_score per product_id, already committed to the products table.
+        Each slot combination the product matches is re-ranked; one whose last product
+        dropped, so that the next in line is unknown, is re-read from SQL
+        """
+        if not self.table or not scores:
+            return
+        limit = max(STAGE_LIMITS.values())
+        db = get_db_manager()
+        with self.update_lock:
+            placeholders = ",".join("?" * len(scores))
+            with db.get_connection() as conn:
+                rows = [dict(row) for row in conn.execute(
+                    f"SELECT * FROM products WHERE product_id IN ({placeholders})", list(scores))]
+
+            table = dict(self.table)
+            refill = set()
+            for row in rows:
+                row['popularity_score'] = int(scores[row['product_id']])
+                for key, entries in table.items():
+                    if not _matches(row, *key):
+                        continue
+                    kept = [product for product in entries if product['product_id'] != row['product_id']]
+                    # A short combination holds every match, so it is always exact
+                    if len(entries) >= limit and len(kept) < len(entries) and _rank(row) > _rank(entries[-1]):
+                        refill.add(key)
+                    table[key] = sorted(kept + [_parse_product(dict(row))], key=_rank)[:limit]
+            for key in refill:
+                prefs = {slot: value for slot, value in zip(('dietary', 'category', 'flavor'), key) if value is not None}
+                table[key] = query_recommendations(prefs, limit)
+
+            self.scores.update({product_id: int(score) for product_id, score in scores.items()})
+            self.table = table
+            if signature:
+                self.scores_signature = signature
+
+    def _update_quietly(self):
+        try:
+            if not self.table or catalog_service.get_catalog_signature(include_popularity=False) != self.signature:
+                self.build()
+            else:
+                self.sync()
+        except Exception as e:
+            print(f"⚠️ Smart answer table update failed: {e}")
+
+def query_recommendations(prefs: Dict, limit: int) -> List[Dict]:
+    """The SQL path - used for slots outside the table and to verify it"""
+    db = get_db_manager()
+    
+    with db.get_connection() as conn:
+        query = "SELECT * FROM products WHERE 1=1"
+        params = []
+        
+        # Apply filters based on preferences
+        if 'dietary' in prefs:
+            if prefs['dietary'] == 'vegetarian':
+                query += " AND dietary_tags LIKE '%vegetarian%'"
+            elif prefs['dietary'] == 'vegan':
+                query += " AND dietary_tags LIKE '%vegan%'"
+            elif prefs['dietary'] == 'healthy':
+                query += " AND category = 'Salads & Healthy Options'"
+        
+        if 'category' in prefs:
+            query += " AND category = ?"
+            params.append(prefs['category'])
+        
+        if 'flavor' in prefs:
+            if prefs['flavor'] == 'spicy':
+                query += " AND spice_level >= 6"
+            elif prefs['flavor'] == 'sweet':
+                query += " AND category = 'Desserts'"
+        
+        # Ties broken by id so the order is the same whichever index SQLite picks
+        query += " ORDER BY popularity_score DESC, id ASC LIMIT ?"
+        params.append(limit)
+        
+        cursor = conn.execute(query, params)
+        return [_parse_product(dict(row)) for row in cursor.fetchall()]
+
+class SmartFoodieBotService:
+    def __init__(self, answers: Optional[AnswerTable] = None):
+        self.user_context = {}
+        self.answers = answers or answer_table
+        
+    def process_message(self, message: str, session_id: str) -> tuple:
+        """Process with smart recommendations"""
+        
+        context = self.get_context(session_id)
+        context['messages'].append(message)
+        
+        # Update preferences
+        self.update_user_preferences(message, context)
+        
+        # Get smart recommendations
+        products = self.get_smart_recommendations(message, context)
+        
+        # Generate response
+        response = self.generate_smart_response(message, products, context)
+        
+        # Calculate interest score
+        interest_score = self.calculate_smart_interest(message, context)
+        
+        return response, products, interest_score
+    
+    def get_context(self, session_id: str) -> Dict:
+        """Initialize user context"""
+        if session_id not in self.user_context:
+            self.user_context[session_id] = {
+                'messages': [],
+                'preferences': {},
+                'stage': 'discovery'
+            }
+        return self.user_context[session_id]
+    
+    def update_user_preferences(self, message: str, context: Dict):
+        """Extract and update user preferences (newest mention wins)"""
+        extracted = preference_extractor.extract(message)
+        context['preferences'].update(canonical_to_smart(extracted, message))
+    
+    def get_smart_recommendations(self, message: str, context: Dict) -> List[Dict]:
+        """Get intelligent recommendations"""
+        try:
+            prefs = context['preferences']
+            
+            # Conversation stage decides how many products to show
+            if len(context['messages']) <= 2:
+                context['stage'] = 'discovery'
+            else:
+                context['stage'] = 'recommendation'
+            limit = STAGE_LIMITS[context['stage']]
+            
+            products = self.lookup_recommendations(prefs, limit)
+            if products is None:
+                products = self.query_recommendations(prefs, limit)
+            return products
+                
+        except Exception as e:
+            print(f"❌ Recommendation error: {e}")
+            return []
+    
+    def lookup_recommendations(self, prefs: Dict, limit: int) -> Optional[List[Dict]]:
+        """Answer from the precomputed table; None when the slots are not in it (or it is not built yet)"""
+        table = self.answers.current()
+        products = table.get(answer_key(prefs)) if table else None
+        if products is None:
+            return None
+        # Copies - callers annotate the dicts
+        return [dict(product) for product in products[:limit]]
+    
+    def query_recommendations(self, prefs: Dict, limit: int) -> List[Dict]:
+        """The SQL path - used for slots outside the table and to verify it"""
+        return query_recommendations(prefs, limit)
+    
+    def generate_smart_response(self, message: str, products: List[Dict], context: Dict) -> str:
+        """Generate smart responses"""
+        message_lower = message.lower().strip()
+        
+        # Greetings
+        if any(word in message_lower for word in ['hi', 'hello', 'hey']):
+            return "Hi! I'm FoodieBot, your AI food consultant! 🤖 I specialize in finding the perfect meal for you. What type of food experience are you craving today?"
+        
+        # With products
+        if products:
+            product = products[0]
+            
+            if 'spicy' in message_lower:
+                spice_level = product.get('spice_level', 5)
+                return f"🌶️ Perfect! I found the **{product['name']}** with {spice_level}/10 heat level for ${product['price']:.2f}. {product['description'][:70]}... This will definitely bring the fire you're looking for!"
+            
+            elif 'sweet' in message_lower or 'dessert' in message_lower:
+                return f"🍰 Sweet choice! The **{product['name']}** at ${product['price']:.2f} is absolutely divine. {product['description'][:70]}... Perfect for satisfying that sweet craving!"
+            
+            elif context['preferences'].get('dietary') == 'vegetarian':
+                return f"🌱 Excellent! The **{product['name']}** is completely vegetarian at ${product['price']:.2f}. {product['description'][:70]}... Full of flavor and plant-based goodness!"
+            
+            else:
+                return f"I recommend the **{product['name']}** for ${product['price']:.2f}! {product['description'][:70]}... It's incredibly popular and I think you'll love it!"
+        
+        # No products
+        else:
+            return "I'm excited to help you discover something delicious! What type of flavors or cuisines interest you most?"
+    
+    def calculate_smart_interest(self, message: str, context: Dict) -> float:
+        """Calculate interest score"""
+        message_lower = message.lower()
+        
+        base_score = 35.0 if context['stage'] == 'discovery' else 65.0
+        
+        if any(word in message_lower for word in ['love', 'like', 'want']):
+            base_score += 20
+        if any(word in message_lower for word in ['yes', 'perfect', 'great']):
+            base_score += 25
+        if '?' in message_lower:
+            base_score += 10
+        if '!' in message_lower:
+            base_score += 8
+        
+        base_score += len(context['preferences']) * 10
+        base_score += min(len(context['messages']) * 3, 15)
+        
+        return min(100.0, round(base_score, 1))
+
+# Global answer table and smart bot service
+answer_table = AnswerTable()
+smart_bot_service = SmartFoodieBotService()
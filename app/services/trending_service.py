@@ -0,0 +1,253 @@
+"""
+Trending Now - Sliding-window heavy hitters over the products the chat recommends
+The window is split into time buckets, each a Space-Saving sketch with a fixed number of
+counters, so memory is TRENDING_BUCKETS x TRENDING_CAPACITY whatever the traffic. Expired
+buckets are dropped as the window slides, the merged top list is cached for
+TRENDING_REFRESH_SECONDS. Each worker process records into its own sketches and saves them
+to its own file (TRENDING_STATE_PATH.<pid>) at most every TRENDING_REFRESH_SECONDS and on
+shutdown; the served list adds up every worker's file, so it is the same whichever worker
+answers. On start a worker takes over the files of workers that are gone.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.config.settings import (
+    TRENDING_WINDOW_MINUTES, TRENDING_BUCKETS, TRENDING_CAPACITY, TRENDING_REFRESH_SECONDS,
+    TRENDING_STATE_PATH, POPULARITY_HIGH_INTEREST
+)
+from app.services.popularity_counter import SHOWN_PRODUCTS, SHOWN_WEIGHT, HIGH_INTEREST_WEIGHT
+
+def _running(pid: int) -> bool:
+    """Whether a process with this pid is alive (on this host)"""
+    if os.name == "nt":
+        # os.kill would terminate it there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Alive, just not ours to signal
+        return True
+    return True
+
+class SpaceSaving:
+    """Top-k heavy hitters in a fixed number of counters (Metwally et al.)"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, float] = {}
+        # Overestimate per item: the count it inherited when it took over a counter
+        self.errors: Dict[str, float] = {}
+
+    def add(self, item: str, weight: float = 1.0):
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0.0
+        else:
+            # Replace the smallest counter; the newcomer inherits its count as error
+            victim = min(self.counts, key=self.counts.__getitem__)
+            floor = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[item] = floor + weight
+            self.errors[item] = floor
+
+    def merge(self, other: 'SpaceSaving'):
+        """Add another sketch's counters, keeping the heaviest `capacity` of them"""
+        for item, count in other.counts.items():
+            self.counts[item] = self.counts.get(item, 0.0) + count
+            self.errors[item] = self.errors.get(item, 0.0) + other.errors.get(item, 0.0)
+        for item in sorted(self.counts, key=self.counts.__getitem__)[:max(0, len(self.counts) - self.capacity)]:
+            del self.counts[item]
+            del self.errors[item]
+
+    def to_dict(self) -> Dict:
+        return {"counts": self.counts, "errors": self.errors}
+
+    @classmethod
+    def from_dict(cls, capacity: int, data: Dict) -> 'SpaceSaving':
+        sketch = cls(capacity)
+        # Keep the heaviest counters if the capacity shrank since the save
+        for item in sorted(data["counts"], key=data["counts"].__getitem__, reverse=True)[:capacity]:
+            sketch.counts[item] = float(data["counts"][item])
+            sketch.errors[item] = float(data["errors"].get(item, 0.0))
+        return sketch
+
+class TrendingTracker:
+    def __init__(self, window_minutes: float = TRENDING_WINDOW_MINUTES, buckets: int = TRENDING_BUCKETS,
+                 capacity: int = TRENDING_CAPACITY, refresh_seconds: float = TRENDING_REFRESH_SECONDS,
+                 state_path: str = TRENDING_STATE_PATH):
+        self.bucket_count = max(1, buckets)
+        self.bucket_seconds = max(window_minutes, 0.01) * 60 / self.bucket_count
+        self.capacity = capacity
+        self.refresh_seconds = refresh_seconds
+        self.state_path = state_path
+
+        # Bucket number (seconds since the epoch // bucket_seconds) -> sketch
+        self.buckets: Dict[int, SpaceSaving] = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.saved_at = 0.0
+        self.top_items: List[Tuple[str, float]] = []
+        self.top_computed_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def record_turn(self, turn):
+        """Count the products a chat turn showed, weighted like live popularity"""
+        weight = SHOWN_WEIGHT + (HIGH_INTEREST_WEIGHT if (turn.interest_score or 0) >= POPULARITY_HIGH_INTEREST else 0.0)
+        self.record([product['product_id'] for product in turn.products[:SHOWN_PRODUCTS]], weight)
+
+    def record(self, product_ids: Iterable[str], weight: float = 1.0):
+        if not self.enabled:
+            return
+        bucket = self._bucket(time.time())
+        with self.lock:
+            self._load()
+            sketch = self.buckets.get(bucket)
+            closed = sketch is None and bool(self.buckets)
+            if sketch is None:
+                self._expire(bucket)
+                sketch = self.buckets[bucket] = SpaceSaving(self.capacity)
+            for product_id in product_ids:
+                sketch.add(product_id, weight)
+        if closed or time.monotonic() - self.saved_at >= self.refresh_seconds:
+            # Other workers serve these counts from the file - keep it about as fresh as their lists
+            self.save()
+
+    def top(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        (product_id, weighted count over the window across all workers), heaviest first -
+        cached, so O(limit). Other workers' counts are as of their last save
+        """
+        now = time.monotonic()
+        if now - self.top_computed_at >= self.refresh_seconds:
+            # Live workers only - files of finished ones are taken over by a starting worker
+            others = [sketch for path, pid in self._state_files()
+                      if pid is not None and pid != os.getpid() and _running(pid)
+                      for sketch in self._read_state(path).values()]
+            with self.lock:
+                if now - self.top_computed_at >= self.refresh_seconds:
+                    self._load()
+                    self._expire(self._bucket(time.time()))
+                    sketches = list(self.buckets.values()) + others
+                    totals: Dict[str, float] = {}
+                    for sketch in sketches:
+                        for product_id, count in sketch.counts.items():
+                            totals[product_id] = totals.get(product_id, 0.0) + count
+                    ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+                    self.top_items = ranked[:self.capacity]
+                    self.top_computed_at = now
+        return self.top_items[:limit]
+
+    def save(self):
+        """Write the live buckets to a temporary file, then swap it in as this worker's state file"""
+        if not self.state_path:
+            return
+        # One writer per process - the temporary file name is per process, not per thread
+        with self.save_lock:
+            self.saved_at = time.monotonic()
+            with self.lock:
+                state = {
+                    "bucket_seconds": self.bucket_seconds,
+                    "buckets": {str(bucket): sketch.to_dict() for bucket, sketch in self.buckets.items()}
+                }
+            try:
+                os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+                # Per-process names - workers never write or replace each other's files
+                temporary = f"{self.state_path}.tmp{os.getpid()}"
+                with open(temporary, "w") as f:
+                    json.dump(state, f)
+                os.replace(temporary, f"{self.state_path}.{os.getpid()}")
+            except OSError as e:
+                print(f"⚠️ Could not save trending sketches: {e}")
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            return {
+                "window_minutes": round(self.bucket_seconds * self.bucket_count / 60, 2),
+                "buckets": len(self.buckets),
+                "counters": sum(len(sketch.counts) for sketch in self.buckets.values()),
+                "max_counters": self.bucket_count * self.capacity
+            }
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def _expire(self, current: int):
+        for bucket in [bucket for bucket in self.buckets if bucket <= current - self.bucket_count]:
+            del self.buckets[bucket]
+
+    def _load(self):
+        """
+        Merge in the sketches saved by workers that are gone (once, under the lock). Each
+        file is claimed with a rename, so of several workers starting together only one
+        takes it over and nothing is counted twice
+        """
+        if self.loaded or not self.state_path:
+            return
+        self.loaded = True
+        for path, pid in self._state_files():
+            # A file under our own pid is a previous process's that happened to get it
+            if pid is not None and pid != os.getpid() and _running(pid):
+                continue
+            claimed = f"{self.state_path}.claimed{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            try:
+                buckets = self._read_state(claimed)
+            finally:
+                os.remove(claimed)
+            for bucket, sketch in buckets.items():
+                if bucket in self.buckets:
+                    self.buckets[bucket].merge(sketch)
+                else:
+                    self.buckets[bucket] = sketch
+
+    def _state_files(self) -> List[Tuple[str, Optional[int]]]:
+        """(path, pid) of every worker's state file, plus (path, None) for the shared file older versions wrote"""
+        if not self.state_path:
+            return []
+        directory = os.path.dirname(self.state_path) or "."
+        prefix = os.path.basename(self.state_path)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return []
+        files = [(self.state_path, None)] if prefix in names else []
+        for name in names:
+            pid = name[len(prefix) + 1:]
+            if name.startswith(prefix + ".") and pid.isdigit():
+                files.append((os.path.join(directory, name), int(pid)))
+        return files
+
+    def _read_state(self, path: str) -> Dict[int, SpaceSaving]:
+        """The saved buckets still inside the window ({} when unreadable or laid out differently)"""
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get("bucket_seconds") != self.bucket_seconds:
+            # Different bucket layout - the saved buckets do not line up with ours
+            return {}
+        current = self._bucket(time.time())
+        buckets = {}
+        for bucket, data in state.get("buckets", {}).items():
+            bucket = int(bucket)
+            if current - self.bucket_count < bucket <= current:
+                buckets[bucket] = SpaceSaving.from_dict(self.capacity, data)
+        return buckets
+
+# Global trending tracker
+trending_tracker = TrendingTracker()
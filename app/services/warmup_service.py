@@ -0,0 +1,142 @@
+"""
+Warm-up - Get a fresh instance hot before it takes traffic
+Reads the catalog (cold SQLite pages, product pages, facet and similarity indexes),
+replays the most common preference sets from the conversations log through a copy of the
+chat pipeline on engines of its own (so no analytics, session or demand is recorded), and
+touches the generation backend. Readiness flips only once it has finished.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+from app.config.settings import WARMUP_ENABLED, WARMUP_LOOKBACK, WARMUP_SIGNATURES, WARMUP_GENERATION
+from app.models.database import get_db_manager, conversation_store
+from app.services.catalog_service import catalog_service
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.facet_service import facet_index
+from app.services.generation_backend import generation_backend
+from app.services.inference_client import inference_client
+from app.services.interaction_model import interaction_model
+from app.services.popularity_lists import popularity_lists
+from app.services.semantic_index import semantic_index
+from app.services.sentiment_service import sentiment_analyzer
+from app.services.similarity_index import similarity_index
+from app.services.smart_bot_service import answer_table
+
+class WarmupService:
+    def __init__(self, enabled: bool = WARMUP_ENABLED, lookback: int = WARMUP_LOOKBACK,
+                 signatures: int = WARMUP_SIGNATURES, generation: bool = WARMUP_GENERATION):
+        self.enabled = enabled
+        self.lookback = lookback
+        self.signatures = signatures
+        self.generation = generation
+        self.ready = False
+        self.running = False
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.replayed = 0
+        self.lock = threading.Lock()
+
+    def start(self, pipeline=None):
+        """Warm up on a background thread; the app keeps answering /ready with 503 meanwhile"""
+        with self.lock:
+            if self.running or self.ready:
+                return
+            self.running = True
+        threading.Thread(target=self.run, args=(pipeline,), name="warmup", daemon=True).start()
+
+    def run(self, pipeline=None):
+        """Every step runs even if an earlier one failed - a partly warm instance still serves"""
+        self.running = True
+        if self.enabled:
+            self._step("catalog", self._warm_catalog)
+            self._step("indexes", self._warm_indexes)
+            self._step("sentiment", sentiment_analyzer.load_nlp)
+            if pipeline is not None:
+                # Replays must not count as traffic - run them on a private copy of the pipeline
+                pipeline = pipeline.isolated()
+                self._step("pipeline", lambda: self._warm_pipeline(pipeline))
+            self._step("generation", lambda: self._warm_generation(pipeline))
+        self.running = False
+        self.ready = True
+        total = sum(self.steps.values())
+        print(f"🔥 Warm-up finished in {total:.0f}ms ({self.replayed} preference sets replayed)")
+
+    def get_status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "warming_up": self.running,
+            "enabled": self.enabled,
+            "steps_ms": dict(self.steps),
+            "errors": dict(self.errors),
+            "preference_sets_replayed": self.replayed
+        }
+
+    def _step(self, name: str, action):
+        started = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            self.errors[name] = str(e)
+            print(f"⚠️ Warm-up step '{name}' failed: {e}")
+        self.steps[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def _warm_catalog(self):
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            # Pull every product page into the OS cache
+            conn.execute("SELECT * FROM products").fetchall()
+        # First page overall and per category, which also fills the count cache
+        catalog_service.get_products_page()
+        for category in catalog_service.get_categories():
+            catalog_service.get_products_page(category=category)
+
+    def _warm_indexes(self):
+        catalog_snapshot.ensure_loaded()
+        facet_index.ensure_loaded()
+        popularity_lists.ensure_loaded()
+        semantic_index.ensure_loaded()
+        similarity_index.ensure_loaded()
+        interaction_model.ensure_loaded()
+        answer_table.ensure_built()
+
+    def common_preferences(self) -> List[tuple]:
+        """(preferences, example message) for the most frequent recent preference sets"""
+        db = get_db_manager()
+        with db.get_connection() as conn:
+            rows = conversation_store.recent(conn, self.lookback, columns="user_message, user_preferences")
+
+        counts = Counter()
+        examples = {}
+        for message, raw in rows:
+            try:
+                preferences = json.loads(raw) if raw else {}
+            except (TypeError, ValueError):
+                continue
+            if not isinstance(preferences, dict) or not preferences:
+                continue
+            signature = json.dumps(preferences, sort_keys=True)
+            counts[signature] += 1
+            examples.setdefault(signature, message)
+
+        return [(json.loads(signature), examples[signature]) for signature, _ in counts.most_common(self.signatures)]
+
+    def _warm_pipeline(self, pipeline):
+        for index, (preferences, message) in enumerate(self.common_preferences()):
+            pipeline.prepare(message, f"warmup-{index}", preferences)
+            self.replayed += 1
+
+    def _warm_generation(self, pipeline=None):
+        generation_backend.warm_up()
+        if generation_backend.name == "huggingface":
+            # Open the keep-alive pool now rather than on the first user's turn
+            inference_client.session
+        # A sample reply through a paid API costs money on every start - opt in with WARMUP_GENERATION
+        if self.generation and pipeline is not None:
+            turn = pipeline.prepare("What do you recommend?", "warmup-generation")
+            pipeline.generator.generate(turn)
+
+# Global warm-up state
+warmup_service = WarmupService()
@@ -0,0 +1,44 @@
+"""
+Versioned index directories shared by worker processes
+Every build writes a complete file set into a fresh version directory; one rename of the
+CURRENT pointer file then publishes it, so a reader maps either the whole old set or the
+whole new one, never a mix. Old versions stay on disk a little while for readers that
+looked up the pointer just before it moved (mapped files survive deletion anyway).
+"""
+
+import os
+import shutil
+import time
+from typing import Optional
+
+POINTER = "CURRENT"
+# Published versions kept on disk, the current one included
+KEEP_VERSIONS = 3
+
+def new_version(directory: str) -> str:
+    """An empty directory for one build - time first, so names sort by age"""
+    path = os.path.join(directory, f"v{time.time_ns()}-{os.getpid()}")
+    os.makedirs(path)
+    return path
+
+def publish(directory: str, version: str):
+    """Point CURRENT at a finished version (atomic), then drop the oldest versions"""
+    pointer = os.path.join(directory, POINTER)
+    with open(f"{pointer}.tmp{os.getpid()}", "w") as f:
+        f.write(os.path.basename(version))
+    os.replace(f"{pointer}.tmp{os.getpid()}", pointer)
+
+    current = os.path.basename(version)
+    versions = sorted(name for name in os.listdir(directory) if name.startswith("v") and name != current)
+    for name in versions[:max(0, len(versions) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+def current_version(directory: str) -> Optional[str]:
+    """The published version directory, or None before the first build"""
+    try:
+        with open(os.path.join(directory, POINTER)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(directory, name)
+    return path if name and os.path.isdir(path) else None
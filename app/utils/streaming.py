@@ -0,0 +1,16 @@
+"""
+Helpers for Server-Sent Event chat streams
+"""
+
+import json
+import re
+from typing import Dict, Iterator
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def chunk_text(text: str) -> Iterator[str]:
+    """Split a finished reply into word-sized chunks (whitespace kept with each word)"""
+    for chunk in re.findall(r'\s*\S+', text):
+        yield chunk
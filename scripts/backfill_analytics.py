@@ -0,0 +1,31 @@
+"""
+Rebuild the incremental analytics aggregates from the conversations table
+Run once after upgrading, or whenever the rollups look out of sync:
+
+    python scripts/backfill_analytics.py
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database
+from app.services.analytics_service import analytics_service
+
+def main():
+    print("📊 FoodieBot Analytics Backfill")
+    print("===============================")
+
+    db_path = os.getenv("DATABASE_URL", "./data/foodiebot.db")
+    init_database(db_path)
+
+    result = analytics_service.backfill()
+
+    print(f"✅ Rebuilt aggregates from {result['conversations']} conversations")
+    print(f"🕐 Hourly rollups: {result['hours']}")
+    print(f"👥 Distinct sessions (estimate): {result['sessions']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Preference extraction benchmark
+Times the compiled lexicon extractor against the keyword chains the three engines used
+before it, on the same messages, and shows where their answers differ:
+
+    python scripts/benchmark_extraction.py
+    python scripts/benchmark_extraction.py --rounds 5000 --diff
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.preference_extractor import preference_extractor, LEXICON
+
+MESSAGES = [
+    "Hi there!",
+    "I want something really spicy",
+    "I'm vegetarian, show me some pizza",
+    "Any gluten free breakfast options? Maybe pancakes",
+    "Something sweet under $8 please",
+    "I'd love a chicken burger and a milkshake",
+    "My budget is around 15 dollars, something hearty and filling",
+    "Do you have vegan tacos or a burrito bowl?",
+    "I need a light, fresh salad with no meat",
+    "What's the most popular thing on the menu?",
+    "Creamy chocolate dessert with caramel, nothing below 5 stars",
+    "Hot wings with sriracha, less than $12",
+    "Something warm and cheesy for a rainy night",
+    "Keto friendly, low-carb, no carbs at all please - maximum $20",
+]
+
+# The keyword chains each engine used before the shared lexicon, kept for comparison
+
+def legacy_smart(message):
+    message_lower = message.lower()
+    preferences = {}
+    if 'vegetarian' in message_lower:
+        preferences['dietary'] = 'vegetarian'
+    elif 'vegan' in message_lower:
+        preferences['dietary'] = 'vegan'
+    elif 'healthy' in message_lower:
+        preferences['dietary'] = 'healthy'
+    if any(word in message_lower for word in ['spicy', 'hot', 'fire']):
+        preferences['flavor'] = 'spicy'
+    elif 'sweet' in message_lower:
+        preferences['flavor'] = 'sweet'
+    if 'pizza' in message_lower:
+        preferences['category'] = 'Pizza'
+    elif 'burger' in message_lower:
+        preferences['category'] = 'Burgers'
+    elif 'salad' in message_lower:
+        preferences['category'] = 'Salads & Healthy Options'
+    elif 'chicken' in message_lower:
+        preferences['category'] = 'Fried Chicken'
+    elif 'dessert' in message_lower:
+        preferences['category'] = 'Desserts'
+    return preferences
+
+def legacy_working(message):
+    message_lower = message.lower()
+    preferences = {}
+    if 'pizza' in message_lower:
+        preferences['categories'] = ['Pizza']
+    elif 'burger' in message_lower:
+        preferences['categories'] = ['Burgers']
+    elif 'dessert' in message_lower or 'sweet' in message_lower:
+        preferences['categories'] = ['Desserts']
+    elif 'drink' in message_lower:
+        preferences['categories'] = ['Beverages']
+    elif 'salad' in message_lower or 'healthy' in message_lower:
+        preferences['categories'] = ['Salads & Healthy Options']
+    if 'vegetarian' in message_lower:
+        preferences['dietary'] = ['vegetarian']
+    elif 'vegan' in message_lower:
+        preferences['dietary'] = ['vegan']
+    if 'spicy' in message_lower or 'hot' in message_lower:
+        preferences['mood'] = ['spicy']
+    elif 'sweet' in message_lower:
+        preferences['mood'] = ['sweet']
+    return preferences
+
+LEGACY_BUDGET_PATTERNS = [
+    r'under \$?(\d+)', r'less than \$?(\d+)', r'below \$?(\d+)',
+    r'budget.*?(\d+)', r'around \$?(\d+)', r'maximum \$?(\d+)'
+]
+
+def legacy_lightweight(message):
+    message_lower = message.lower().strip()
+    preferences = {}
+    for slot, values in LEXICON.items():
+        detected = [value for value, words in values.items() if any(word in message_lower for word in words)]
+        if detected:
+            preferences[slot] = detected
+    for pattern in LEGACY_BUDGET_PATTERNS:
+        match = re.search(pattern, message_lower)
+        if match:
+            preferences['max_budget'] = int(match.group(1))
+            break
+    return preferences
+
+def time_per_message(extract, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            extract(message)
+    return (time.perf_counter() - started) / (rounds * len(MESSAGES)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preference extraction")
+    parser.add_argument("--rounds", type=int, default=2000, help="passes over the message set")
+    parser.add_argument("--diff", action="store_true", help="show messages where the lightweight chain disagrees")
+    args = parser.parse_args()
+
+    print("🔎 Preference Extraction Benchmark")
+    print("==================================")
+
+    extractors = [
+        ("smart (keyword chain)", legacy_smart),
+        ("working (keyword chain)", legacy_working),
+        ("lightweight (pattern loops)", legacy_lightweight),
+        ("lexicon (one regex pass)", preference_extractor.extract),
+    ]
+
+    print(f"{'extractor':<30} {'µs/message':>11}")
+    for name, extract in extractors:
+        print(f"{name:<30} {time_per_message(extract, args.rounds):>11.2f}")
+
+    found = {name: sum(1 for message in MESSAGES if extract(message)) for name, extract in extractors}
+    print()
+    print("Messages with at least one preference found")
+    for name, count in found.items():
+        print(f"{name:<30} {count:>3}/{len(MESSAGES)}")
+
+    if args.diff:
+        print()
+        for message in MESSAGES:
+            old, new = legacy_lightweight(message), preference_extractor.extract(message)
+            comparable = {slot: sorted(values) if isinstance(values, list) else values for slot, values in new.items()}
+            if {slot: sorted(values) if isinstance(values, list) else values for slot, values in old.items()} != comparable:
+                print(f"💬 {message}")
+                print(f"   before: {old}")
+                print(f"   after:  {new}")
+
+if __name__ == "__main__":
+    main()
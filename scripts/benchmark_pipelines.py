@@ -0,0 +1,142 @@
+"""
+A/B benchmark for the chat pipelines
+Replays the same scripted conversations through each pipeline preset and reports
+per-stage latency plus simple quality checks (did the products respect what the
+user asked for, did the reply mention the top product):
+
+    python scripts/benchmark_pipelines.py
+    python scripts/benchmark_pipelines.py --pipelines smart,engine --repeat 20
+    python scripts/benchmark_pipelines.py --pipelines smart --retriever engine --ranker preference
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database
+from app.services.pipeline import build_pipeline, PRESETS
+
+# Each conversation is a list of (message, expectations for the products returned)
+CONVERSATIONS = [
+    [
+        ("Hi there!", {}),
+        ("I want something really spicy", {'min_spice': 5}),
+        ("Any spicy chicken?", {'min_spice': 5, 'category': 'Fried Chicken'}),
+    ],
+    [
+        ("I'm vegetarian", {'dietary': 'vegetarian'}),
+        ("Show me some pizza", {'dietary': 'vegetarian', 'category': 'Pizza'}),
+        ("Something under $12 please", {'dietary': 'vegetarian', 'max_price': 12}),
+    ],
+    [
+        ("I need something sweet, a dessert maybe", {'category': 'Desserts'}),
+        ("What about chocolate?", {'category': 'Desserts'}),
+    ],
+    [
+        ("Show me healthy food options", {'dietary': 'healthy'}),
+        ("A fresh salad would be perfect!", {'category': 'Salads & Healthy Options'}),
+    ],
+    [
+        ("I'd love a burger", {'category': 'Burgers'}),
+        ("Budget is around $10", {'max_price': 10}),
+        ("Yes, I'll take it!", {}),
+    ],
+]
+
+def satisfies(product, expect):
+    if 'category' in expect and product.get('category') != expect['category']:
+        return False
+    if 'dietary' in expect:
+        tags = [str(tag).lower() for tag in product.get('dietary_tags', [])]
+        healthy_category = expect['dietary'] == 'healthy' and product.get('category') == 'Salads & Healthy Options'
+        if expect['dietary'] not in tags and not healthy_category:
+            return False
+    if 'max_price' in expect and product.get('price', 0) > expect['max_price']:
+        return False
+    if 'min_spice' in expect and (product.get('spice_level') or 0) < expect['min_spice']:
+        return False
+    return True
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def benchmark(pipeline, repeat):
+    stage_samples = {}
+    totals = []
+    turns = answered = mentioned = 0
+    checked = satisfied = 0
+
+    for _ in range(repeat):
+        for conversation in CONVERSATIONS:
+            session_id = f"bench-{uuid.uuid4()}"
+            for message, expect in conversation:
+                started = time.perf_counter()
+                turn = pipeline.run(message, session_id)
+                totals.append((time.perf_counter() - started) * 1000)
+
+                for stage, ms in turn.timings.items():
+                    stage_samples.setdefault(stage, []).append(ms)
+
+                turns += 1
+                if turn.products:
+                    answered += 1
+                    if turn.products[0]['name'] in turn.response:
+                        mentioned += 1
+                if expect:
+                    for product in turn.products:
+                        checked += 1
+                        satisfied += satisfies(product, expect)
+
+    return {
+        'turns': turns,
+        'p50_ms': percentile(totals, 0.5),
+        'p95_ms': percentile(totals, 0.95),
+        'stages': {stage: percentile(samples, 0.5) for stage, samples in stage_samples.items()},
+        'coverage': answered / turns if turns else 0,
+        'precision': satisfied / checked if checked else 0,
+        'mention_rate': mentioned / answered if answered else 0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chat pipelines on the same conversations")
+    parser.add_argument("--pipelines", default=",".join(PRESETS), help="comma separated presets")
+    parser.add_argument("--repeat", type=int, default=10, help="times each conversation is replayed")
+    for stage in ['extractor', 'scorer', 'retriever', 'ranker', 'generator']:
+        parser.add_argument(f"--{stage}", default="", help=f"override the {stage} of every preset")
+    args = parser.parse_args()
+
+    print("⚖️  FoodieBot Pipeline Benchmark")
+    print("================================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+
+    overrides = {stage: getattr(args, stage) for stage in ['extractor', 'scorer', 'retriever', 'ranker', 'generator']}
+    results = []
+    for preset in [name.strip() for name in args.pipelines.split(",") if name.strip()]:
+        pipeline = build_pipeline(preset, **overrides)
+        # One untimed pass so lazy imports and caches do not count against the first pipeline
+        benchmark(pipeline, 1)
+        results.append((pipeline.name, benchmark(pipeline, args.repeat)))
+
+    print()
+    print(f"{'pipeline':<28} {'turns':>6} {'p50 ms':>8} {'p95 ms':>8} {'coverage':>9} {'precision':>10} {'mentions':>9}")
+    for name, result in results:
+        print(f"{name:<28} {result['turns']:>6} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['coverage']:>9.0%} {result['precision']:>10.0%} {result['mention_rate']:>9.0%}")
+
+    print()
+    print("Median stage latency (ms)")
+    for name, result in results:
+        stages = "  ".join(f"{stage} {ms:.3f}" for stage, ms in result['stages'].items())
+        print(f"{name:<28} {stages}")
+
+if __name__ == "__main__":
+    main()
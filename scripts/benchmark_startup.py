@@ -0,0 +1,114 @@
+"""
+Startup benchmark - how long until the API can serve its first request
+Starts each app in fresh interpreters under `python -X importtime`, runs its startup
+handlers and reports import time, startup time and the slowest modules. Exits with
+status 1 when the median exceeds the budget, so CI can enforce it:
+
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --apps server --runs 10 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: import the app, then its startup handlers (database init etc.)
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+module = __import__(sys.argv[1], fromlist=['app'])
+imported = time.perf_counter()
+asyncio.run(module.app.router.startup())
+ready = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'startup_ms': (ready - imported) * 1000}))
+"""
+
+def parse_importtime(stderr: str):
+    """`import time: self | cumulative | name` lines -> {module: (self_us, cumulative_us)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+def run_once(app_module: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, app_module],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    timings = None
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("{"):
+            timings = json.loads(line)
+            break
+    if result.returncode != 0 or timings is None:
+        raise RuntimeError(f"{app_module} failed to start:\n{result.stderr[-2000:]}")
+    return timings, parse_importtime(result.stderr)
+
+def median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold start against a budget")
+    parser.add_argument("--apps", default="server,app.main", help="comma separated app modules")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1500")),
+                        help="median import + startup allowed per app")
+    parser.add_argument("--top", type=int, default=10, help="slowest project modules to list")
+    args = parser.parse_args()
+
+    print("⏱️  FoodieBot Startup Benchmark")
+    print("==============================")
+
+    over_budget = []
+    for app_module in [name.strip() for name in args.apps.split(",") if name.strip()]:
+        # One untimed start so the OS file cache and any schema migration do not count
+        run_once(app_module)
+
+        runs = [run_once(app_module) for _ in range(args.runs)]
+        import_ms = median([timings['import_ms'] for timings, _ in runs])
+        startup_ms = median([timings['startup_ms'] for timings, _ in runs])
+        total_ms = import_ms + startup_ms
+
+        # Median self time per module across runs
+        self_times = {}
+        cumulative_times = {}
+        for _, modules in runs:
+            for name, (self_us, cumulative_us) in modules.items():
+                self_times.setdefault(name, []).append(self_us)
+                cumulative_times.setdefault(name, []).append(cumulative_us)
+
+        status = "✅" if total_ms <= args.budget_ms else "❌"
+        print(f"\n{status} {app_module}: import {import_ms:.0f}ms + startup {startup_ms:.0f}ms = "
+              f"{total_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+
+        project = [name for name in self_times if name == app_module or name.startswith("app.")]
+        print("   slowest project modules (self / cumulative ms):")
+        for name in sorted(project, key=lambda name: median(self_times[name]), reverse=True)[:args.top]:
+            print(f"   {name:<45} {median(self_times[name]) / 1000:>7.1f} {median(cumulative_times[name]) / 1000:>8.1f}")
+
+        third_party = [name for name in self_times if "." not in name and name not in project]
+        heaviest = sorted(third_party, key=lambda name: median(cumulative_times[name]), reverse=True)[:5]
+        print("   heaviest top-level imports: " + ", ".join(
+            f"{name} {median(cumulative_times[name]) / 1000:.0f}ms" for name in heaviest
+        ))
+
+        if total_ms > args.budget_ms:
+            over_budget.append(app_module)
+
+    if over_budget:
+        print(f"\n❌ Over the startup budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
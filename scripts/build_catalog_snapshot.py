@@ -0,0 +1,38 @@
+"""
+Build the memory-mapped catalog snapshot
+Workers rebuild it on their own when the catalog changes; run this after loading or
+editing products so every worker simply maps the new files on start:
+
+    python scripts/build_catalog_snapshot.py
+"""
+
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database
+from app.services.catalog_service import catalog_service
+from app.services.catalog_snapshot import CatalogSnapshot, catalog_snapshot
+
+def main():
+    print("🗃️  FoodieBot Catalog Snapshot")
+    print("=============================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+    catalog_snapshot.build(catalog_service.get_catalog_signature(include_popularity=False))
+
+    size = sum(os.path.getsize(os.path.join(catalog_snapshot.path, name))
+               for name in os.listdir(catalog_snapshot.path))
+    print(f"💾 {len(catalog_snapshot)} products in {size / 1024:.1f} KB")
+
+    # What a freshly started worker pays to map it
+    started = time.perf_counter()
+    fresh = CatalogSnapshot()
+    fresh.ensure_loaded()
+    print(f"⚡ Mapped in {(time.perf_counter() - started) * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Build the precomputed similar-items index offline
+The API rebuilds it on its own when the catalog changes, but on a large catalog
+run this after loading products so no request pays for the build:
+
+    python scripts/build_similarity_index.py
+    SIMILARITY_EXACT_MAX_PRODUCTS=0 python scripts/build_similarity_index.py   # force MinHash-LSH
+"""
+
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database
+from app.services.catalog_service import catalog_service
+from app.services.similarity_index import similarity_index
+
+def main():
+    print("🧩 FoodieBot Similar Items Index")
+    print("================================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+    similarity_index.build(catalog_service.get_catalog_signature(include_popularity=False))
+
+    started = time.perf_counter()
+    lookups = 0
+    for product_id in similarity_index.product_ids:
+        similarity_index.similar(product_id, 10)
+        lookups += 1
+    elapsed = time.perf_counter() - started
+    if lookups:
+        print(f"⚡ {lookups} lookups, {elapsed / lookups * 1e6:.1f}µs each")
+
+    sample = similarity_index.product_ids[:3]
+    for product_id, product in zip(sample, catalog_service.get_products_by_ids(sample)):
+        neighbours = catalog_service.get_products_by_ids([similar_id for similar_id, _ in similarity_index.similar(product_id, 3)])
+        print(f"   {product['name']} -> {', '.join(neighbour['name'] for neighbour in neighbours)}")
+
+if __name__ == "__main__":
+    main()
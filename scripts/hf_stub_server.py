@@ -0,0 +1,100 @@
+"""
+Local stand-in for the HuggingFace Inference API
+Answers POST /<model> with a canned completion so the AI services can be
+exercised without network access or an API key:
+
+    python scripts/hf_stub_server.py --port 8081 --delay 0.2
+    HF_API_BASE=http://127.0.0.1:8081 HUGGINGFACE_API_KEY=stub python server.py
+
+Use --fail-rate / --status to simulate flaky or cold models. Run several on
+different ports and list them as full URLs in HF_MODELS to exercise the
+parallel and hedged dispatch modes (HF_DISPATCH_MODE). Requests sent with
+"stream": true are answered token by token as Server-Sent Events.
+"""
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_REPLY = "You should definitely try our most popular pick today, it is packed with flavor!"
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive and chunked token streams
+    delay = 0.0
+    fail_rate = 0.0
+    status = 200
+    reply = STUB_REPLY
+    token_delay = 0.05
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        prompt = payload.get('inputs', '')
+
+        time.sleep(self.delay)
+
+        if self.status != 200 or random.random() < self.fail_rate:
+            status = self.status if self.status != 200 else 503
+            self._send_json(status, {"error": "Model is currently loading", "estimated_time": 20.0})
+            return
+
+        if payload.get('stream'):
+            self._send_stream(self.reply)
+            return
+
+        self._send_json(200, [{"generated_text": f"{prompt} {self.reply}"}])
+
+    def _send_stream(self, text: str):
+        """Text-generation-inference style token stream"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        words = text.split(' ')
+        for i, word in enumerate(words):
+            token = {"token": {"id": i, "text": f" {word}", "special": False}}
+            self._write_chunk(f"data: {json.dumps(token)}\n\n".encode())
+            time.sleep(self.token_delay)
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        print(f"🧪 stub {self.address_string()} {format % args}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HuggingFace Inference API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--status", type=int, default=200, help="force every response to this status")
+    parser.add_argument("--reply", default=STUB_REPLY)
+    parser.add_argument("--token-delay", type=float, default=0.05, help="seconds between streamed tokens")
+    args = parser.parse_args()
+
+    StubHandler.delay = args.delay
+    StubHandler.fail_rate = args.fail_rate
+    StubHandler.status = args.status
+    StubHandler.reply = args.reply
+    StubHandler.token_delay = args.token_delay
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"🧪 HuggingFace stub listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
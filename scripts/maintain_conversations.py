@@ -0,0 +1,42 @@
+"""
+Run the conversation log maintenance inline: expire days past CONVERSATION_RETENTION_DAYS
+and roll days beyond CONVERSATION_LIVE_PARTITIONS into conversations_archive. The app does
+the same on a background thread; --vacuum also compacts the database file, which locks it
+for the duration, so schedule it for a quiet period:
+
+    python scripts/maintain_conversations.py --vacuum
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database, get_db_manager, conversation_store
+from app.models.conversation_store import ARCHIVE_TABLE
+
+def main():
+    parser = argparse.ArgumentParser(description="Expire, roll up and optionally compact the conversation log")
+    parser.add_argument("--vacuum", action="store_true", help="compact the database file afterwards")
+    args = parser.parse_args()
+
+    print("🧹 FoodieBot Conversation Maintenance")
+    print("=====================================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+    db = get_db_manager()
+
+    started = time.perf_counter()
+    conversation_store.run_maintenance(db.db_path, vacuum=args.vacuum, wait=True)
+
+    with db.get_connection() as conn:
+        partitions = conversation_store.list_partitions(conn)
+        archived = conn.execute(f"SELECT COUNT(*) FROM {ARCHIVE_TABLE}").fetchone()[0]
+    print(f"📅 {len(partitions)} daily partitions, {archived} turns in {ARCHIVE_TABLE}")
+    print(f"✅ Done in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Replay recorded conversations through the recommendation engines
+Streams stored turns (message + user_preferences) from the conversations log, one session
+at a time, through each pipeline preset in parallel worker processes. Reports throughput,
+latency percentiles and how closely the products match the recorded recommended_products
+(overlap and NDCG@k), so ranking changes can be checked on real traffic:
+
+    python scripts/replay_conversations.py
+    python scripts/replay_conversations.py --pipelines engine,lightweight --workers 8 --limit 5000
+    python scripts/replay_conversations.py --pipelines engine --retriever semantic --extract
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database, get_db_manager
+from app.services.pipeline import build_pipeline, PRESETS
+
+STAGES = ['extractor', 'scorer', 'retriever', 'ranker', 'generator']
+
+def stream_sessions(limit: int, batch_size: int = 500):
+    """Yield (session_id, turns) in timestamp order, reading the log in batches"""
+    db = get_db_manager()
+    with db.get_connection() as conn:
+        cursor = conn.execute("""
+        SELECT session_id, user_message, user_preferences, recommended_products
+        FROM conversations
+        ORDER BY session_id, timestamp, id
+        """)
+        session_id, turns, read = None, [], 0
+        while read < limit:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows[:limit - read]:
+                read += 1
+                if row['session_id'] != session_id and turns:
+                    yield session_id, turns
+                    turns = []
+                session_id = row['session_id']
+                turns.append((row['user_message'], _json(row['user_preferences'], {}),
+                              _json(row['recommended_products'], [])))
+        if turns:
+            yield session_id, turns
+
+def _json(raw, default):
+    try:
+        value = json.loads(raw) if raw else default
+    except (TypeError, ValueError):
+        return default
+    return value if isinstance(value, type(default)) else default
+
+def _product_ids(products):
+    """Recorded products are ids; older rows may hold product dicts"""
+    return [item.get('product_id') if isinstance(item, dict) else item for item in products]
+
+def ndcg(recommended, reference, k):
+    """Binary relevance: a product counts if it was recommended in the recorded turn"""
+    relevant = set(reference)
+    dcg = sum(1 / math.log2(rank + 2) for rank, product_id in enumerate(recommended[:k]) if product_id in relevant)
+    ideal = sum(1 / math.log2(rank + 2) for rank in range(min(len(relevant), k)))
+    return dcg / ideal if ideal else 0.0
+
+def overlap(recommended, reference, k):
+    """Share of the recorded top-k that the engine also returned"""
+    reference = reference[:k]
+    if not reference:
+        return 0.0
+    return len(set(recommended[:k]) & set(reference)) / len(reference)
+
+# Worker processes - each builds its own pipeline and replays whole sessions in order
+_pipeline = None
+_options = None
+
+def _init_worker(preset, overrides, options):
+    global _pipeline, _options
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+    _pipeline = build_pipeline(preset, **overrides)
+    _options = options
+
+def _replay_session(session):
+    session_id, turns = session
+    results = []
+    for message, preferences, recorded in turns:
+        started = time.perf_counter()
+        turn = _pipeline.prepare(message, f"replay-{session_id}", None if _options['extract'] else preferences)
+        if _options['generate']:
+            turn.response = _pipeline.generator.generate(turn)
+        latency = (time.perf_counter() - started) * 1000
+
+        recommended = [product['product_id'] for product in turn.products]
+        reference = _product_ids(recorded)
+        k = _options['k']
+        results.append({
+            'latency_ms': latency,
+            'answered': bool(recommended),
+            'has_reference': bool(reference),
+            'overlap': overlap(recommended, reference, k),
+            'ndcg': ndcg(recommended, reference, k)
+        })
+    return results
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def replay(preset, overrides, args):
+    options = {'extract': args.extract, 'generate': args.generate, 'k': args.k}
+    results = []
+    started = time.perf_counter()
+    with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(preset, overrides, options)) as pool:
+        for session_results in pool.imap_unordered(_replay_session, stream_sessions(args.limit), chunksize=4):
+            results.extend(session_results)
+    elapsed = time.perf_counter() - started
+
+    latencies = [result['latency_ms'] for result in results]
+    scored = [result for result in results if result['has_reference']]
+    return {
+        'turns': len(results),
+        'throughput': len(results) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.5),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'coverage': sum(result['answered'] for result in results) / len(results) if results else 0.0,
+        'scored': len(scored),
+        'overlap': sum(result['overlap'] for result in scored) / len(scored) if scored else 0.0,
+        'ndcg': sum(result['ndcg'] for result in scored) / len(scored) if scored else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded conversations through the engines")
+    parser.add_argument("--pipelines", default=",".join(PRESETS), help="comma separated presets")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="worker processes")
+    parser.add_argument("--limit", type=int, default=100000, help="most turns to replay")
+    parser.add_argument("--k", type=int, default=5, help="cut-off for overlap and NDCG")
+    parser.add_argument("--extract", action="store_true", help="re-extract preferences instead of using the stored ones")
+    parser.add_argument("--generate", action="store_true", help="also generate (and time) the replies")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}", default="", help=f"override the {stage} of every preset")
+    args = parser.parse_args()
+
+    print("🔁 FoodieBot Conversation Replay")
+    print("================================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+
+    overrides = {stage: getattr(args, stage) for stage in STAGES}
+    results = []
+    for preset in [name.strip() for name in args.pipelines.split(",") if name.strip()]:
+        name = build_pipeline(preset, **overrides).name
+        results.append((name, replay(preset, overrides, args)))
+
+    print()
+    print(f"{'pipeline':<28} {'turns':>6} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'coverage':>9} {'overlap':>8} {f'NDCG@{args.k}':>8}")
+    for name, result in results:
+        print(f"{name:<28} {result['turns']:>6} {result['throughput']:>8.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['coverage']:>9.0%} "
+              f"{result['overlap']:>8.0%} {result['ndcg']:>8.3f}")
+    if results and not results[0][1]['scored']:
+        print("\n⚠️ No recorded recommended_products to compare against yet")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Train the collaborative filtering model from the conversations log
+Streams every stored turn, factorizes the session x product matrix and writes the item
+factors the API memory-maps (picked up within CF_MODEL_TTL seconds). Run it on a schedule:
+
+    python scripts/train_interactions.py
+    CF_FACTORS=32 python scripts/train_interactions.py
+"""
+
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database
+from app.services.catalog_service import catalog_service
+from app.services.interaction_model import interaction_model
+
+def main():
+    print("🧠 FoodieBot Collaborative Filtering Training")
+    print("============================================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+    stats = interaction_model.train()
+    print(f"📚 {stats['turns']} turns, {stats['sessions']} sessions with recommendations, "
+          f"{stats['interactions']} session-product pairs")
+    if not stats['interactions']:
+        return
+
+    interaction_model.ensure_loaded()
+    print(f"📈 Singular values: {', '.join(str(value) for value in interaction_model.meta['singular_values'][:8])}")
+
+    started = time.perf_counter()
+    queries = 0
+    for product_id in interaction_model.product_ids[:200]:
+        interaction_model.score({product_id: 1.0}, 10)
+        queries += 1
+    elapsed = time.perf_counter() - started
+    print(f"⚡ {queries} single-item queries, {elapsed / queries * 1e6:.1f}µs each")
+
+    sample = interaction_model.product_ids[:3]
+    for product_id, product in zip(sample, catalog_service.get_products_by_ids(sample)):
+        related = catalog_service.get_products_by_ids([related_id for related_id, _ in interaction_model.score({product_id: 1.0}, 3)])
+        print(f"   {product['name']} -> {', '.join(item['name'] for item in related) or '(no co-occurrences)'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Check the smart bot's precomputed answer table against its SQL path
+Every slot combination the preference extractor can produce (plus values the table does
+not filter on) is answered both ways for each stage and must match exactly. Exits with
+status 1 on any difference:
+
+    python scripts/verify_answer_table.py
+"""
+
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database
+from app.services.catalog_service import catalog_service
+from app.services.preference_extractor import LEXICON
+from app.services.smart_bot_service import smart_bot_service, STAGE_LIMITS
+
+def main():
+    print("📇 FoodieBot Answer Table Check")
+    print("===============================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+    smart_bot_service.answers.ensure_built()
+
+    dietary_values = [None] + list(LEXICON['dietary'])
+    categories = [None] + sorted(set(catalog_service.get_categories()) | set(LEXICON['categories']))
+    flavors = [None, 'spicy', 'sweet']
+
+    checked = fallbacks = 0
+    mismatches = []
+    table_seconds = sql_seconds = 0.0
+    for dietary in dietary_values:
+        for category in categories:
+            for flavor in flavors:
+                prefs = {slot: value for slot, value in
+                         [('dietary', dietary), ('category', category), ('flavor', flavor)] if value}
+                for limit in STAGE_LIMITS.values():
+                    started = time.perf_counter()
+                    from_table = smart_bot_service.lookup_recommendations(prefs, limit)
+                    table_seconds += time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    from_sql = smart_bot_service.query_recommendations(prefs, limit)
+                    sql_seconds += time.perf_counter() - started
+
+                    checked += 1
+                    if from_table is None:
+                        # Not in the table - the service falls back to SQL
+                        fallbacks += 1
+                    elif from_table != from_sql:
+                        mismatches.append((prefs, limit,
+                                           [product['product_id'] for product in from_table],
+                                           [product['product_id'] for product in from_sql]))
+
+    print(f"🔎 {checked} lookups, {fallbacks} answered by the SQL fallback, {len(mismatches)} mismatches")
+    print(f"⚡ table {table_seconds / checked * 1e6:.1f}µs vs SQL {sql_seconds / checked * 1e6:.1f}µs per lookup")
+    for prefs, limit, table_ids, sql_ids in mismatches[:10]:
+        print(f"   ❌ {prefs} limit {limit}: table {table_ids} vs SQL {sql_ids}")
+
+    if mismatches:
+        sys.exit(1)
+    print("✅ Answer table matches the SQL path")
+
+if __name__ == "__main__":
+    main()
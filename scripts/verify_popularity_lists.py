@@ -0,0 +1,125 @@
+"""
+Check the pre-sorted popularity lists against `ORDER BY popularity_score DESC` in SQL
+Every list (overall, each category, each dietary and mood term of the lexicon) is compared
+at several depths, then random popularity changes are written and applied incrementally
+(alternately handed over, as by this worker's flush, and picked up by a sync, as from
+another worker's) and everything is compared again. The changes are rolled back at the end; run it against
+a copy of the database anyway. Exits with status 1 on any difference:
+
+    DATABASE_URL=/tmp/foodiebot.db python scripts/verify_popularity_lists.py --rounds 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.database import init_database, get_db_manager
+from app.services.catalog_service import catalog_service
+from app.services.popularity_lists import popularity_lists
+from app.services.preference_extractor import LEXICON
+
+LIMITS = [1, 5, 10, 20]
+
+def sql_top(limit, category=None, tag_column=None, term=None):
+    db = get_db_manager()
+    query = "SELECT product_id FROM products"
+    params = []
+    if category is not None:
+        query += " WHERE category = ?"
+        params.append(category)
+    elif tag_column is not None:
+        query += f" WHERE {tag_column} LIKE ?"
+        params.append(f"%{term}%")
+    query += " ORDER BY popularity_score DESC, id ASC LIMIT ?"
+    params.append(limit)
+    with db.get_connection() as conn:
+        return [row[0] for row in conn.execute(query, params)]
+
+def compare(label):
+    """Every list at every depth; returns (checks, mismatches, list seconds, SQL seconds)"""
+    queries = [({}, {})]
+    queries += [({'categories': [category]}, {'category': category}) for category in catalog_service.get_categories()]
+    for column, slot in [('dietary_tags', 'dietary'), ('mood_tags', 'mood')]:
+        queries += [({'tag_column': column, 'tag_terms': [term]}, {'tag_column': column, 'term': term})
+                    for term in LEXICON[slot]]
+
+    checks = 0
+    mismatches = []
+    list_seconds = sql_seconds = 0.0
+    for list_args, sql_args in queries:
+        for limit in LIMITS:
+            started = time.perf_counter()
+            from_lists = [product['product_id'] for product in popularity_lists.top(limit, **list_args)]
+            list_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            from_sql = sql_top(limit, **sql_args)
+            sql_seconds += time.perf_counter() - started
+
+            checks += 1
+            if from_lists != from_sql:
+                mismatches.append((label, sql_args, limit, from_lists, from_sql))
+    return checks, mismatches, list_seconds, sql_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the popularity lists against SQL")
+    parser.add_argument("--rounds", type=int, default=10, help="rounds of random popularity changes")
+    parser.add_argument("--changes", type=int, default=15, help="products changed per round")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print("🏆 FoodieBot Popularity Lists Check")
+    print("===================================")
+
+    init_database(os.getenv("DATABASE_URL", "./data/foodiebot.db"))
+    db = get_db_manager()
+    with db.get_connection() as conn:
+        original = dict(conn.execute("SELECT product_id, popularity_score FROM products").fetchall())
+
+    started = time.perf_counter()
+    popularity_lists.ensure_loaded()
+    print(f"📚 {len(popularity_lists.lists)} lists built in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    checks, mismatches, list_seconds, sql_seconds = compare("initial")
+    print(f"⚡ lists {list_seconds / checks * 1e6:.1f}µs vs SQL {sql_seconds / checks * 1e6:.1f}µs per query")
+
+    rng = random.Random(args.seed)
+    product_ids = sorted(original)
+    try:
+        for round_number in range(args.rounds):
+            # Big swings, so products move in and out of the top N
+            scores = {product_id: rng.randint(0, 100) for product_id in rng.sample(product_ids, args.changes)}
+            with db.get_connection() as conn:
+                conn.executemany("UPDATE products SET popularity_score = ? WHERE product_id = ?",
+                                 [(score, product_id) for product_id, score in scores.items()])
+                conn.commit()
+            if round_number % 2:
+                # As another worker's flush would look from here
+                popularity_lists.sync()
+            else:
+                popularity_lists.apply_updates(scores, catalog_service.get_catalog_signature())
+
+            round_checks, round_mismatches, _, _ = compare(f"round {round_number + 1}")
+            checks += round_checks
+            mismatches += round_mismatches
+    finally:
+        with db.get_connection() as conn:
+            conn.executemany("UPDATE products SET popularity_score = ? WHERE product_id = ?",
+                             [(score, product_id) for product_id, score in original.items()])
+            conn.commit()
+
+    print(f"🔎 {checks} queries over {args.rounds} update rounds, {len(mismatches)} mismatches")
+    for label, query, limit, list_ids, sql_ids in mismatches[:10]:
+        print(f"   ❌ {label} {query} limit {limit}: lists {list_ids} vs SQL {sql_ids}")
+
+    if mismatches:
+        sys.exit(1)
+    print("✅ Popularity lists match the SQL ordering")
+
+if __name__ == "__main__":
+    main()
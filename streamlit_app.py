@@ -332,30 +332,62 @@ if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'current_products' not in st.session_state:
     st.session_state.current_products = []
+if 'browse_filters' not in st.session_state:
+    st.session_state.browse_filters = None
+if 'browse_products' not in st.session_state:
+    st.session_state.browse_products = []
+if 'browse_next_cursor' not in st.session_state:
+    st.session_state.browse_next_cursor = None
+if 'browse_total' not in st.session_state:
+    st.session_state.browse_total = 0
 
 # Helper Functions
-def send_message(message):
+def send_message(message, placeholder=None):
+    """Stream the reply into `placeholder` as it arrives, returns the finished turn"""
+    payload = {
+        "message": message,
+        "session_id": st.session_state.session_id
+    }
     try:
-        response = requests.post(f"{API_URL}/api/chat", json={
-            "message": message,
-            "session_id": st.session_state.session_id
-        }, timeout=10)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
+        with requests.post(f"{API_URL}/api/chat/stream", json=payload, stream=True, timeout=10) as response:
+            if response.status_code == 404:
+                # Older server without streaming
+                fallback = requests.post(f"{API_URL}/api/chat", json=payload, timeout=10)
+                return fallback.json() if fallback.status_code == 200 else None
+            if response.status_code != 200:
+                return None
+            
+            result = {"response": "", "recommended_products": [], "interest_score": 0}
+            event = None
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[5:])
+                    if event == "meta":
+                        result.update(data)
+                        # Recommendations are ready before the reply is
+                        st.session_state.current_products = data.get('recommended_products', [])
+                    elif event == "token":
+                        result['response'] += data['text']
+                        if placeholder is not None:
+                            placeholder.markdown(f'<div class="bot-message">{result["response"]}▌</div>', unsafe_allow_html=True)
+                    elif event == "done":
+                        result['response'] = data['response']
+            return result
     except Exception as e:
         st.error(f"Connection error: {e}")
         return None
 
-def get_products(category=None, search=None):
+def get_products(category=None, search=None, cursor=None):
     try:
         params = {}
         if category and category != "All Categories":
             params['category'] = category
         if search:
             params['search'] = search
+        if cursor:
+            params['cursor'] = cursor
         
         response = requests.get(f"{API_URL}/api/products", params=params, timeout=10)
         
@@ -367,6 +399,21 @@ def get_products(category=None, search=None):
         st.error(f"Error loading products: {e}")
         return {"products": [], "categories": []}
 
+def search_products(filters, offset=0):
+    try:
+        params = {key: value for key, value in filters.items() if value}
+        params['offset'] = offset
+        
+        response = requests.get(f"{API_URL}/api/products/search", params=params, timeout=10)
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return {"products": [], "total": 0, "facets": {}}
+    except Exception as e:
+        st.error(f"Error loading products: {e}")
+        return {"products": [], "total": 0, "facets": {}}
+
 # Header
 st.markdown("""
 <div class="main-header">
@@ -467,8 +514,10 @@ if page == "💬 Chat with AI":
                 send_clicked = st.form_submit_button("Send 🚀", use_container_width=True)
             
             if send_clicked and user_input:
-                with st.spinner("🤤 FoodieBot is cooking up recommendations..."):
-                    result = send_message(user_input)
+                st.markdown(f'<div class="user-message">{user_input}</div>', unsafe_allow_html=True)
+                reply_placeholder = st.empty()
+                reply_placeholder.markdown('<div class="bot-message">🤤 FoodieBot is cooking up recommendations...</div>', unsafe_allow_html=True)
+                result = send_message(user_input, reply_placeholder)
                 
                 if result:
                     st.session_state.chat_history.append({
@@ -517,14 +566,63 @@ else:  # Browse Menu
         if st.button("🔍 Search Menu", use_container_width=True):
             st.rerun()
     
-    filtered_products = get_products(
-        category=selected_category if selected_category != "All Categories" else None,
-        search=search_term if search_term else None
-    )
-    
-    products = filtered_products.get('products', [])
+    with st.expander("🎛️ More filters"):
+        facet_counts = search_products({}).get('facets', {})
+        
+        def facet_label(facet, value):
+            return f"{value} ({facet_counts.get(facet, {}).get(str(value), 0)})"
+        
+        fcol1, fcol2 = st.columns(2, gap="small")
+        with fcol1:
+            dietary_filter = st.multiselect(
+                "🥗 Dietary", list(facet_counts.get('dietary', {})),
+                format_func=lambda value: facet_label('dietary', value)
+            )
+            price_filter = st.multiselect(
+                "💵 Price", list(facet_counts.get('price', {})),
+                format_func=lambda value: facet_label('price', value)
+            )
+        with fcol2:
+            allergen_filter = st.multiselect(
+                "🚫 Exclude allergens", list(facet_counts.get('allergens', {})),
+                format_func=lambda value: facet_label('allergens', value)
+            )
+            max_spice_filter = st.slider("🌶️ Max spice", 0, 10, 10)
+            max_calories_filter = st.slider("📊 Max calories", 100, 1000, 1000, step=50)
+    
+    facet_filters = {
+        'category': selected_category if selected_category != "All Categories" else None,
+        'search': search_term or None,
+        'dietary': dietary_filter,
+        'exclude_allergen': allergen_filter,
+        'price_bucket': price_filter,
+        'max_spice': max_spice_filter if max_spice_filter < 10 else None,
+        'max_calories': max_calories_filter if max_calories_filter < 1000 else None,
+    }
+    use_facets = any(facet_filters[key] for key in ['dietary', 'exclude_allergen', 'price_bucket', 'max_spice', 'max_calories'])
+    browse_filters = repr(sorted(facet_filters.items()))
+    
+    # Filters changed - start again from the first page
+    if st.session_state.browse_filters != browse_filters:
+        if use_facets:
+            filtered_products = search_products(facet_filters)
+            next_cursor = len(filtered_products.get('products', [])) if filtered_products.get('total', 0) > len(filtered_products.get('products', [])) else None
+        else:
+            filtered_products = get_products(
+                category=facet_filters['category'],
+                search=facet_filters['search']
+            )
+            next_cursor = filtered_products.get('next_cursor')
+        st.session_state.browse_filters = browse_filters
+        st.session_state.browse_products = filtered_products.get('products', [])
+        st.session_state.browse_next_cursor = next_cursor
+        st.session_state.browse_total = filtered_products.get('total', 0)
+    
+    products = st.session_state.browse_products
     
     if products:
+        st.caption(f"Showing {len(products)} of {st.session_state.browse_total} dishes")
+        
         cols = st.columns(3, gap="small")
         
         for i, product in enumerate(products):
@@ -542,6 +640,24 @@ else:  # Browse Menu
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
+        
+        if st.session_state.browse_next_cursor:
+            if st.button("⬇️ Load more", use_container_width=True):
+                if use_facets:
+                    # Faceted search pages by offset
+                    next_page = search_products(facet_filters, offset=st.session_state.browse_next_cursor)
+                    loaded = len(products) + len(next_page.get('products', []))
+                    next_cursor = loaded if loaded < next_page.get('total', 0) else None
+                else:
+                    next_page = get_products(
+                        category=facet_filters['category'],
+                        search=facet_filters['search'],
+                        cursor=st.session_state.browse_next_cursor
+                    )
+                    next_cursor = next_page.get('next_cursor')
+                st.session_state.browse_products = products + next_page.get('products', [])
+                st.session_state.browse_next_cursor = next_cursor
+                st.rerun()
     else:
         st.info("🍽️ No products found. Try different filters!")
 